@@ -7,6 +7,7 @@ from rpy2 import robjects as ro
 logger = logging.getLogger(__name__)
 
 from . import _logging  # noqa
+from ._cache import clear_cache, configure_cache  # noqa
 from ._r_setup import install_r_packages
 from .config import PACKAGES_LIST, R_LIBRARY_PATH
 
@@ -0,0 +1,284 @@
+"""Content-addressed cache for the results of R-backed functions."""
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from .config import CACHE_DISK_DIR, CACHE_DISK_MAX_BYTES, CACHE_MAX_BYTES
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+
+def _new_hasher() -> Any:
+    """Return a fresh hasher, using xxhash when it is installed."""
+    if xxhash is not None:  # pragma: no cover
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def _update_hasher(hasher: Any, value: Any) -> None:
+    """
+    Feed a value into a hasher.
+
+    Arrays are hashed by dtype, shape and raw content; containers are hashed recursively and any other
+    value is hashed through its repr.
+    """
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        hasher.update(f"ndarray:{value.dtype.str}:{value.shape}".encode())
+        hasher.update(np.ascontiguousarray(value).reshape(-1).view(np.uint8))
+    elif isinstance(value, (tuple, list)):
+        hasher.update(f"{type(value).__name__}:{len(value)}".encode())
+        for item in value:
+            _update_hasher(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(f"dict:{len(value)}".encode())
+        for name in sorted(value):
+            hasher.update(f"{name}=".encode())
+            _update_hasher(hasher, value[name])
+    else:
+        hasher.update(f"{type(value).__name__}:{value!r}".encode())
+
+
+def _hash_value(value: Any) -> str:
+    """
+    Compute a content hash of a value.
+
+    Parameters:
+    ----------
+    value : Any
+        A numpy array, a scalar, or a (nested) tuple, list or dict of those.
+
+    Returns:
+    ----------
+    str
+        The hexadecimal digest.
+    """
+    hasher = _new_hasher()
+    _update_hasher(hasher, value)
+    return hasher.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of numpy array results.
+
+    The first tier is an in-memory LRU bounded by a byte budget. The optional second tier stores the
+    results as .npy files in a directory, evicting the least recently used files once the directory
+    exceeds its own byte budget. Cached arrays are stored as private copies and a copy is returned on
+    every hit, so callers are free to modify the arrays they get.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        disk_dir: Optional[str] = CACHE_DISK_DIR,
+        disk_max_bytes: int = CACHE_DISK_MAX_BYTES,
+    ):
+        """
+        Initialize the ResultCache class.
+
+        Parameters:
+        ----------
+        max_bytes : int, optional
+            Byte budget of the in-memory tier. 0 disables the in-memory tier.
+        disk_dir : Optional[str], optional
+            Directory of the on-disk tier. If None, the on-disk tier is disabled.
+        disk_max_bytes : int, optional
+            Byte budget of the on-disk tier.
+        """
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(name: str, params: Dict, ignore: Iterable[str] = ("progbar",)) -> str:
+        """
+        Build the cache key of a function call.
+
+        Parameters:
+        ----------
+        name : str
+            Name of the cached function.
+        params : dict
+            The validated parameter dictionary, mapping names to (value, type) pairs.
+        ignore : Iterable[str], optional
+            Names of the parameters that do not affect the result.
+
+        Returns:
+        ----------
+        str
+            The cache key.
+        """
+        values = {
+            var_name: var_value
+            for var_name, (var_value, _) in params.items()
+            if var_name not in ignore
+        }
+        return _hash_value((name, values))
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a cached result.
+
+        Parameters:
+        ----------
+        key : str
+            The cache key.
+
+        Returns:
+        ----------
+        Optional[np.ndarray]
+            A copy of the cached array, or None on a miss.
+        """
+        value = self._memory.get(key)
+        if value is not None:
+            self._memory.move_to_end(key)
+            return value.copy()
+
+        path = self._disk_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            value = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read cached result {path}: {e}")
+            return None
+        self._put_memory(key, value)
+        return value.copy()
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Store a result. Values that are not numpy arrays are not cached.
+
+        Parameters:
+        ----------
+        key : str
+            The cache key.
+        value : Any
+            The result to store.
+        """
+        if not isinstance(value, np.ndarray) or value.dtype == object:
+            return
+        self._put_memory(key, value.copy())
+        self._put_disk(key, value)
+
+    def clear(self, disk: bool = False) -> None:
+        """
+        Empty the cache.
+
+        Parameters:
+        ----------
+        disk : bool, optional
+            Default False. If True, the .npy files of the on-disk tier are removed as well.
+        """
+        self._memory.clear()
+        self._memory_bytes = 0
+        if disk and self.disk_dir is not None:
+            for entry in self._disk_entries():
+                os.remove(entry.path)
+
+    def _put_memory(self, key: str, value: np.ndarray) -> None:
+        """Insert a private copy into the in-memory tier and evict down to the byte budget."""
+        if value.nbytes > self.max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory.pop(key).nbytes
+        value.setflags(write=False)
+        self._memory[key] = value
+        self._memory_bytes += value.nbytes
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        """Return the .npy path of a key, or None if the on-disk tier is disabled."""
+        if self.disk_dir is None:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _disk_entries(self) -> list:
+        """List the .npy entries of the on-disk tier."""
+        with os.scandir(self.disk_dir) as entries:
+            return [e for e in entries if e.is_file() and e.name.endswith(".npy")]
+
+    def _put_disk(self, key: str, value: np.ndarray) -> None:
+        """Write a result to the on-disk tier and evict down to the byte budget."""
+        path = self._disk_path(key)
+        if path is None or value.nbytes > self.disk_max_bytes:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.disk_dir)
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, value, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cached result {path}: {e}")
+            return
+
+        stats = [(e.stat(), e.path) for e in self._disk_entries()]
+        total = sum(stat.st_size for stat, _ in stats)
+        for stat, entry_path in sorted(stats, key=lambda entry: entry[0].st_mtime):
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(entry_path)
+            total -= stat.st_size
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def configure_cache(
+    max_bytes: int = CACHE_MAX_BYTES,
+    disk_dir: Optional[str] = CACHE_DISK_DIR,
+    disk_max_bytes: int = CACHE_DISK_MAX_BYTES,
+) -> None:
+    """
+    Configure the cache of the sphere_shade, detect_water and add_water results, and of the tuned triangulation errors.
+
+    Parameters:
+    ----------
+    max_bytes : int, optional
+        Byte budget of the in-memory tier. 0 disables the in-memory tier.
+    disk_dir : Optional[str], optional
+        Directory of the on-disk tier of .npy files. If None, the on-disk tier is disabled.
+    disk_max_bytes : int, optional
+        Byte budget of the on-disk tier.
+
+    Examples:
+    ----------
+    >>> import rayshaderpy
+    >>> rayshaderpy.configure_cache(max_bytes=1024**3, disk_dir="/tmp/rayshaderpy-cache")
+    """
+    _RESULT_CACHE.clear()
+    _RESULT_CACHE.max_bytes = max_bytes
+    _RESULT_CACHE.disk_dir = disk_dir
+    _RESULT_CACHE.disk_max_bytes = disk_max_bytes
+    if disk_dir is not None:
+        os.makedirs(disk_dir, exist_ok=True)
+
+
+def clear_cache(disk: bool = False) -> None:
+    """
+    Empty the cache of the sphere_shade, detect_water and add_water results, and of the tuned triangulation errors.
+
+    Parameters:
+    ----------
+    disk : bool, optional
+        Default False. If True, the .npy files of the on-disk tier are removed as well.
+    """
+    _RESULT_CACHE.clear(disk=disk)
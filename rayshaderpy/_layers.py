@@ -0,0 +1,217 @@
+"""Lazy stack of the layers composited over a base hillshade."""
+
+from collections import OrderedDict
+from typing import Any, List, NamedTuple, Optional
+
+import numpy as np
+
+from .helpers import _row_chunks, _to_hillshade_dtype
+from .overlay import (
+    _overlay_chunk,
+    _shadow_chunk,
+    _shadow_image,
+    _validate_hillshade,
+    _validate_overlay,
+    _water_chunk,
+    _water_image,
+    _water_rgb,
+)
+
+LAYER_KINDS = ["shadow", "water", "overlay"]
+# Default blending parameter of each kind: max_darken of a shadow, color of water, alphalayer of an overlay
+LAYER_DEFAULTS = {"shadow": 0.7, "water": "imhof1", "overlay": 1}
+
+
+class Layer(NamedTuple):
+    """A recorded layer: its kind, its image-oriented data and its blending parameter."""
+
+    kind: str
+    image: np.ndarray
+    param: Any
+
+
+class LayerStack:
+    """
+    Ordered stack of shadow, water and overlay layers over a base hillshade.
+
+    Adding, replacing or removing a layer only records it: the layer data is kept by reference, so nothing
+    is recomputed or copied. The layers are composited when the image is requested, in a single pass per
+    row tile in which the base rows are copied once and every layer is applied to them while they are hot
+    in the cache. The composited image is kept until the base or a layer changes.
+    """
+
+    def __init__(self):
+        """Initialize the LayerStack class."""
+        self.base: Optional[np.ndarray] = None
+        self._layers: "OrderedDict[str, Layer]" = OrderedDict()
+        self._composited: Optional[np.ndarray] = None
+        self._counter = 0
+
+    def __len__(self) -> int:
+        """Return the number of layers."""
+        return len(self._layers)
+
+    @property
+    def names(self) -> List[str]:
+        """Return the names of the layers, from bottom to top."""
+        return list(self._layers)
+
+    def set_base(self, hillshade: Optional[np.ndarray], clear: bool = False) -> None:
+        """
+        Replace the base hillshade.
+
+        Parameters:
+        ----------
+        hillshade : Optional[np.ndarray]
+            A three-dimensional matrix representing an RGB image, or None.
+        clear : bool, optional
+            Default False. If True, the layers are removed as well.
+        """
+        if hillshade is not None:
+            _validate_hillshade(hillshade)
+        self.base = hillshade
+        if clear:
+            self._layers.clear()
+        self.invalidate()
+
+    def add(
+        self,
+        kind: str,
+        data: np.ndarray,
+        param: Any,
+        name: Optional[str] = None,
+    ) -> str:
+        """
+        Record a layer on top of the stack, or replace the layer of the same name where it stands.
+
+        Parameters:
+        ----------
+        kind : str
+            One of 'shadow', 'water' or 'overlay'.
+        data : np.ndarray
+            The shadow map, watermap or overlay, as accepted by 'add_shadow', 'add_water' and 'add_overlay'.
+        param : Any
+            The 'max_darken' of a shadow, the color of water or the 'alphalayer' of an overlay.
+        name : Optional[str], optional
+            Default None, which names the layer after its kind and position.
+
+        Returns:
+        ----------
+        str
+            The name of the layer.
+        """
+        if kind not in LAYER_KINDS:
+            raise ValueError(f"kind must be one of {LAYER_KINDS}")
+        if self.base is None:
+            raise ValueError("hillshade is missing.")
+
+        shape = self.base.shape[:2]
+        if kind == "shadow":
+            image = _shadow_image(data, shape, param)
+        elif kind == "water":
+            image = _water_image(data, shape)
+            _water_rgb(param, np.float64)
+        else:
+            _validate_overlay(data, shape, param)
+            image = data
+
+        if name is None:
+            name = f"{kind}{self._counter}"
+            self._counter += 1
+        self._layers[name] = Layer(kind, image, param)
+        self.invalidate()
+        return name
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a layer.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the layer.
+        """
+        if name not in self._layers:
+            raise ValueError(f"no layer named '{name}'")
+        del self._layers[name]
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Drop the composited image, for example after the data of a layer was modified in place."""
+        self._composited = None
+
+    def composite(self, dtype: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Composite the layers over the base hillshade.
+
+        Parameters:
+        ----------
+        dtype : Optional[str], optional
+            Default None, which keeps the dtype of the base. The dtype of the image ('float64', 'float32' or
+            'uint8').
+
+        Returns:
+        ----------
+        Optional[np.ndarray]
+            The composited image, or None without a base. Without layers, this is the base itself.
+        """
+        if self.base is None:
+            return None
+        if not self._layers:
+            return _to_hillshade_dtype(self.base, dtype) if dtype else self.base
+        if self._composited is not None and dtype in (None, self._composited.dtype):
+            return self._composited
+
+        shape = self.base.shape[:2]
+        for layer in self._layers.values():
+            if layer.image.shape[:2] != shape:
+                raise ValueError(f"{layer.kind} dimensions do not match hillshade")
+
+        out_dtype = np.dtype(dtype) if dtype else self.base.dtype
+        output = np.empty(self.base.shape, dtype=out_dtype)
+        colors = self._water_colors(out_dtype)
+
+        row_nbytes = shape[1] * 4 * 8
+        for rows in _row_chunks(shape[0], row_nbytes):
+            tile = output[rows]
+            tile[...] = _to_hillshade_dtype(self.base[rows], out_dtype.name)
+            for layer in self._layers.values():
+                _apply_layer(tile, layer, rows, colors)
+
+        self._composited = output
+        return output
+
+    def refresh(self, rows: slice, cols: slice) -> None:
+        """
+        Composite again a rectangle of the kept image, after the base or layer data changed in place there.
+
+        Parameters:
+        ----------
+        rows, cols : slice
+            The rectangle, in image orientation.
+        """
+        if self._composited is None:
+            return
+        tile = self._composited[rows, cols]
+        tile[...] = _to_hillshade_dtype(self.base[rows, cols], tile.dtype.name)
+        colors = self._water_colors(tile.dtype)
+        for layer in self._layers.values():
+            _apply_layer(tile, layer, (rows, cols), colors)
+
+    def _water_colors(self, dtype: np.dtype) -> dict:
+        """Return the RGB values of the water colors of the layers in a hillshade dtype."""
+        return {
+            layer.param: _water_rgb(layer.param, dtype)
+            for layer in self._layers.values()
+            if layer.kind == "water"
+        }
+
+
+def _apply_layer(tile: np.ndarray, layer: Layer, index: Any, colors: dict) -> None:
+    """Apply the part of a layer under a tile of the composited image in place to the tile."""
+    if layer.kind == "shadow":
+        _shadow_chunk(tile, layer.image[index], layer.param)
+    elif layer.kind == "water":
+        _water_chunk(tile, layer.image[index], colors[layer.param])
+    else:
+        _overlay_chunk(tile, layer.image[index], layer.param)
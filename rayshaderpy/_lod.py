@@ -0,0 +1,99 @@
+"""Pyramid of decimated heightmaps and hillshades for 3D previews."""
+
+from typing import List, Sequence, Tuple, Union
+
+import numpy as np
+
+# Largest side of the coarsest level of a pyramid
+LOD_MIN_SIZE = 256
+
+Level = Tuple[np.ndarray, np.ndarray]
+
+
+def _halve(array: np.ndarray) -> np.ndarray:
+    """Average the 2x2 blocks of the first two axes of an array, repeating the last row or column if odd."""
+    pad = [(0, size % 2) for size in array.shape[:2]] + [(0, 0)] * (array.ndim - 2)
+    if any(after for _, after in pad):
+        array = np.pad(array, pad, mode="edge")
+    work = array if array.dtype.kind == "f" else array.astype(np.float32)
+    halved = (
+        work[0::2, 0::2] + work[1::2, 0::2] + work[0::2, 1::2] + work[1::2, 1::2]
+    ) / 4
+    if array.dtype.kind == "f":
+        return halved.astype(array.dtype, copy=False)
+    return np.rint(halved).astype(array.dtype)
+
+
+def _build_pyramid(
+    heightmap: np.ndarray, hillshade: np.ndarray, min_size: int = LOD_MIN_SIZE
+) -> List[Level]:
+    """
+    Build the levels of detail of a heightmap and its hillshade.
+
+    Each level halves the resolution of the previous one by averaging 2x2 blocks, until the largest side of
+    the heightmap is at most 'min_size'. The hillshade is in image orientation, so its first two axes are
+    swapped relative to the heightmap, which does not change the 2x2 blocks.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    hillshade : np.ndarray
+        A three-dimensional matrix representing an RGB image.
+    min_size : int, optional
+        Default LOD_MIN_SIZE. The largest side of the coarsest level.
+
+    Returns:
+    ----------
+    List[Tuple[np.ndarray, np.ndarray]]
+        The (heightmap, hillshade) pairs from the full resolution (the input arrays) to the coarsest level.
+    """
+    if hillshade.shape[:2] != heightmap.shape[::-1]:
+        raise ValueError("hillshade dimensions do not match heightmap")
+    levels = [(heightmap, hillshade)]
+    while max(levels[-1][0].shape) > min_size:
+        levels.append(tuple(_halve(array) for array in levels[-1]))
+    return levels
+
+
+def _window_pixels(windowsize: Union[int, Sequence[int]]) -> int:
+    """Return the largest side in pixels of an rgl window of a 'windowsize'."""
+    if isinstance(windowsize, (int, np.integer)):
+        return int(windowsize)
+    size = tuple(windowsize)
+    return int(max(size[-2:] if len(size) != 1 else size))
+
+
+def _select_level(
+    shapes: Sequence[Tuple[int, int]],
+    windowsize: Union[int, Sequence[int]],
+    zoom: float,
+) -> int:
+    """
+    Return the coarsest level that still has a grid point per pixel of the window.
+
+    With a zoom of 1 the whole heightmap spans the window; zooming in ('zoom' below 1) shows a fraction of it
+    across the window and so needs a proportionally finer level.
+
+    Parameters:
+    ----------
+    shapes : Sequence[Tuple[int, int]]
+        The heightmap shapes of the levels, from the finest to the coarsest.
+    windowsize : Union[int, Sequence[int]]
+        The 'windowsize' of 'plot_3d'.
+    zoom : float
+        The 'zoom' of 'plot_3d'.
+
+    Returns:
+    ----------
+    int
+        The index of the level.
+    """
+    if zoom <= 0:
+        raise ValueError("zoom must be positive.")
+    needed = _window_pixels(windowsize) / zoom
+    level = 0
+    for index, shape in enumerate(shapes):
+        if max(shape) >= needed:
+            level = index
+    return level
@@ -0,0 +1,407 @@
+"""Triangle meshes of heightmaps, built and written with NumPy."""
+
+import io
+import json
+import os
+import struct
+from typing import BinaryIO, NamedTuple, Optional, TextIO
+
+import numpy as np
+from matplotlib import image as mpimg
+
+from .helpers import _row_chunks, _to_hillshade_dtype
+
+
+class TerrainMesh(NamedTuple):
+    """
+    A triangulated heightmap.
+
+    'vertices' are (x, y, z) float32 positions with y up, x along the rows and z against the columns of the
+    heightmap, centered on the origin like the rgl scenes of rayshader. 'faces' are counter-clockwise (seen
+    from above) uint32 vertex indices, 'uvs' the float32 texture coordinates of the vertices in the hillshade
+    (origin at its top-left corner) and 'indices' the flat heightmap index of each vertex.
+    """
+
+    vertices: np.ndarray
+    faces: np.ndarray
+    uvs: np.ndarray
+    indices: np.ndarray
+
+
+def _terrain_mesh(heightmap: np.ndarray, zscale: float = 1) -> TerrainMesh:
+    """
+    Build the grid mesh of a heightmap: a vertex per point and two triangles per cell.
+
+    Points that are not finite are dropped with the triangles that use them.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    zscale : float, optional
+        Default 1. The ratio between the x and y spacing and the z axis.
+
+    Returns:
+    ----------
+    TerrainMesh
+        The vertices, faces, texture coordinates and heightmap indices of the mesh.
+    """
+    if heightmap.ndim != 2 or min(heightmap.shape) < 2:
+        raise ValueError(
+            "Heightmap must be a 2D numpy array with at least 2 rows and columns."
+        )
+    if zscale <= 0:
+        raise ValueError("zscale must be positive.")
+    n_rows, n_cols = heightmap.shape
+
+    valid = np.isfinite(heightmap).ravel()
+    indices = np.flatnonzero(valid)
+    rows, cols = np.divmod(indices, n_cols)
+    vertices = np.empty((indices.size, 3), dtype=np.float32)
+    vertices[:, 0] = rows - (n_rows - 1) / 2
+    vertices[:, 1] = heightmap.ravel()[indices] / zscale
+    vertices[:, 2] = (n_cols - 1) / 2 - cols
+    uvs = np.empty((indices.size, 2), dtype=np.float32)
+    uvs[:, 0] = (rows + 0.5) / n_rows
+    uvs[:, 1] = (cols + 0.5) / n_cols
+
+    corner = np.arange(n_rows * n_cols, dtype=np.uint32).reshape(n_rows, n_cols)
+    top_left = corner[:-1, :-1].ravel()
+    top_right = corner[:-1, 1:].ravel()
+    bottom_left = corner[1:, :-1].ravel()
+    bottom_right = corner[1:, 1:].ravel()
+    faces = np.concatenate(
+        [
+            np.stack([top_left, bottom_left, top_right], axis=1),
+            np.stack([bottom_left, bottom_right, top_right], axis=1),
+        ]
+    )
+    if indices.size < valid.size:
+        faces = faces[valid[faces].all(axis=1)]
+        remap = np.cumsum(valid, dtype=np.int64) - 1
+        faces = remap[faces].astype(np.uint32)
+    return TerrainMesh(vertices, faces, uvs, indices)
+
+
+def _texture_png(hillshade: np.ndarray) -> bytes:
+    """Encode a hillshade as PNG bytes."""
+    buffer = io.BytesIO()
+    mpimg.imsave(buffer, _to_hillshade_dtype(hillshade, "uint8"), format="png")
+    return buffer.getvalue()
+
+
+def _write_rows(
+    stream: TextIO, template: str, values: np.ndarray, offset: int = 0
+) -> None:
+    """Write the rows of an array with a line template, formatting a chunk of lines at once."""
+    values = values + offset if offset else values
+    row_nbytes = 64 * values.shape[1]
+    for rows in _row_chunks(values.shape[0], row_nbytes):
+        chunk = values[rows]
+        stream.write((template * chunk.shape[0]) % tuple(chunk.ravel().tolist()))
+
+
+def _write_obj(
+    path: str, mesh: TerrainMesh, hillshade: Optional[np.ndarray] = None
+) -> None:
+    """
+    Write a mesh as a Wavefront OBJ file.
+
+    With a hillshade, the texture is written next to the file as '<name>.png' with a '<name>.mtl' material.
+
+    Parameters:
+    ----------
+    path : str
+        The path of the .obj file.
+    mesh : TerrainMesh
+        The mesh.
+    hillshade : Optional[np.ndarray], optional
+        Default None. The texture of the mesh.
+    """
+    stem = os.path.splitext(path)[0]
+    name = os.path.basename(stem)
+    with open(path, "w") as stream:
+        if hillshade is not None:
+            with open(f"{stem}.png", "wb") as texture:
+                texture.write(_texture_png(hillshade))
+            with open(f"{stem}.mtl", "w") as material:
+                material.write(
+                    f"newmtl terrain\nKa 1 1 1\nKd 1 1 1\nKs 0 0 0\nmap_Kd {name}.png\n"
+                )
+            stream.write(f"mtllib {name}.mtl\nusemtl terrain\n")
+        _write_rows(stream, "v %.6g %.6g %.6g\n", mesh.vertices)
+        if hillshade is None:
+            _write_rows(stream, "f %d %d %d\n", mesh.faces, offset=1)
+        else:
+            # OBJ texture coordinates start at the bottom-left corner
+            uvs = mesh.uvs * np.float32([1, -1]) + np.float32([0, 1])
+            _write_rows(stream, "vt %.6g %.6g\n", uvs)
+            _write_rows(
+                stream, "f %d/%d %d/%d %d/%d\n", np.repeat(mesh.faces, 2, axis=1), 1
+            )
+
+
+def _write_ply(
+    path: str, mesh: TerrainMesh, hillshade: Optional[np.ndarray] = None
+) -> None:
+    """
+    Write a mesh as a binary little-endian PLY file.
+
+    With a hillshade, each vertex gets the color of its point as 'red', 'green' and 'blue' uchar properties.
+
+    Parameters:
+    ----------
+    path : str
+        The path of the .ply file.
+    mesh : TerrainMesh
+        The mesh.
+    hillshade : Optional[np.ndarray], optional
+        Default None. The colors of the mesh.
+    """
+    fields = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if hillshade is not None:
+        fields += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+    vertices = np.empty(mesh.vertices.shape[0], dtype=fields)
+    vertices["x"], vertices["y"], vertices["z"] = mesh.vertices.T
+    if hillshade is not None:
+        # The hillshade is in image orientation: transposing it lines its pixels up with the heightmap indices
+        colors = _to_hillshade_dtype(hillshade, "uint8").transpose(1, 0, 2)
+        colors = colors.reshape(-1, 3)[mesh.indices]
+        vertices["red"], vertices["green"], vertices["blue"] = colors.T
+    faces = np.empty(mesh.faces.shape[0], dtype=[("n", "u1"), ("v", "<u4", (3,))])
+    faces["n"] = 3
+    faces["v"] = mesh.faces
+
+    properties = "".join(
+        f"property {'float' if kind == '<f4' else 'uchar'} {name}\n"
+        for name, kind in fields
+    )
+    header = (
+        "ply\nformat binary_little_endian 1.0\n"
+        f"element vertex {vertices.size}\n{properties}"
+        f"element face {faces.size}\nproperty list uchar uint vertex_indices\n"
+        "end_header\n"
+    )
+    with open(path, "wb") as stream:
+        stream.write(header.encode("ascii"))
+        stream.write(vertices.tobytes())
+        stream.write(faces.tobytes())
+
+
+def _pad4(data: bytes, fill: bytes = b"\x00") -> bytes:
+    """Pad bytes to a multiple of 4."""
+    return data + fill * (-len(data) % 4)
+
+
+def _write_glb(
+    stream: BinaryIO, mesh: TerrainMesh, hillshade: Optional[np.ndarray] = None
+) -> None:
+    """
+    Write a mesh as a binary glTF 2.0 (GLB) asset, with the hillshade embedded as a PNG texture.
+
+    Parameters:
+    ----------
+    stream : BinaryIO
+        A writable binary stream.
+    mesh : TerrainMesh
+        The mesh.
+    hillshade : Optional[np.ndarray], optional
+        Default None. The texture of the mesh.
+    """
+    blobs = [
+        np.ascontiguousarray(mesh.vertices, dtype="<f4").tobytes(),
+        np.ascontiguousarray(mesh.faces, dtype="<u4").tobytes(),
+    ]
+    if hillshade is not None:
+        blobs += [np.ascontiguousarray(mesh.uvs, dtype="<f4").tobytes()]
+        blobs += [_texture_png(hillshade)]
+    views, offset = [], 0
+    for blob in blobs:
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(blob)})
+        offset += len(_pad4(blob))
+    views[0]["target"] = 34962
+    views[1]["target"] = 34963
+
+    accessors = [
+        {
+            "bufferView": 0,
+            "componentType": 5126,
+            "count": int(mesh.vertices.shape[0]),
+            "type": "VEC3",
+            "min": mesh.vertices.min(axis=0).tolist(),
+            "max": mesh.vertices.max(axis=0).tolist(),
+        },
+        {
+            "bufferView": 1,
+            "componentType": 5125,
+            "count": int(mesh.faces.size),
+            "type": "SCALAR",
+        },
+    ]
+    primitive = {"attributes": {"POSITION": 0}, "indices": 1, "mode": 4}
+    gltf = {
+        "asset": {"version": "2.0", "generator": "rayshaderpy"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [primitive]}],
+        "accessors": accessors,
+        "bufferViews": views,
+        "buffers": [{"byteLength": offset}],
+    }
+    if hillshade is not None:
+        views[2]["target"] = 34962
+        accessors.append(
+            {
+                "bufferView": 2,
+                "componentType": 5126,
+                "count": int(mesh.uvs.shape[0]),
+                "type": "VEC2",
+            }
+        )
+        primitive["attributes"]["TEXCOORD_0"] = 2
+        primitive["material"] = 0
+        gltf["images"] = [{"bufferView": 3, "mimeType": "image/png"}]
+        gltf["textures"] = [{"source": 0}]
+        gltf["materials"] = [
+            {
+                "pbrMetallicRoughness": {
+                    "baseColorTexture": {"index": 0},
+                    "metallicFactor": 0,
+                    "roughnessFactor": 1,
+                }
+            }
+        ]
+
+    header = _pad4(json.dumps(gltf, separators=(",", ":")).encode(), b" ")
+    stream.write(struct.pack("<4sII", b"glTF", 2, 12 + 8 + len(header) + 8 + offset))
+    stream.write(struct.pack("<I4s", len(header), b"JSON"))
+    stream.write(header)
+    stream.write(struct.pack("<I4s", offset, b"BIN\x00"))
+    for blob in blobs:
+        stream.write(_pad4(blob))
+
+
+# Binary STL triangle record: normal, three vertices and an attribute byte count
+STL_RECORD = np.dtype(
+    [("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")]
+)
+
+
+def _stl_records(corners: np.ndarray) -> np.ndarray:
+    """Pack (n, 3, 3) triangle corners into binary STL records, with their unit normals."""
+    records = np.zeros(corners.shape[0], dtype=STL_RECORD)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    records["normal"] = np.divide(
+        normals, lengths, out=np.zeros_like(normals), where=lengths > 0
+    )
+    records["vertices"] = corners
+    return records
+
+
+def _perimeter(n_rows: int, n_cols: int) -> np.ndarray:
+    """Return the (row, col) grid points of the border of a grid, counter-clockwise seen from above, closed."""
+    rows, cols = np.arange(n_rows), np.arange(n_cols)
+    last_row, last_col = np.full(n_cols, n_rows - 1), np.full(n_rows, n_cols - 1)
+    return np.concatenate(
+        [
+            np.stack([last_row, cols], axis=1),
+            np.stack([rows[::-1], last_col], axis=1)[1:],
+            np.stack([np.zeros(n_cols, dtype=int), cols[::-1]], axis=1)[1:],
+            np.stack([rows, np.zeros(n_rows, dtype=int)], axis=1)[1:],
+        ]
+    )
+
+
+def _write_stl(
+    stream: BinaryIO,
+    heightmap: np.ndarray,
+    spacing: float,
+    zscale: float,
+    base: float,
+    fill: float,
+) -> int:
+    """
+    Write the watertight solid of a heightmap as binary STL, one band of rows at a time.
+
+    The solid is the top surface (two triangles per cell), a wall down to the base along every border
+    segment and a base fanned from its center to the bottom of the walls, so that every edge is shared by
+    exactly two triangles. Only a band of rows of triangles is held in memory at once. x runs along the
+    columns and y against the rows of the heightmap, and z is up.
+
+    Parameters:
+    ----------
+    stream : BinaryIO
+        A writable binary stream.
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    spacing : float
+        The distance between two grid points in the output units.
+    zscale : float
+        The ratio between the x and y spacing and the z axis.
+    base : float
+        The elevation of the bottom of the solid.
+    fill : float
+        The elevation used for the points that are not finite.
+
+    Returns:
+    ----------
+    int
+        The number of triangles written.
+    """
+    n_rows, n_cols = heightmap.shape
+    border = _perimeter(n_rows, n_cols)
+    n_triangles = 2 * (n_rows - 1) * (n_cols - 1) + 3 * (len(border) - 1)
+    if n_triangles >= 2**32:
+        raise ValueError("the solid has too many triangles for a binary STL file.")
+
+    def height(values: np.ndarray) -> np.ndarray:
+        values = np.where(np.isfinite(values), values, fill)
+        return ((values - base) / zscale * spacing).astype(np.float32)
+
+    stream.write(b"rayshaderpy binary STL".ljust(80, b" "))
+    stream.write(struct.pack("<I", n_triangles))
+
+    # Every coordinate along the rows and columns is computed once, so that the surface and the walls share
+    # their border vertices bit for bit
+    x = (np.arange(n_cols) * spacing).astype(np.float32)
+    y = (-np.arange(n_rows) * spacing).astype(np.float32)
+    row_nbytes = (n_cols - 1) * 2 * (STL_RECORD.itemsize + 4 * 9 * 4)
+    for band in _row_chunks(n_rows - 1, row_nbytes):
+        # A band of cells spans its rows of points and the first row of the next band
+        points = slice(band.start, band.stop + 1)
+        z = height(heightmap[points])
+        grid = np.empty(z.shape + (3,), dtype=np.float32)
+        grid[..., 0] = x
+        grid[..., 1] = y[points, None]
+        grid[..., 2] = z
+        top_left, top_right = grid[:-1, :-1], grid[:-1, 1:]
+        bottom_left, bottom_right = grid[1:, :-1], grid[1:, 1:]
+        corners = np.concatenate(
+            [
+                np.stack([top_left, bottom_left, bottom_right], axis=2),
+                np.stack([top_left, bottom_right, top_right], axis=2),
+            ],
+            axis=1,
+        )
+        stream.write(_stl_records(corners.reshape(-1, 3, 3)).tobytes())
+
+    rows, cols = border[:, 0], border[:, 1]
+    top = np.stack([x[cols], y[rows], height(heightmap[rows, cols])], axis=1)
+    bottom = top.copy()
+    bottom[:, 2] = 0
+    center = np.float32([(n_cols - 1) * spacing / 2, -(n_rows - 1) * spacing / 2, 0])
+    start, end = slice(None, -1), slice(1, None)
+    walls = np.concatenate(
+        [
+            np.stack([bottom[start], bottom[end], top[end]], axis=1),
+            np.stack([bottom[start], top[end], top[start]], axis=1),
+        ]
+    )
+    floor = np.stack(
+        [np.broadcast_to(center, bottom[start].shape), bottom[end], bottom[start]],
+        axis=1,
+    )
+    stream.write(_stl_records(np.concatenate([walls, floor])).tobytes())
+    return n_triangles
@@ -0,0 +1,150 @@
+"""Recomputation of the layers derived from a heightmap over a dirty rectangle."""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from scipy import ndimage
+
+from .helpers import _calculate_normal
+from .overlay import _flat_mask
+from .shading import _sphere_shade
+
+Window = Tuple[slice, slice]
+
+
+def _expand(window: Window, margin: int, shape: Tuple[int, int]) -> Window:
+    """Grow a window by a margin on every side, clipped to a shape."""
+    rows, cols = window
+    return (
+        slice(max(rows.start - margin, 0), min(rows.stop + margin, shape[0])),
+        slice(max(cols.start - margin, 0), min(cols.stop + margin, shape[1])),
+    )
+
+
+def _inner(window: Window, outer: Window) -> Window:
+    """Return a window relative to an enclosing window."""
+    return tuple(
+        slice(inner.start - around.start, inner.stop - around.start)
+        for inner, around in zip(window, outer)
+    )
+
+
+def _patch_normals(
+    normals: np.ndarray, heightmap: np.ndarray, window: Window, zscale: float
+) -> None:
+    """Recompute in place the normals of a window, from the heightmap around it."""
+    around = _expand(window, 1, heightmap.shape)
+    patch = _calculate_normal(heightmap[around], zscale)
+    normals[window] = patch[_inner(window, around)]
+
+
+def _patch_shade(
+    hillshade: np.ndarray, heightmap: np.ndarray, window: Window, params: Dict[str, Any]
+) -> None:
+    """
+    Re-shade in place the points of a window with sphere_shade, from the heightmap around it.
+
+    'hillshade' is in image orientation, so the window is written transposed. A 'normalvectors' parameter
+    is cut to the window like the heightmap.
+    """
+    around = _expand(window, 1, heightmap.shape)
+    params = dict(params)
+    if params.get("normalvectors") is not None:
+        params["normalvectors"] = np.ascontiguousarray(params["normalvectors"][around])
+    patch = _sphere_shade(np.ascontiguousarray(heightmap[around]), **params)
+    rows, cols = _inner(window, around)
+    hillshade[window[1], window[0]] = patch[cols, rows]
+
+
+def _patch_water(
+    watermap: np.ndarray, heightmap: np.ndarray, window: Window, params: Dict[str, Any]
+) -> Window:
+    """
+    Re-detect in place the water of a window.
+
+    The flat points are only re-classified in the window, but a body of water reaching into it can extend
+    anywhere. The labeled region therefore starts as the window (grown by one point, to catch the bodies
+    split by the edit) and is doubled until none of the groups touching the window reaches its border, so
+    that the area of every such group is exact.
+
+    Parameters:
+    ----------
+    watermap : np.ndarray
+        The watermap to update, with the shape of the heightmap.
+    heightmap : np.ndarray
+        The edited heightmap.
+    window : Tuple[slice, slice]
+        The points whose flatness may have changed.
+    params : dict
+        The 'zscale', 'cutoff', 'min_area', 'max_height' and 'normalvectors' of the detection.
+
+    Returns:
+    ----------
+    Tuple[slice, slice]
+        The region of the watermap that may have changed.
+    """
+    shape = heightmap.shape
+    seed = _expand(window, 1, shape)
+    region, margin = seed, 1
+    while True:
+        labels = _label_region(heightmap, region, params)
+        groups = np.unique(labels[_inner(seed, region)])
+        groups = groups[groups > 0]
+        open_edges = _open_edges(labels, region, shape)
+        if not np.isin(groups, open_edges).any():
+            break
+        margin *= 2
+        region = _expand(seed, margin, shape)
+
+    sizes = np.bincount(labels.ravel())
+    kept = np.zeros(sizes.size, dtype=bool)
+    kept[groups] = sizes[groups] >= params["min_area"]
+    touched = np.zeros(sizes.size, dtype=bool)
+    touched[groups] = True
+
+    target = watermap[region]
+    in_groups = touched[labels]
+    target[in_groups] = kept[labels[in_groups]]
+    inner = _inner(window, region)
+    target[inner][labels[inner] == 0] = 0
+    return region
+
+
+def _label_region(
+    heightmap: np.ndarray, region: Window, params: Dict[str, Any]
+) -> np.ndarray:
+    """Label the 4-connected flat groups of a region of a heightmap."""
+    rows, cols = region
+    around = _expand(region, 1, heightmap.shape)[1]
+    normalvectors = params.get("normalvectors")
+    if normalvectors is not None:
+        normalvectors = normalvectors[:, around]
+    mask = _flat_mask(
+        heightmap[:, around],
+        rows,
+        params["zscale"],
+        params["cutoff"],
+        params["max_height"],
+        normalvectors,
+    )
+    labels, _ = ndimage.label(mask[:, _inner((cols,), (around,))[0]])
+    return labels
+
+
+def _open_edges(
+    labels: np.ndarray, region: Window, shape: Tuple[int, int]
+) -> np.ndarray:
+    """Return the labels on the borders of a region that are not borders of the full grid."""
+    rows, cols = region
+    edges = []
+    if rows.start > 0:
+        edges.append(labels[0])
+    if rows.stop < shape[0]:
+        edges.append(labels[-1])
+    if cols.start > 0:
+        edges.append(labels[:, 0])
+    if cols.stop < shape[1]:
+        edges.append(labels[:, -1])
+    if not edges:
+        return np.empty(0, dtype=labels.dtype)
+    return np.unique(np.concatenate(edges))
@@ -0,0 +1,356 @@
+"""Vectorized rasterization of geometries into overlay coverage grids."""
+
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from rasterio import features, transform
+from scipy import ndimage
+
+from .config import CHUNK_BYTES
+
+
+def _draw_segments(
+    coverage: np.ndarray,
+    start: np.ndarray,
+    end: np.ndarray,
+    antialias: bool,
+    intensity: Optional[np.ndarray] = None,
+    labels: Optional[np.ndarray] = None,
+    label: Optional[np.ndarray] = None,
+) -> None:
+    """
+    Draw line segments into a coverage grid in place.
+
+    Each segment is sampled at sub-pixel spacing. With antialiasing the samples are splatted with bilinear
+    weights proportional to their spacing, which yields a coverage falling linearly from 1 on the line to 0
+    one pixel away. Otherwise the pixel nearest to each sample is set to 1. Segments with non-finite
+    endpoints are skipped.
+
+    Parameters:
+    ----------
+    coverage : np.ndarray
+        A two-dimensional float grid, updated in place and clipped to [0, 1].
+    start : np.ndarray
+        The (N, 2) start points of the segments as (row, column) pixel coordinates.
+    end : np.ndarray
+        The (N, 2) end points of the segments as (row, column) pixel coordinates.
+    antialias : bool
+        Whether to antialias the segments.
+    intensity : Optional[np.ndarray], optional
+        Default None, which means 1. The (N,) peak coverage of each segment, in [0, 1].
+    labels : Optional[np.ndarray], optional
+        Default None. An integer grid with the shape of 'coverage', updated in place: every pixel a segment
+        touches is raised to the label of the segment.
+    label : Optional[np.ndarray], optional
+        Default None. The (N,) labels of the segments, required with 'labels'.
+    """
+    if intensity is None:
+        intensity = np.ones(start.shape[0])
+    finite = np.isfinite(start).all(axis=1) & np.isfinite(end).all(axis=1)
+    if not finite.all():
+        start, end, intensity = start[finite], end[finite], intensity[finite]
+        label = None if label is None else label[finite]
+    if start.shape[0] == 0:
+        return
+    length = np.hypot(*(end - start).T)
+    # Samples at most half a pixel apart, so that the drawn lines have no gaps
+    counts = np.maximum(1, np.ceil(length * 2)).astype(np.intp)
+    last_sample = np.cumsum(counts)
+    bounds = np.searchsorted(
+        last_sample, np.arange(CHUNK_BYTES // 128, last_sample[-1], CHUNK_BYTES // 128)
+    )
+    for first, last in zip(np.r_[0, bounds], np.r_[bounds, start.shape[0]]):
+        if first == last:
+            continue
+        count = counts[first:last]
+        segment = np.repeat(np.arange(first, last), count)
+        offsets = np.cumsum(count) - count
+        k = np.arange(segment.size) - np.repeat(offsets, count)
+        t = (k + 0.5) / counts[segment]
+        samples = start[segment] + (end[segment] - start[segment]) * t[:, np.newaxis]
+        sample_label = None if labels is None else label[segment]
+        if antialias:
+            weight = (length * intensity / counts)[segment]
+            _splat(coverage, samples, weight, labels=labels, label=sample_label)
+        else:
+            weight = intensity[segment]
+            _splat(coverage, samples, weight, True, labels, sample_label)
+
+
+def _splat(
+    coverage: np.ndarray,
+    samples: np.ndarray,
+    weight: np.ndarray,
+    nearest: bool = False,
+    labels: Optional[np.ndarray] = None,
+    label: Optional[np.ndarray] = None,
+) -> None:
+    """
+    Accumulate weighted samples into a coverage grid.
+
+    The weights are summed bilinearly over the 4 pixels around each sample, or with 'nearest' the pixel
+    nearest to each sample is raised to the weight of the sample. With 'labels', the pixels are also raised
+    to the 'label' of the samples touching them.
+    """
+    height, width = coverage.shape
+    flat_coverage = coverage.reshape(-1)
+    if nearest:
+        finite = np.isfinite(samples).all(axis=1)
+        pixel = np.rint(samples[finite]).astype(np.intp)
+        inside = (
+            (pixel[:, 0] >= 0)
+            & (pixel[:, 0] < height)
+            & (pixel[:, 1] >= 0)
+            & (pixel[:, 1] < width)
+        )
+        index = pixel[inside, 0] * width + pixel[inside, 1]
+        # Unbuffered, so that the largest weight wins on pixels several samples round to
+        np.maximum.at(flat_coverage, index, weight[finite][inside])
+        if labels is not None:
+            np.maximum.at(labels.reshape(-1), index, label[finite][inside])
+        return
+
+    base = np.floor(samples)
+    frac = samples - base
+    base = base.astype(np.intp)
+    index, weights, touched = [], [], []
+    for d_row, d_col in ((0, 0), (0, 1), (1, 0), (1, 1)):
+        row = base[:, 0] + d_row
+        col = base[:, 1] + d_col
+        inside = (row >= 0) & (row < height) & (col >= 0) & (col < width)
+        w_row = frac[:, 0] if d_row else 1 - frac[:, 0]
+        w_col = frac[:, 1] if d_col else 1 - frac[:, 1]
+        index.append((row * width + col)[inside])
+        weights.append((weight * w_row * w_col)[inside])
+        if labels is not None:
+            touched.append(label[inside])
+    index = np.concatenate(index)
+    weights = np.concatenate(weights)
+    if index.size == 0:
+        return
+    if labels is not None:
+        np.maximum.at(labels.reshape(-1), index, np.concatenate(touched))
+
+    offset = index.min()
+    span = index.max() - offset + 1
+    if span <= 4 * index.size:
+        accumulated = np.bincount(index - offset, weights=weights, minlength=span)
+        stop = offset + span
+        target = flat_coverage[offset:stop]
+        target += accumulated.astype(coverage.dtype, copy=False)
+        np.minimum(target, 1, out=target)
+    else:
+        # Sparse samples spread over the grid, accumulate over the touched pixels only
+        index, inverse = np.unique(index, return_inverse=True)
+        accumulated = np.bincount(inverse, weights=weights)
+        flat_coverage[index] = np.minimum(flat_coverage[index] + accumulated, 1)
+
+
+def _widen_lines(coverage: np.ndarray, linewidth: Union[float, int]) -> np.ndarray:
+    """Widen the lines of a coverage (or label) grid to 'linewidth' pixels with a disk-shaped grey dilation."""
+    radius = (linewidth - 1) / 2
+    if radius < 0.5:
+        return coverage
+    extent = int(np.ceil(radius))
+    offsets = np.arange(-extent, extent + 1)
+    footprint = np.hypot(*np.meshgrid(offsets, offsets)) <= radius
+    return ndimage.grey_dilation(coverage, footprint=footprint)
+
+
+def _composite_layers(
+    shape: Tuple[int, int], layers: Iterable[Tuple[np.ndarray, np.ndarray]]
+) -> np.ndarray:
+    """
+    Composite colored coverage layers into an RGBA overlay.
+
+    Parameters:
+    ----------
+    shape : Tuple[int, int]
+        The height and width of the overlay.
+    layers : Iterable[Tuple[np.ndarray, np.ndarray]]
+        The (alpha, rgb) layers from bottom to top. 'alpha' is a (height, width) coverage in [0, 1] and 'rgb'
+        is a single color of 3 values in [0, 1] or a (height, width, 3) image.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay with values in [0, 1].
+    """
+    overlay = np.zeros(tuple(shape) + (4,), dtype=np.float32)
+    for i, (alpha, rgb) in enumerate(layers):
+        rgb = np.asarray(rgb, dtype=np.float32)
+        if i == 0:
+            overlay[..., :3] = rgb
+            overlay[..., 3] = alpha
+            continue
+        # "over" operator, on the pixels covered by the layer only
+        covered = alpha > 0
+        a = alpha[covered][:, np.newaxis]
+        below = overlay[covered]
+        out_alpha = a + below[:, 3:] * (1 - a)
+        color = rgb[covered] if rgb.ndim == 3 else rgb
+        below[:, :3] = (color * a + below[:, :3] * below[:, 3:] * (1 - a)) / out_alpha
+        below[:, 3:] = out_alpha
+        overlay[covered] = below
+    return overlay
+
+
+def _extent_bounds(extent) -> Tuple[float, float, float, float]:
+    """
+    Return the (xmin, xmax, ymin, ymax) bounds of an extent.
+
+    'extent' is a sequence (xmin, xmax, ymin, ymax) as in rayshader, or an object with 'left', 'right',
+    'bottom' and 'top' attributes such as the 'bounds' of a rasterio dataset.
+    """
+    if all(hasattr(extent, name) for name in ("left", "right", "bottom", "top")):
+        bounds = (extent.left, extent.right, extent.bottom, extent.top)
+    else:
+        bounds = tuple(extent)
+    if len(bounds) != 4:
+        raise ValueError("extent must contain 4 values (xmin, xmax, ymin, ymax)")
+    xmin, xmax, ymin, ymax = (float(b) for b in bounds)
+    if not (xmin < xmax and ymin < ymax):
+        raise ValueError("extent must satisfy xmin < xmax and ymin < ymax")
+    return xmin, xmax, ymin, ymax
+
+
+def _overlay_shape(
+    heightmap: Optional[np.ndarray],
+    width: Optional[int],
+    height: Optional[int],
+    resolution_multiply: int,
+) -> Tuple[int, int]:
+    """Return the (height, width) of an overlay, from the heightmap unless both 'width' and 'height' are given."""
+    if resolution_multiply < 1:
+        raise ValueError("resolution_multiply must be at least 1")
+    if width is None or height is None:
+        if heightmap is None:
+            raise ValueError(
+                "Either heightmap or both width and height must be provided."
+            )
+        # The heightmap is the transposed raster
+        height, width = heightmap.shape[1], heightmap.shape[0]
+    return height * resolution_multiply, width * resolution_multiply
+
+
+def _to_pixels(
+    coords: np.ndarray,
+    bounds: Tuple[float, float, float, float],
+    shape: Tuple[int, int],
+    offset: Tuple[float, float] = (0, 0),
+) -> np.ndarray:
+    """Convert (N, 2) x/y coordinates to (row, column) pixel coordinates, pixel centers being integers."""
+    xmin, xmax, ymin, ymax = bounds
+    coords = np.asarray(coords, dtype=np.float64)
+    row = (ymax - coords[:, 1] - offset[1]) * (shape[0] / (ymax - ymin)) - 0.5
+    col = (coords[:, 0] + offset[0] - xmin) * (shape[1] / (xmax - xmin)) - 0.5
+    return np.stack([row, col], axis=1)
+
+
+def _geometries(geometry) -> List[dict]:
+    """
+    Flatten GeoJSON-like input into a list of geometry dictionaries.
+
+    Accepts geometry, Feature, FeatureCollection and GeometryCollection dictionaries, objects implementing
+    '__geo_interface__' (such as shapely geometries or GeoDataFrames), and lists of those.
+    """
+    if hasattr(geometry, "__geo_interface__"):
+        geometry = geometry.__geo_interface__
+    if isinstance(geometry, (list, tuple)):
+        return [g for item in geometry for g in _geometries(item)]
+    if not isinstance(geometry, dict) or "type" not in geometry:
+        raise ValueError(
+            "geometry must be GeoJSON-like or a numpy array of coordinates"
+        )
+    kind = geometry["type"]
+    if kind == "FeatureCollection":
+        return _geometries(list(geometry["features"]))
+    if kind == "Feature":
+        return [] if geometry["geometry"] is None else _geometries(geometry["geometry"])
+    if kind == "GeometryCollection":
+        return _geometries(list(geometry["geometries"]))
+    return [geometry]
+
+
+def _geometry_parts(geometries: List[dict], kinds: Tuple[str, ...]) -> List[np.ndarray]:
+    """
+    Collect the coordinate arrays of the points, lines or polygon rings of GeoJSON-like geometries.
+
+    Points give one (1, 2) array each, lines one (k, 2) array each and polygons one (k, 2) array per ring.
+    Geometries whose type is not in 'kinds' are rejected.
+    """
+    parts = []
+    for geometry in geometries:
+        kind, coords = geometry["type"], geometry["coordinates"]
+        if kind not in kinds:
+            raise ValueError(f"geometry of type '{kind}' is not supported here")
+        if kind == "Point":
+            coords = [[coords]]
+        elif kind in ("MultiPoint", "LineString"):
+            coords = [coords]
+        elif kind == "MultiPolygon":
+            coords = [ring for polygon in coords for ring in polygon]
+        if kind == "MultiPoint":
+            parts.extend(
+                np.asarray(c, dtype=np.float64)[np.newaxis, :2] for c in coords[0]
+            )
+        else:
+            parts.extend(np.asarray(c, dtype=np.float64)[:, :2] for c in coords)
+    return parts
+
+
+def _segments(
+    lines: List[np.ndarray],
+    bounds: Tuple[float, float, float, float],
+    shape: Tuple[int, int],
+    offset: Tuple[float, float],
+    closed: bool = False,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return the (N, 2) pixel start and end points of the segments of a list of (k, 2) polylines.
+
+    If 'closed' is True, each polyline is closed with a segment from its last point back to its first one.
+    """
+    lines = [line for line in lines if len(line) > 1]
+    if not lines:
+        return np.empty((0, 2)), np.empty((0, 2))
+    points = _to_pixels(np.concatenate(lines), bounds, shape, offset)
+    last = np.cumsum([len(line) for line in lines]) - 1
+    first = np.r_[0, last[:-1] + 1]
+    # Drop the segments joining the last point of a line to the first point of the next one
+    keep = np.ones(points.shape[0] - 1, dtype=bool)
+    keep[last[:-1]] = False
+    start, end = points[:-1][keep], points[1:][keep]
+    if closed:
+        start = np.concatenate([start, points[last]])
+        end = np.concatenate([end, points[first]])
+    return start, end
+
+
+def _burn_polygons(
+    polygons: List[dict],
+    bounds: Tuple[float, float, float, float],
+    shape: Tuple[int, int],
+    offset: Tuple[float, float],
+) -> np.ndarray:
+    """
+    Rasterize polygon geometries in one rasterio.features pass.
+
+    Returns a uint32 grid holding, for each pixel, 1 + the index of the last polygon covering its center, or
+    0 outside all polygons.
+    """
+    xmin, xmax, ymin, ymax = bounds
+    affine = transform.Affine(
+        (xmax - xmin) / shape[1],
+        0,
+        xmin - offset[0],
+        0,
+        -(ymax - ymin) / shape[0],
+        ymax - offset[1],
+    )
+    shapes = [(polygon, i + 1) for i, polygon in enumerate(polygons)]
+    if not shapes:
+        return np.zeros(shape, dtype=np.uint32)
+    return features.rasterize(
+        shapes, out_shape=shape, transform=affine, fill=0, dtype="uint32"
+    )
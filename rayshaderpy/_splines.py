@@ -0,0 +1,180 @@
+"""Vectorized splines through waypoints and their arc-length resampling."""
+
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+SPLINES = ["catmull-rom", "bspline", "linear"]
+
+# Uniform cubic B-spline basis, applied to the powers (u^3, u^2, u, 1) of the segment parameter
+_BSPLINE_BASIS = (
+    np.array([[-1, 3, -3, 1], [3, -6, 3, 0], [-3, 0, 3, 0], [1, 4, 1, 0]]) / 6
+)
+
+
+def _dedupe(points: np.ndarray) -> np.ndarray:
+    """Drop the waypoints equal to the previous one, which would make zero-length segments."""
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return points[keep]
+
+
+def _catmull_rom(points: np.ndarray, samples: int, alpha: float = 0.5) -> np.ndarray:
+    """
+    Sample the Catmull-Rom spline through waypoints.
+
+    All the segments are evaluated at once with the Barry-Goldman recursion. The end tangents come from
+    waypoints mirrored past the ends.
+
+    Parameters:
+    ----------
+    points : np.ndarray
+        The (n, d) waypoints, n >= 2, without consecutive duplicates.
+    samples : int
+        The number of samples per segment.
+    alpha : float, optional
+        Default 0.5 (centripetal, which avoids cusps and self-intersections). 0 gives the uniform spline and 1
+        the chordal one.
+
+    Returns:
+    ----------
+    np.ndarray
+        The ((n - 1) * samples + 1, d) samples, from the first to the last waypoint.
+    """
+    padded = np.concatenate(
+        [2 * points[:1] - points[1:2], points, 2 * points[-1:] - points[-2:-1]]
+    )
+    windows = sliding_window_view(padded, 4, axis=0)
+    p0, p1, p2, p3 = (windows[:, None, :, i] for i in range(4))
+    # Knot intervals, kept away from zero for coincident mirrored points
+    d01, d12, d23 = (
+        np.maximum(np.linalg.norm(b - a, axis=2, keepdims=True) ** alpha, 1e-12)
+        for a, b in ((p0, p1), (p1, p2), (p2, p3))
+    )
+    t0, t1 = -d01, 0
+    t2, t3 = d12, d12 + d23
+    t = (np.arange(samples) / samples)[None, :, None] * d12
+
+    a1 = ((t1 - t) * p0 + (t - t0) * p1) / (t1 - t0)
+    a2 = ((t2 - t) * p1 + (t - t1) * p2) / (t2 - t1)
+    a3 = ((t3 - t) * p2 + (t - t2) * p3) / (t3 - t2)
+    b1 = ((t2 - t) * a1 + (t - t0) * a2) / (t2 - t0)
+    b2 = ((t3 - t) * a2 + (t - t1) * a3) / (t3 - t1)
+    curve = ((t2 - t) * b1 + (t - t1) * b2) / (t2 - t1)
+    return np.concatenate([curve.reshape(-1, points.shape[1]), points[-1:]])
+
+
+def _bspline(points: np.ndarray, samples: int) -> np.ndarray:
+    """
+    Sample the uniform cubic B-spline of waypoints, clamped to the first and last waypoints.
+
+    The curve is smoother than a Catmull-Rom spline (its curvature is continuous) but only approaches the
+    inner waypoints.
+
+    Parameters:
+    ----------
+    points : np.ndarray
+        The (n, d) waypoints, n >= 2.
+    samples : int
+        The number of samples per segment.
+
+    Returns:
+    ----------
+    np.ndarray
+        The ((n + 1) * samples + 1, d) samples, from the first to the last waypoint.
+    """
+    padded = np.concatenate([points[:1], points[:1], points, points[-1:], points[-1:]])
+    controls = sliding_window_view(padded, 4, axis=0).transpose(0, 2, 1)
+    u = np.arange(samples) / samples
+    powers = np.stack([u**3, u**2, u, np.ones_like(u)], axis=1)
+    weights = powers @ _BSPLINE_BASIS
+    curve = np.einsum("sk,nkd->nsd", weights, controls)
+    return np.concatenate([curve.reshape(-1, points.shape[1]), points[-1:]])
+
+
+def _linear(points: np.ndarray, samples: int) -> np.ndarray:
+    """Sample the polyline through waypoints, 'samples' points per segment."""
+    u = (np.arange(samples) / samples)[None, :, None]
+    curve = points[:-1, None] + u * (points[1:] - points[:-1])[:, None]
+    return np.concatenate([curve.reshape(-1, points.shape[1]), points[-1:]])
+
+
+def _sample_spline(
+    points: np.ndarray, spline: str, samples: int, alpha: float = 0.5
+) -> np.ndarray:
+    """Densely sample a spline of a kind through waypoints."""
+    points = _dedupe(np.asarray(points, dtype=np.float64))
+    if len(points) < 2:
+        raise ValueError("waypoints must contain at least 2 distinct points.")
+    if spline == "catmull-rom":
+        return _catmull_rom(points, samples, alpha)
+    if spline == "bspline":
+        return _bspline(points, samples)
+    if spline == "linear":
+        return _linear(points, samples)
+    raise ValueError(f"spline must be one of {SPLINES}")
+
+
+def _track_positions(curve: np.ndarray, constant_step: bool) -> np.ndarray:
+    """Return the position of every sample along a curve: its arc length, or its index."""
+    if not constant_step:
+        return np.arange(len(curve), dtype=np.float64)
+    steps = np.linalg.norm(np.diff(curve, axis=0), axis=1)
+    return np.concatenate([[0], np.cumsum(steps)])
+
+
+def _interpolate_track(
+    curve: np.ndarray, track: np.ndarray, targets: np.ndarray
+) -> np.ndarray:
+    """
+    Interpolate a densely sampled curve at positions along it.
+
+    Positions past the end of the curve continue in the direction of its last segment.
+    """
+    points = np.stack(
+        [np.interp(targets, track, curve[:, axis]) for axis in range(curve.shape[1])],
+        axis=1,
+    )
+    beyond = targets > track[-1]
+    if beyond.any():
+        length = track[-1] - track[-2]
+        direction = (curve[-1] - curve[-2]) / length if length > 0 else 0
+        points[beyond] += (targets[beyond] - track[-1])[:, None] * direction
+    return points
+
+
+def _resample(
+    curve: np.ndarray, frames: int, constant_step: bool = True, lookahead: float = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pick evenly spaced frames along a densely sampled curve, and the points a distance ahead of them.
+
+    Parameters:
+    ----------
+    curve : np.ndarray
+        The (m, d) samples of the curve.
+    frames : int
+        The number of frames.
+    constant_step : bool, optional
+        Default True, which spaces the frames evenly by arc length (constant speed). If False, they are
+        spaced evenly in the spline parameter, so the camera slows down where waypoints are close.
+    lookahead : float, optional
+        Default 0. The distance ahead along the curve of the second points, as a fraction of its length.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, np.ndarray]
+        The (frames, d) points of the frames and the points ahead of them.
+    """
+    track = _track_positions(curve, constant_step)
+    targets = np.linspace(0, track[-1], frames)
+    points = _interpolate_track(curve, track, targets)
+    if constant_step:
+        ahead = _interpolate_track(curve, track, targets + lookahead * track[-1])
+    else:
+        # The distance ahead is still measured by arc length
+        length = _track_positions(curve, True)
+        at = np.interp(targets, track, length)
+        ahead = _interpolate_track(curve, length, at + lookahead * length[-1])
+    return points, ahead
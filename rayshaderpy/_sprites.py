@@ -0,0 +1,362 @@
+"""Cached sprites of text and map decorations, and their vectorized blits."""
+
+import functools
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from matplotlib.font_manager import FontProperties, findfont, get_font
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+
+from ._raster import _composite_layers, _widen_lines
+from .helpers import _color_to_rgb
+
+# Number of coverage samples per sprite pixel along each axis
+SUPERSAMPLE = 4
+
+
+def _rasterize_polygons(
+    polygons: Sequence[np.ndarray], height: int, width: int
+) -> np.ndarray:
+    """
+    Rasterize polygons with the even-odd rule into an antialiased coverage sprite.
+
+    Parameters:
+    ----------
+    polygons : Sequence[np.ndarray]
+        (k, 2) arrays of (column, row) vertices in sprite pixel coordinates, the top-left corner of the sprite
+        being (0, 0).
+    height : int
+        The height of the sprite.
+    width : int
+        The width of the sprite.
+
+    Returns:
+    ----------
+    np.ndarray
+        A (height, width) float32 coverage in [0, 1].
+    """
+    offsets = (np.arange(SUPERSAMPLE) + 0.5) / SUPERSAMPLE
+    rows = (np.arange(height)[:, np.newaxis] + offsets).ravel()
+    cols = (np.arange(width)[:, np.newaxis] + offsets).ravel()
+    rows, cols = np.meshgrid(rows, cols, indexing="ij")
+    points = np.column_stack([cols.ravel(), rows.ravel()])
+    inside = np.zeros(points.shape[0], dtype=bool)
+    for polygon in polygons:
+        inside ^= Path(polygon).contains_points(points)
+    inside = inside.reshape(height, SUPERSAMPLE, width, SUPERSAMPLE)
+    return inside.mean(axis=(1, 3), dtype=np.float32)
+
+
+def _font_properties(font: str, weight: str) -> FontProperties:
+    """Return the font properties of a font family name or font file path."""
+    if font.lower().endswith((".ttf", ".otf")):
+        return FontProperties(fname=font, weight=weight)
+    return FontProperties(family=[font], weight=weight)
+
+
+@functools.lru_cache(maxsize=4096)
+def _glyph_sprite(
+    char: str, size: float, font: str, weight: str
+) -> Tuple[np.ndarray, int, int, float]:
+    """
+    Render a glyph once per (character, size, font, weight).
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, int, int, float]
+        The read-only coverage sprite, the column of its left edge relative to the pen position, the row of
+        its top edge relative to the baseline (negative above it) and the advance of the pen, in pixels.
+    """
+    prop = _font_properties(font, weight)
+    face = get_font(findfont(prop))
+    face.set_size(size, 72)
+    advance = face.load_char(ord(char)).linearHoriAdvance / 65536
+    if char.isspace():
+        sprite = np.zeros((0, 0), dtype=np.float32)
+        sprite.setflags(write=False)
+        return sprite, 0, 0, advance
+
+    path = TextPath((0, 0), char, size=size, prop=prop)
+    extents = path.get_extents()
+    left, top = int(np.floor(extents.x0)), int(np.ceil(extents.y1))
+    width = int(np.ceil(extents.x1)) - left
+    height = top - int(np.floor(extents.y0))
+    # Font units grow upwards, sprite rows grow downwards
+    polygons = [
+        np.column_stack([p[:, 0] - left, top - p[:, 1]]) for p in path.to_polygons()
+    ]
+    sprite = _rasterize_polygons(polygons, height, width)
+    sprite.setflags(write=False)
+    return sprite, left, -top, advance
+
+
+@functools.lru_cache(maxsize=1024)
+def _text_sprite(
+    text: str, size: float, font: str = "sans-serif", weight: str = "normal"
+) -> Tuple[np.ndarray, int]:
+    """
+    Assemble the coverage sprite of a line of text from the cached glyph sprites.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, int]
+        The read-only coverage sprite and the row of the baseline in the sprite.
+    """
+    glyphs = [_glyph_sprite(char, size, font, weight) for char in text]
+    pen = (
+        np.concatenate([[0], np.cumsum([g[3] for g in glyphs])[:-1]]) if glyphs else []
+    )
+    placed = [
+        (sprite, int(round(x)) + left, top)
+        for (sprite, left, top, _), x in zip(glyphs, pen)
+        if sprite.size
+    ]
+    if not placed:
+        sprite = np.zeros((0, 0), dtype=np.float32)
+        sprite.setflags(write=False)
+        return sprite, 0
+
+    x0 = min(col for _, col, _ in placed)
+    y0 = min(row for _, _, row in placed)
+    width = max(col + s.shape[1] for s, col, _ in placed) - x0
+    height = max(row + s.shape[0] for s, _, row in placed) - y0
+    sprite = np.zeros((height, width), dtype=np.float32)
+    for glyph, col, row in placed:
+        top, left = row - y0, col - x0
+        bottom, right = top + glyph.shape[0], left + glyph.shape[1]
+        target = sprite[top:bottom, left:right]
+        np.maximum(target, glyph, out=target)
+    sprite.setflags(write=False)
+    return sprite, -y0
+
+
+@functools.lru_cache(maxsize=1024)
+def _halo_sprite(
+    text: str, size: float, font: str, weight: str, radius: float
+) -> Tuple[np.ndarray, int]:
+    """
+    Return the coverage sprite of the halo of a line of text, expanded by 'radius' pixels.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, int]
+        The read-only coverage sprite, padded by the halo on every side, and the padding.
+    """
+    sprite, _ = _text_sprite(text, size, font, weight)
+    pad = int(np.ceil(radius))
+    halo = _widen_lines(np.pad(sprite, pad), 2 * radius + 1)
+    halo.setflags(write=False)
+    return halo, pad
+
+
+@functools.lru_cache(maxsize=64)
+def _disk_sprite(diameter: float) -> np.ndarray:
+    """Return the read-only antialiased coverage sprite of a disk."""
+    size = int(np.ceil(diameter)) + 1
+    angle = np.linspace(0, 2 * np.pi, 64, endpoint=False)
+    circle = np.column_stack([np.cos(angle), np.sin(angle)]) * diameter / 2 + size / 2
+    sprite = _rasterize_polygons([circle], size, size)
+    sprite.setflags(write=False)
+    return sprite
+
+
+def _blit(
+    canvas: np.ndarray, sprite: np.ndarray, rows: np.ndarray, cols: np.ndarray
+) -> None:
+    """
+    Stamp a coverage sprite at many positions of a coverage canvas in one vectorized pass.
+
+    The canvas keeps the maximum coverage where stamps overlap. Stamps are clipped at the canvas edges.
+
+    Parameters:
+    ----------
+    canvas : np.ndarray
+        A two-dimensional float canvas, updated in place.
+    sprite : np.ndarray
+        A two-dimensional coverage sprite.
+    rows : np.ndarray
+        The canvas rows of the top-left corners of the stamps.
+    cols : np.ndarray
+        The canvas columns of the top-left corners of the stamps.
+    """
+    if sprite.size == 0 or len(rows) == 0:
+        return
+    height, width = canvas.shape
+    sprite_rows, sprite_cols = np.nonzero(sprite > 0)
+    values = sprite[sprite_rows, sprite_cols]
+    target_rows = np.asarray(rows, dtype=np.intp)[:, np.newaxis] + sprite_rows
+    target_cols = np.asarray(cols, dtype=np.intp)[:, np.newaxis] + sprite_cols
+    inside = (
+        (target_rows >= 0)
+        & (target_rows < height)
+        & (target_cols >= 0)
+        & (target_cols < width)
+    )
+    index = (target_rows * width + target_cols)[inside]
+    np.maximum.at(
+        canvas.reshape(-1), index, np.broadcast_to(values, inside.shape)[inside]
+    )
+
+
+def _blit_rgba(canvas: np.ndarray, sprite: np.ndarray, row: int, col: int) -> None:
+    """Composite an RGBA sprite over an RGBA canvas in place, with its top-left corner at (row, col)."""
+    height, width = canvas.shape[:2]
+    top, left = max(row, 0), max(col, 0)
+    bottom = min(row + sprite.shape[0], height)
+    right = min(col + sprite.shape[1], width)
+    if top >= bottom or left >= right:
+        return
+    target = canvas[top:bottom, left:right]
+    first_row, last_row = top - row, bottom - row
+    first_col, last_col = left - col, right - col
+    source = sprite[first_row:last_row, first_col:last_col]
+    alpha = source[..., 3:]
+    out_alpha = alpha + target[..., 3:] * (1 - alpha)
+    color = source[..., :3] * alpha + target[..., :3] * target[..., 3:] * (1 - alpha)
+    np.divide(color, out_alpha, out=target[..., :3], where=out_alpha > 0)
+    target[..., 3:] = out_alpha
+
+
+def _star_polygons(
+    radius: float, bearing: float, center: Tuple[float, float]
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """Return the left and right half-arm triangles of a four-pointed compass star, in sprite coordinates."""
+    inner = radius * 0.3
+    left_halves, right_halves = [], []
+    for arm in range(4):
+        angle = np.radians(bearing + 90 * arm)
+        side = angle + np.pi / 4
+        # Sprite rows grow downwards, north is up
+        tip = (center[0] + radius * np.sin(angle), center[1] - radius * np.cos(angle))
+        base_right = (
+            center[0] + inner * np.sin(side),
+            center[1] - inner * np.cos(side),
+        )
+        base_left = (
+            center[0] + inner * np.sin(side - np.pi / 2),
+            center[1] - inner * np.cos(side - np.pi / 2),
+        )
+        left_halves.append(np.array([center, tip, base_left]))
+        right_halves.append(np.array([center, tip, base_right]))
+    return left_halves, right_halves
+
+
+@functools.lru_cache(maxsize=64)
+def _compass_sprite(
+    radius: int,
+    bearing: float,
+    color1: str,
+    color2: str,
+    border_color: str,
+    border_width: float,
+    text_color: str,
+    text_size: float,
+    font: str,
+) -> np.ndarray:
+    """
+    Render a compass rose with its 'N' label once per style and size.
+
+    Returns:
+    ----------
+    np.ndarray
+        A read-only float32 RGBA sprite, centered on the center of the rose.
+    """
+    letter, baseline = _text_sprite("N", text_size, font, "bold")
+    margin = int(np.ceil(border_width)) + 1
+    half = radius + margin + letter.shape[0] + letter.shape[1]
+    size = 2 * half + 1
+    center = (half + 0.5, half + 0.5)
+    left_halves, right_halves = _star_polygons(radius, bearing, center)
+
+    layers = []
+    star = _rasterize_polygons(left_halves, size, size)
+    star = np.maximum(star, _rasterize_polygons(right_halves, size, size))
+    if border_width > 0:
+        layers.append(
+            (_widen_lines(star, 2 * border_width + 1), _color_to_rgb(border_color))
+        )
+    for polygons, color in ((left_halves, color1), (right_halves, color2)):
+        coverage = np.zeros((size, size), dtype=np.float32)
+        for polygon in polygons:
+            np.maximum(
+                coverage, _rasterize_polygons([polygon], size, size), out=coverage
+            )
+        layers.append((coverage, _color_to_rgb(color)))
+
+    # 'N' beyond the north tip
+    letter_canvas = np.zeros((size, size), dtype=np.float32)
+    angle = np.radians(bearing)
+    distance = radius + margin + max(letter.shape) / 2
+    row = int(round(center[1] - distance * np.cos(angle) - letter.shape[0] / 2))
+    col = int(round(center[0] + distance * np.sin(angle) - letter.shape[1] / 2))
+    _blit(letter_canvas, letter, np.array([row]), np.array([col]))
+    layers.append((letter_canvas, _color_to_rgb(text_color)))
+
+    sprite = _composite_layers((size, size), layers)
+    sprite.setflags(write=False)
+    return sprite
+
+
+@functools.lru_cache(maxsize=64)
+def _scalebar_sprite(
+    length: int,
+    thickness: int,
+    segments: int,
+    color1: str,
+    color2: str,
+    border_color: str,
+    labels: Tuple[str, ...],
+    text_color: str,
+    text_size: float,
+    font: str,
+) -> Tuple[np.ndarray, int]:
+    """
+    Render a scale bar with its labels once per style and size.
+
+    The bar alternates 'segments' boxes of 'color1' and 'color2' and the labels are centered under evenly
+    spaced ticks from the start to the end of the bar.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, int]
+        The read-only float32 RGBA sprite and the column of the start of the bar in the sprite.
+    """
+    texts = [_text_sprite(label, text_size, font) for label in labels]
+    pad = max([t.shape[1] // 2 + 1 for t, _ in texts] + [1])
+    text_height = max([t.shape[0] for t, _ in texts] + [0])
+    gap = max(2, thickness // 2)
+    height = thickness + 2 + (gap + text_height if texts else 0)
+    width = length + 2 * pad
+    bar_rows, bar_cols = slice(1, thickness + 1), slice(pad, pad + length)
+    border_cols = slice(pad - 1, pad + length + 1)
+    bar = np.zeros((height, width), dtype=np.float32)
+    bar[bar_rows, bar_cols] = 1
+    boxes = np.zeros((height, width), dtype=np.float32)
+    edges = pad + np.linspace(0, length, segments + 1).round().astype(int)
+    for first, last in zip(edges[0::2], edges[1::2]):
+        boxes[bar_rows, first:last] = 1
+    border = np.zeros((height, width), dtype=np.float32)
+    border[: thickness + 2, border_cols] = 1
+
+    text = np.zeros((height, width), dtype=np.float32)
+    ticks = (
+        np.linspace(0, length, len(labels))
+        if len(labels) > 1
+        else np.zeros(len(labels))
+    )
+    for (sprite, _), tick in zip(texts, ticks):
+        col = pad + int(round(tick)) - sprite.shape[1] // 2
+        _blit(text, sprite, np.array([thickness + 2 + gap]), np.array([col]))
+
+    sprite = _composite_layers(
+        (height, width),
+        [
+            (border, _color_to_rgb(border_color)),
+            (bar, _color_to_rgb(color2)),
+            (boxes, _color_to_rgb(color1)),
+            (text, _color_to_rgb(text_color)),
+        ],
+    )
+    sprite.setflags(write=False)
+    return sprite, pad
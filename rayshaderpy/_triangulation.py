@@ -0,0 +1,142 @@
+"""Search of the triangulation error that fits a triangle budget."""
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+import rpy2.robjects as ro
+
+from ._cache import _RESULT_CACHE, _hash_value
+from .config import TRIANGLES_PER_SECOND
+
+
+def _triangle_count(max_error: float) -> int:
+    """Count the triangles of the heightmap assigned to R as 'tune_heightmap' for an error."""
+    ro.globalenv["tune_error"] = max_error
+    return int(
+        ro.r(
+            "nrow(terrainmeshr::triangulate_matrix(tune_heightmap, maxError=tune_error, maxTriangles=0, "
+            "start_index=0, verbose=FALSE)) / 3"
+        )[0]
+    )
+
+
+def _probed_counts_key(digest: str) -> str:
+    """Return the result cache key of the triangle counts probed on a heightmap, by its content hash."""
+    return _RESULT_CACHE.key("triangle_counts", {"heightmap": (digest, str)})
+
+
+def _probed_counts(digest: str) -> Dict[float, int]:
+    """Return the triangle counts probed on a heightmap, by error, from the result cache."""
+    pairs = _RESULT_CACHE.get(_probed_counts_key(digest))
+    if pairs is None:
+        return {}
+    return {float(error): int(n) for error, n in pairs}
+
+
+def _frame_time_budget(frame_time: float) -> int:
+    """Convert a frame-time target in seconds to a triangle budget."""
+    return max(int(frame_time * TRIANGLES_PER_SECOND), 2)
+
+
+def _tune_max_error(
+    heightmap: np.ndarray,
+    triangle_budget: Optional[int] = None,
+    frame_time: Optional[float] = None,
+    tolerance: float = 0.05,
+    max_probes: int = 24,
+) -> float:
+    """
+    Search the 'max_error' of 'plot_3d' whose triangulation best fits a triangle budget.
+
+    The triangle count decreases with the error, so the search brackets the budget from the elevation
+    range down by factors of 10, then bisects the bracket in log space. Every probed count is kept per
+    heightmap, so later searches on the same heightmap (for other budgets) reuse them, and the tuned error is
+    remembered per heightmap and budget. Both live in the result cache, within its byte budget, and are
+    emptied by 'clear_cache'.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    triangle_budget : Optional[int], optional
+        Default None. The maximum number of triangles.
+    frame_time : Optional[float], optional
+        Default None. A frame-time target in seconds, converted to a triangle budget with
+        'config.TRIANGLES_PER_SECOND'. Used when 'triangle_budget' is None.
+    tolerance : float, optional
+        Default 0.05. The search stops once the count is within this fraction below the budget.
+    max_probes : int, optional
+        Default 24. The maximum number of triangulations run by a search.
+
+    Returns:
+    ----------
+    float
+        The smallest probed error whose triangulation fits the budget.
+    """
+    if triangle_budget is None:
+        if frame_time is None:
+            raise ValueError("triangle_budget or frame_time must be given.")
+        if frame_time <= 0:
+            raise ValueError("frame_time must be positive.")
+        triangle_budget = _frame_time_budget(frame_time)
+    if not isinstance(triangle_budget, (int, np.integer)) or triangle_budget < 2:
+        raise ValueError("triangle_budget must be an integer of at least 2.")
+    if heightmap.ndim != 2:
+        raise ValueError("Heightmap must be a 2D numpy array.")
+
+    digest = _hash_value(heightmap)
+    # fmt: off
+    tuned_key = _RESULT_CACHE.key("tune_max_error", {"heightmap": (digest, str),
+                                                     "triangle_budget": (int(triangle_budget), int)})
+    # fmt: on
+    tuned = _RESULT_CACHE.get(tuned_key)
+    if tuned is not None:
+        return float(tuned[0])
+    counts = _probed_counts(digest)
+    assigned = False
+
+    def count(max_error: float) -> int:
+        nonlocal assigned
+        if max_error not in counts:
+            if not assigned:
+                ro.globalenv["tune_heightmap"] = heightmap
+                assigned = True
+            counts[max_error] = _triangle_count(max_error)
+        return counts[max_error]
+
+    # Start from the tightest bracket of the budget among the errors probed by earlier searches
+    above = [error for error, n in counts.items() if n > triangle_budget]
+    within = [error for error, n in counts.items() if n <= triangle_budget]
+    probes = 0
+    if above and within and max(above) < min(within):
+        low, high = max(above), min(within)
+    else:
+        span = float(np.nanmax(heightmap) - np.nanmin(heightmap)) or 1.0
+        smallest = span * 1e-9
+        high = span
+        while count(high) > triangle_budget and probes < max_probes:
+            high *= 10
+            probes += 1
+        low = high
+        while low > smallest and count(low) <= triangle_budget and probes < max_probes:
+            high, low = low, low / 10
+            probes += 1
+
+    if count(low) <= triangle_budget:
+        best = low
+    else:
+        best = high
+        while probes < max_probes:
+            if count(best) >= triangle_budget * (1 - tolerance):
+                break
+            middle = math.sqrt(low * high)
+            probes += 1
+            if count(middle) <= triangle_budget:
+                high = best = middle
+            else:
+                low = middle
+
+    _RESULT_CACHE.put(_probed_counts_key(digest), np.array(sorted(counts.items())))
+    _RESULT_CACHE.put(tuned_key, np.array([best]))
+    return best
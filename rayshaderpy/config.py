@@ -13,6 +13,17 @@ if platform.system() == "Windows":
 else:
     R_LIBRARY_PATH = os.path.expanduser(_OTHER_R_LIBRARY_PATH)
 
+# Byte budgets and location of the result cache of the R-backed functions
+CACHE_MAX_BYTES = 256 * 1024**2
+CACHE_DISK_DIR = os.environ.get("RAYSHADERPY_CACHE_DIR")
+CACHE_DISK_MAX_BYTES = 2 * 1024**3
+
+# Upper bound of the temporary arrays allocated per chunk by the NumPy layer operations
+CHUNK_BYTES = 16 * 1024**2
+
+# Triangles per second drawn by the 3D viewer, converting frame-time targets to triangle budgets
+TRIANGLES_PER_SECOND = 100_000_000
+
 # List of required R packages
 PACKAGES_LIST = [
     "magick",
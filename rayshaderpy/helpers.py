@@ -1,14 +1,21 @@
 """Helper functions for the rayshaderpy package."""
 
-from typing import Dict, Union
+import functools
+from typing import Dict, Iterator, Optional, Tuple, Union
 
+import matplotlib.colors as mcolors
 import numpy as np
 import rasterio
 import rpy2.robjects as ro
 from rpy2.robjects import numpy2ri
 
+from .config import CHUNK_BYTES
+
 numpy2ri.activate()
 
+HEIGHTMAP_DTYPES = ["float64", "float32"]
+HILLSHADE_DTYPES = ["float64", "float32", "uint8"]
+
 
 def _assign_params(params: Dict) -> None:
     """
@@ -28,14 +35,166 @@ def _assign_params(params: Dict) -> None:
             elif all(isinstance(x, str) for x in var_value):
                 var_value = ro.StrVector(var_value)
         elif var_name == "normalvectors" and isinstance(var_value, np.ndarray):
-            var_value = numpy2ri.py2rpy(var_value)
+            if var_value.ndim == 3:
+                var_value = _normals_to_r(var_value)
+            else:
+                var_value = numpy2ri.py2rpy(var_value)
         ro.globalenv[var_name] = var_value
 
 
-def _calculate_normal():  # pragma: no cover
-    """TODO."""
-    # TODO: Implement calculate_normal functionality
-    pass
+def _calculate_normal(
+    heightmap: np.ndarray,
+    zscale: Union[float, int] = 1,
+) -> np.ndarray:
+    """
+    Calculate the unit surface normals of an elevation matrix.
+
+    The normals are computed with central differences (one-sided at the borders) in the float dtype of the
+    heightmap, so float32 heightmaps give float32 normals.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix, where each entry in the matrix is the elevation at that point. All points
+        are assumed to be evenly spaced.
+    zscale : Union[float, int], optional
+        Default 1. The ratio between the x and y spacing (which are assumed to be equal) and the z axis.
+
+    Returns:
+    ----------
+    np.ndarray
+        A (rows, columns, 3) array of unit normals. The components follow the row axis, the column axis and
+        the elevation axis of the heightmap.
+    """
+
+    # fmt: off
+    params = {"heightmap": (heightmap, np.ndarray), "zscale": (zscale, (float, int))}
+    # fmt: on
+    _validate_params(params)
+
+    if heightmap.ndim != 2:
+        raise ValueError("Heightmap must be a 2D numpy array.")
+
+    normals = np.empty(heightmap.shape + (3,), dtype=_float_dtype(heightmap))
+    normals[..., 2] = zscale
+    for axis in (0, 1):
+        if heightmap.shape[axis] > 1:
+            normals[..., axis] = np.gradient(heightmap, axis=axis)
+            np.negative(normals[..., axis], out=normals[..., axis])
+        else:
+            normals[..., axis] = 0
+    normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+    return normals
+
+
+def _normals_to_r(normals: np.ndarray) -> "ro.ListVector":
+    """
+    Convert the normals of '_calculate_normal' to the R list returned by 'rayshader::calculate_normal'.
+
+    rayshader keeps the x (row axis), y (column axis) and z (elevation axis) components in separate matrices
+    with a border of one point, which 'sphere_shade' and 'detect_water' strip. The border repeats the edge
+    normals, like the edge padding of the heightmap in rayshader.
+
+    Parameters:
+    ----------
+    normals : np.ndarray
+        A (rows, columns, 3) array of unit normals.
+
+    Returns:
+    ----------
+    ro.ListVector
+        The list of the 'x', 'y' and 'z' matrices, of shape (rows + 2, columns + 2).
+    """
+    if normals.shape[2] != 3:
+        raise ValueError("normalvectors must have 3 components.")
+    padded = np.pad(normals, ((1, 1), (1, 1), (0, 0)), mode="edge")
+    return ro.ListVector(
+        {
+            name: numpy2ri.py2rpy(np.asfortranarray(padded[..., axis]))
+            for axis, name in enumerate("xyz")
+        }
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _color_to_rgb(color: str) -> Tuple[float, float, float]:
+    """
+    Convert a color to RGB values in [0, 1].
+
+    Parameters:
+    ----------
+    color : str
+        A hexcode ('#rrggbb' or '#rrggbbaa', the alpha being ignored) or a color name known to matplotlib or R.
+
+    Returns:
+    ----------
+    Tuple[float, float, float]
+        The red, green and blue components.
+    """
+    try:
+        return tuple(float(c) for c in mcolors.to_rgb(color))
+    except ValueError:
+        pass
+    try:
+        rgb = np.asarray(ro.r("grDevices::col2rgb")(color)).ravel()
+    except Exception as e:
+        raise ValueError(f"'{color}' is not a recognized color.") from e
+    return tuple(float(c) / 255 for c in rgb[:3])
+
+
+def _float_dtype(array: np.ndarray) -> np.dtype:
+    """
+    Return the float dtype in which NumPy operations on an array are computed.
+
+    Float arrays keep their dtype; integer arrays are computed in the smallest float dtype that holds them
+    (float32 for 8 and 16 bit integers).
+    """
+    if array.dtype.kind == "f":
+        return array.dtype
+    return np.result_type(array.dtype, np.float32)
+
+
+def _hillshade_to_r(hillshade: np.ndarray) -> np.ndarray:
+    """
+    Convert a compact hillshade to the float64 representation expected by rayshader.
+
+    Parameters:
+    ----------
+    hillshade : np.ndarray
+        A hillshade with float values in [0, 1] or uint8 values in [0, 255].
+
+    Returns:
+    ----------
+    np.ndarray
+        The hillshade as float64 values in [0, 1]. Other dtypes are returned unchanged.
+    """
+    if hillshade.dtype == np.uint8:
+        converted = hillshade.astype(np.float64)
+        converted /= 255
+        return converted
+    if hillshade.dtype == np.float32:
+        return hillshade.astype(np.float64)
+    return hillshade
+
+
+def _matrix_to_image(matrix: np.ndarray) -> np.ndarray:
+    """
+    Return a view of a heightmap-shaped matrix in the orientation of the hillshade images.
+
+    Heightmaps are stored transposed with respect to the raster (see '_raster_to_matrix'), while hillshades
+    are stored as images of the raster.
+
+    Parameters:
+    ----------
+    matrix : np.ndarray
+        A two-dimensional matrix with the shape of the heightmap.
+
+    Returns:
+    ----------
+    np.ndarray
+        A view of the matrix with the shape of the hillshade image.
+    """
+    return matrix.T
 
 
 def _quit() -> None:
@@ -43,9 +202,15 @@ def _quit() -> None:
     ro.r("rgl::close3d()")
 
 
+def _rgl_open() -> bool:
+    """Check whether a 3D rendering window is open."""
+    return bool(ro.r("rgl::cur3d()")[0] != 0)
+
+
 def _raster_to_matrix(
     raster: Union[np.ndarray, str],
     interactive: bool = True,
+    dtype: Optional[str] = None,
 ) -> np.ndarray:
     """
     Convert a raster (.tif file) to a numpy.ndarray.
@@ -56,6 +221,9 @@ def _raster_to_matrix(
         The input raster data as a numpy array or a file path to a .tif file.
     interactive : bool, optional
         If True, prints the dimensions of the matrix.
+    dtype : Optional[str], optional
+        Default None, which keeps the dtype of the raster. 'float32' or 'float64' converts the raster to that
+        dtype; 'float32' halves the memory of the heightmap.
 
     Returns:
     ----------
@@ -74,6 +242,7 @@ def _raster_to_matrix(
         raise ValueError(
             "Input must be a numpy array or a string representing a file path."
         )
+    _validate_params({"dtype": (dtype, [None] + HEIGHTMAP_DTYPES)})
 
     # If raster is a string, check if it ends with .tif and read the file
     if isinstance(raster, str):
@@ -81,7 +250,7 @@ def _raster_to_matrix(
             raise ValueError("Input file must be a .tif file.")
         try:
             with rasterio.open(raster) as src:
-                raster = np.array(src.read(1))
+                raster = np.asarray(src.read(1, out_dtype=dtype))
                 raster = np.flipud(raster)
                 raster = np.rot90(raster, k=-1)
         except rasterio.errors.RasterioIOError as e:
@@ -94,6 +263,9 @@ def _raster_to_matrix(
     if raster.ndim != 2:
         raise ValueError("Input must be a 2D numpy array.")
 
+    if dtype is not None:
+        raster = raster.astype(dtype, copy=False)
+
     if interactive:
         print(f"Dimensions of matrix are {raster.shape[0]}x{raster.shape[1]}")
 
@@ -106,6 +278,60 @@ def _resize_matrix():  # pragma: no cover
     pass
 
 
+def _row_chunks(
+    n_rows: int, row_nbytes: int, chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[slice]:
+    """
+    Split the rows of an array into chunks whose temporaries stay within a byte budget.
+
+    Parameters:
+    ----------
+    n_rows : int
+        Number of rows of the array.
+    row_nbytes : int
+        Number of bytes of the temporaries allocated per row.
+    chunk_bytes : int, optional
+        Byte budget of the temporaries of a chunk.
+
+    Returns:
+    ----------
+    Iterator[slice]
+        The row slices of the chunks. Each chunk contains at least one row.
+    """
+    step = max(1, chunk_bytes // max(1, row_nbytes))
+    for start in range(0, n_rows, step):
+        yield slice(start, min(start + step, n_rows))
+
+
+def _to_hillshade_dtype(hillshade: np.ndarray, dtype: str) -> np.ndarray:
+    """
+    Convert a hillshade to a compact representation.
+
+    Parameters:
+    ----------
+    hillshade : np.ndarray
+        A hillshade with float values in [0, 1] or uint8 values in [0, 255].
+    dtype : str
+        One of 'float64', 'float32' or 'uint8'. uint8 hillshades hold values in [0, 255].
+
+    Returns:
+    ----------
+    np.ndarray
+        The hillshade in the requested dtype, or the input itself if it already has that dtype.
+    """
+    if hillshade.dtype == np.dtype(dtype):
+        return hillshade
+    if dtype == "uint8":
+        scaled = np.multiply(hillshade, 255, dtype=np.float32)
+        np.rint(scaled, out=scaled)
+        np.clip(scaled, 0, 255, out=scaled)
+        return scaled.astype(np.uint8)
+    converted = hillshade.astype(dtype)
+    if hillshade.dtype == np.uint8:
+        converted /= 255
+    return converted
+
+
 def _validate_params(params: Dict) -> None:
     """
     Validate the input variables.
@@ -1,66 +1,1263 @@
 """TODO."""
 
-from typing import Optional, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 import numpy as np
 import rpy2.robjects as ro
+from scipy import ndimage, sparse
+from scipy.sparse import csgraph
 
-from .helpers import _assign_params, _validate_params
+from ._cache import _RESULT_CACHE
+from ._raster import (
+    _burn_polygons,
+    _composite_layers,
+    _draw_segments,
+    _extent_bounds,
+    _geometries,
+    _geometry_parts,
+    _overlay_shape,
+    _segments,
+    _splat,
+    _to_pixels,
+    _widen_lines,
+)
+from ._sprites import (
+    _blit,
+    _blit_rgba,
+    _compass_sprite,
+    _disk_sprite,
+    _halo_sprite,
+    _scalebar_sprite,
+    _text_sprite,
+)
+from .helpers import (
+    HILLSHADE_DTYPES,
+    _assign_params,
+    _color_to_rgb,
+    _float_dtype,
+    _hillshade_to_r,
+    _matrix_to_image,
+    _row_chunks,
+    _to_hillshade_dtype,
+    _validate_params,
+)
+
+# Water colors matching the palettes of sphere_shade
+WATER_COLORS = {
+    "imhof1": "#defcf5",
+    "imhof2": "#337c73",
+    "imhof3": "#4e7982",
+    "imhof4": "#638d99",
+    "desert": "#caf0f7",
+    "bw": "#dddddd",
+    "unicorn": "#ff00ff",
+}
 
 
 # Functions for generating overlays to add to maps.
-def _generate_altitude_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_altitude_overlay functionality
-    pass
+# Number of elevation buckets of the elevation index, the last code marking missing elevations
+_ELEVATION_BUCKETS = 65535
+
+
+def _elevation_index(heightmap: np.ndarray) -> Tuple[np.ndarray, float, float]:
+    """
+    Bucket the elevations of a heightmap, once per heightmap content.
+
+    The elevations are quantized into uint16 codes over [minimum, maximum] in the orientation of the
+    hillshade, so that any function of the elevation can then be evaluated with a lookup table of 65536
+    entries instead of a pass of floating-point arithmetic. The codes are kept in the result cache.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix, where each entry in the matrix is the elevation at that point.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, float, float]
+        The uint16 codes, _ELEVATION_BUCKETS marking missing elevations, and the elevations of codes 0 and
+        _ELEVATION_BUCKETS - 1.
+    """
+    key = _RESULT_CACHE.key("elevation_index", {"heightmap": (heightmap, np.ndarray)})
+    codes, bounds = _RESULT_CACHE.get(key), _RESULT_CACHE.get(f"{key}-bounds")
+    if codes is not None and bounds is not None:
+        return codes, float(bounds[0]), float(bounds[1])
+
+    image = _matrix_to_image(heightmap)
+    low, high = float(np.nanmin(image)), float(np.nanmax(image))
+    scale = (_ELEVATION_BUCKETS - 1) / (high - low) if high > low else 0
+    codes = np.empty(image.shape, dtype=np.uint16)
+    for rows in _row_chunks(image.shape[0], image.shape[1] * 8):
+        chunk = np.subtract(image[rows], low, dtype=np.float64)
+        chunk *= scale
+        missing = np.isnan(chunk)
+        chunk[missing] = _ELEVATION_BUCKETS
+        np.rint(chunk, out=chunk)
+        codes[rows] = chunk
+    _RESULT_CACHE.put(key, codes)
+    _RESULT_CACHE.put(f"{key}-bounds", np.array([low, high]))
+    return codes, low, high
+
+
+def _generate_altitude_overlay(
+    hillshade: Union[np.ndarray, str],
+    heightmap: np.ndarray,
+    start_transition: Union[float, int],
+    end_transition: Optional[Union[float, int]] = None,
+    lower: bool = True,
+) -> np.ndarray:
+    """
+    Generate an overlay that is only visible below (or above) a certain altitude.
+
+    The elevations are bucketed once per heightmap (see '_elevation_index'), so generating the overlay again
+    with other transitions or colors only evaluates a lookup table over the cached buckets.
+
+    Parameters:
+    ----------
+    hillshade : Union[np.ndarray, str]
+        The image shown by the overlay: a three-dimensional RGB image in the orientation of the hillshade, with
+        float values in [0, 1] or uint8 values in [0, 255], or a single color.
+    heightmap : np.ndarray
+        A two-dimensional matrix, where each entry in the matrix is the elevation at that point.
+    start_transition : Union[float, int]
+        The elevation at which the overlay starts to fade out (or in, if 'lower' is False).
+    end_transition : Optional[Union[float, int]], optional
+        Default None, which means 'start_transition'. The elevation at which the transition ends. Between
+        'start_transition' and 'end_transition' the transparency varies linearly.
+    lower : bool, optional
+        Default True. If True, the overlay is visible below the transition, otherwise above it.
 
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
 
-def _generate_compass_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_compass_overlay functionality
-    pass
+    # fmt: off
+    params = {"hillshade": (hillshade, (np.ndarray, str)), "heightmap": (heightmap, np.ndarray),
+              "start_transition": (start_transition, (float, int)),
+              "end_transition": (end_transition, (float, int, type(None))), "lower": (lower, bool)}
+    # fmt: on
 
+    _validate_params(params)
 
-def _generate_contour_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_contour_overlay functionality
-    pass
+    if heightmap.ndim != 2:
+        raise ValueError("heightmap must be a 2D numpy array")
+    shape = heightmap.shape[::-1]
+    if isinstance(hillshade, np.ndarray):
+        _validate_hillshade(hillshade)
+        if hillshade.shape[:2] != shape:
+            raise ValueError("hillshade dimensions do not match heightmap")
+    if end_transition is None:
+        end_transition = start_transition
+    if end_transition < start_transition:
+        raise ValueError("end_transition must not be lower than start_transition")
 
+    codes, low, high = _elevation_index(heightmap)
 
-def _generate_label_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_label_overlay functionality
-    pass
+    # Visibility of each bucket, evaluated at the elevation of the bucket
+    elevation = np.linspace(low, high, _ELEVATION_BUCKETS)
+    if end_transition > start_transition:
+        visible = (elevation - start_transition) / (end_transition - start_transition)
+        np.clip(visible, 0, 1, out=visible)
+    else:
+        visible = (elevation >= start_transition).astype(np.float64)
+    if lower:
+        visible = 1 - visible
+    lookup = np.append(visible, 0).astype(np.float32)
 
+    overlay = np.empty(shape + (4,), dtype=np.float32)
+    if isinstance(hillshade, str):
+        overlay[..., :3] = _color_to_rgb(hillshade)
+    else:
+        scale = 255 if hillshade.dtype == np.uint8 else 1
+        np.divide(hillshade, scale, out=overlay[..., :3], casting="unsafe")
+    np.take(lookup, codes, out=overlay[..., 3])
+    return overlay
 
-def _generate_line_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_line_overlay functionality
-    pass
 
+def _generate_compass_overlay(
+    x: float = 0.85,
+    y: float = 0.15,
+    size: float = 0.075,
+    text_size: Optional[Union[float, int]] = None,
+    bearing: Union[float, int] = 0,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    color1: str = "white",
+    color2: str = "black",
+    text_color: str = "black",
+    border_color: str = "black",
+    border_width: Union[float, int] = 1,
+    font: str = "sans-serif",
+) -> np.ndarray:
+    """
+    Generate an overlay with a compass.
 
-def _generate_point_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_point_overlay functionality
-    pass
+    The compass is rendered once per style and size and kept in a sprite cache, so that decorating many maps
+    only blits the cached sprite.
 
+    Parameters:
+    ----------
+    x : float, optional
+        Default 0.85. The horizontal position of the center of the compass, as a fraction of the width.
+    y : float, optional
+        Default 0.15. The vertical position of the center of the compass, as a fraction of the height from the
+        bottom.
+    size : float, optional
+        Default 0.075. The radius of the compass, as a fraction of the width.
+    text_size : Optional[Union[float, int]], optional
+        Default None, which scales the 'N' with the compass. The size of the 'N', in pixels.
+    bearing : Union[float, int], optional
+        Default 0. The angle of north, in degrees clockwise from the top of the map.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    color1 : str, optional
+        Default 'white'. The color of the left half of the arms.
+    color2 : str, optional
+        Default 'black'. The color of the right half of the arms.
+    text_color : str, optional
+        Default 'black'. The color of the 'N'.
+    border_color : str, optional
+        Default 'black'. The color of the border.
+    border_width : Union[float, int], optional
+        Default 1. The width of the border, in pixels. 0 draws no border.
+    font : str, optional
+        Default 'sans-serif'. A font family or the path of a font file.
 
-def _generate_polygon_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_polygon_overlay functionality
-    pass
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
 
+    # fmt: off
+    params = {"x": (x, (float, int)), "y": (y, (float, int)), "size": (size, (float, int)),
+              "text_size": (text_size, (float, int, type(None))), "bearing": (bearing, (float, int)),
+              "heightmap": (heightmap, (np.ndarray, type(None))), "width": (width, (int, type(None))),
+              "height": (height, (int, type(None))), "color1": (color1, str), "color2": (color2, str),
+              "text_color": (text_color, str), "border_color": (border_color, str),
+              "border_width": (border_width, (float, int)), "font": (font, str)}
+    # fmt: on
 
-def _generate_scalebar_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_scalebar_overlay functionality
-    pass
+    _validate_params(params)
+
+    shape = _overlay_shape(heightmap, width, height, 1)
+    radius = int(round(size * shape[1]))
+    if radius < 1:
+        raise ValueError("size is too small for the width of the overlay")
+    if text_size is None:
+        text_size = max(6, radius * 0.6)
+
+    # fmt: off
+    sprite = _compass_sprite(radius, float(bearing), color1, color2, border_color, float(border_width), text_color,
+                             float(text_size), font)
+    # fmt: on
+    overlay = np.zeros(shape + (4,), dtype=np.float32)
+    half = sprite.shape[0] // 2
+    row = int(round((1 - y) * shape[0])) - half
+    col = int(round(x * shape[1])) - half
+    _blit_rgba(overlay, sprite, row, col)
+    return overlay
 
 
-def _generate_waterline_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement generate_polygon_overlay functionality
-    pass
+# Segments of the marching-squares cases, as pairs of cell edges (0 top, 1 right, 2 bottom, 3 left), -1 for
+# none. The case of a cell sums 8 (top-left), 4 (top-right), 2 (bottom-right) and 1 (bottom-left) over the
+# corners at or above the level. Complementary cases share their segments, so the saddle cases 5 and 10 are
+# resolved by looking up the complementary case when the cell center is at or above the level.
+_CONTOUR_SEGMENTS = np.array(
+    [
+        [[-1, -1], [-1, -1]],
+        [[3, 2], [-1, -1]],
+        [[2, 1], [-1, -1]],
+        [[3, 1], [-1, -1]],
+        [[0, 1], [-1, -1]],
+        [[0, 1], [3, 2]],
+        [[0, 2], [-1, -1]],
+        [[0, 3], [-1, -1]],
+        [[0, 3], [-1, -1]],
+        [[0, 2], [-1, -1]],
+        [[0, 3], [2, 1]],
+        [[0, 1], [-1, -1]],
+        [[3, 1], [-1, -1]],
+        [[2, 1], [-1, -1]],
+        [[3, 2], [-1, -1]],
+        [[-1, -1], [-1, -1]],
+    ]
+)
+
+
+def _contour_segments(
+    image: np.ndarray, rows: slice, levels: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Extract the contour segments of all levels in a band of cells with a single marching-squares pass.
+
+    Only the (cell, level) pairs whose level lies between the lowest and the highest corner of the cell are
+    expanded, so the work is proportional to the number of segments rather than to cells times levels.
+
+    Parameters:
+    ----------
+    image : np.ndarray
+        The two-dimensional elevation grid.
+    rows : slice
+        The rows of cells to process. Cell (i, j) has the corners (i, j) and (i + 1, j + 1).
+    levels : np.ndarray
+        The sorted contour levels.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        The (N, 2) start and end points of the segments as (row, column) grid coordinates, and the (N,) level
+        index of each segment.
+    """
+    first, last = rows.start, rows.stop + 1
+    band = image[first:last]
+    top_left, top_right = band[:-1, :-1], band[:-1, 1:]
+    bottom_left, bottom_right = band[1:, :-1], band[1:, 1:]
+    low = np.minimum(
+        np.minimum(top_left, top_right), np.minimum(bottom_left, bottom_right)
+    )
+    high = np.maximum(
+        np.maximum(top_left, top_right), np.maximum(bottom_left, bottom_right)
+    )
+
+    # Levels crossing a cell satisfy low < level <= high
+    first = np.searchsorted(levels, low.ravel(), side="right")
+    count = np.searchsorted(levels, high.ravel(), side="right") - first
+    count[~np.isfinite(low.ravel() + high.ravel())] = 0
+    cell = np.repeat(np.arange(count.size), count)
+    offsets = np.arange(cell.size) - np.repeat(np.cumsum(count) - count, count)
+    level = np.repeat(first, count) + offsets
+
+    corners = np.stack(
+        [c.ravel()[cell] for c in (top_left, top_right, bottom_right, bottom_left)]
+    )
+    value = levels[level]
+    above = corners >= value
+    case = above[0] * 8 + above[1] * 4 + above[2] * 2 + above[3]
+    saddle = (case == 5) | (case == 10)
+    center = corners[:, saddle].mean(axis=0) >= value[saddle]
+    case[np.flatnonzero(saddle)[center]] ^= 15
+
+    # Endpoints on the edges, starting corner and ending corner of each edge in the order of 'corners'
+    edge_start, edge_end = np.array([0, 1, 3, 0]), np.array([1, 2, 2, 3])
+    edge_row, edge_col = np.array([0, 0, 1, 0]), np.array([0, 1, 0, 0])
+    edge_along_row = np.array([False, True, False, True])
+    segments = _CONTOUR_SEGMENTS[case]
+    has_segment = segments[..., 0] >= 0
+    pair, which = np.nonzero(has_segment)
+    edges = segments[pair, which]
+
+    cell_row, cell_col = np.divmod(cell[pair], low.shape[1])
+    cell_row = cell_row + rows.start
+    points = []
+    for end in range(2):
+        edge = edges[:, end]
+        start_value = corners[edge_start[edge], pair]
+        end_value = corners[edge_end[edge], pair]
+        t = (value[pair] - start_value) / (end_value - start_value)
+        along_row = edge_along_row[edge]
+        point_row = cell_row + np.where(along_row, t, edge_row[edge])
+        point_col = cell_col + np.where(along_row, edge_col[edge], t)
+        points.append(np.stack([point_row, point_col], axis=1))
+    return points[0], points[1], level[pair]
+
+
+def _draw_contours(
+    coverage: np.ndarray,
+    image: np.ndarray,
+    levels: np.ndarray,
+    resolution_multiply: int,
+    antialias: bool,
+    intensity: Optional[np.ndarray] = None,
+    labels: Optional[np.ndarray] = None,
+    level_label: Optional[np.ndarray] = None,
+) -> None:
+    """
+    Draw the contour lines of an elevation grid into a coverage grid in place.
+
+    Parameters:
+    ----------
+    coverage : np.ndarray
+        A float grid with 'resolution_multiply' pixels per grid point along each axis.
+    image : np.ndarray
+        The two-dimensional elevation grid.
+    levels : np.ndarray
+        The sorted contour levels.
+    resolution_multiply : int
+        The number of coverage pixels per grid point along each axis.
+    antialias : bool
+        Whether to antialias the lines.
+    intensity : Optional[np.ndarray], optional
+        Default None, which means 1. The peak coverage of the lines of each level.
+    labels : Optional[np.ndarray], optional
+        Default None. An integer grid with the shape of 'coverage', raised in place to the label of the lines
+        drawn over each pixel.
+    level_label : Optional[np.ndarray], optional
+        Default None. The label of the lines of each level, required with 'labels'.
+    """
+    m = resolution_multiply
+    # Grid point (i, j) is the center of the block of m x m pixels starting at (i * m, j * m)
+    row_nbytes = image.shape[1] * 64 * int(np.ceil(np.sqrt(2) * m * 2))
+    for rows in _row_chunks(image.shape[0] - 1, row_nbytes):
+        start, end, level = _contour_segments(image, rows, levels)
+        start = (start + 0.5) * m - 0.5
+        end = (end + 0.5) * m - 0.5
+        segment_intensity = None if intensity is None else intensity[level]
+        segment_label = None if labels is None else level_label[level]
+        # fmt: off
+        _draw_segments(coverage, start, end, antialias, segment_intensity, labels, segment_label)
+        # fmt: on
+
+
+def _generate_contour_overlay(
+    heightmap: np.ndarray,
+    levels: Optional[Union[list, tuple, np.ndarray]] = None,
+    nlevels: Optional[int] = None,
+    resolution_multiply: int = 1,
+    color: Union[str, list, tuple] = "black",
+    linewidth: Union[float, int] = 1,
+    antialias: bool = True,
+) -> np.ndarray:
+    """
+    Calculate contours and return an overlay of the contour lines.
+
+    The contours of all levels are extracted with a single vectorized marching-squares pass per band of rows
+    and drawn into one coverage grid. With several colors, the lines also stamp the index of their color into
+    a small label grid, which is mapped to the colors of the overlay at the end.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix, where each entry in the matrix is the elevation at that point.
+    levels : Optional[Union[list, tuple, np.ndarray]], optional
+        Default None. The elevations at which contours are drawn. If None, 'nlevels' evenly spaced levels
+        between the minimum and maximum elevation are used.
+    nlevels : Optional[int], optional
+        Default None, which means 10. The number of contour levels when 'levels' is None.
+    resolution_multiply : int, optional
+        Default 1. The number of overlay pixels per heightmap point along each axis. Increase this to draw
+        smoother contours.
+    color : Union[str, list, tuple], optional
+        Default 'black'. The color of the lines, as a hexcode or recognized color string, or one color per
+        level.
+    linewidth : Union[float, int], optional
+        Default 1. The width of the lines, in overlay pixels.
+    antialias : bool, optional
+        Default True. Whether to antialias the lines.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay of shape (columns * resolution_multiply, rows * resolution_multiply, 4) in the
+        orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"heightmap": (heightmap, np.ndarray), "levels": (levels, (list, tuple, np.ndarray, type(None))),
+              "nlevels": (nlevels, (int, type(None))), "resolution_multiply": (resolution_multiply, int),
+              "color": (color, (str, list, tuple)), "linewidth": (linewidth, (float, int)),
+              "antialias": (antialias, bool)}
+    # fmt: on
+
+    _validate_params(params)
+
+    if heightmap.ndim != 2:
+        raise ValueError("heightmap must be a 2D numpy array")
+    if resolution_multiply < 1:
+        raise ValueError("resolution_multiply must be at least 1")
+    if linewidth <= 0:
+        raise ValueError("linewidth must be positive")
+
+    if levels is None:
+        nlevels = 10 if nlevels is None else nlevels
+        if nlevels < 1:
+            raise ValueError("nlevels must be at least 1")
+        levels = np.linspace(np.nanmin(heightmap), np.nanmax(heightmap), nlevels + 2)[
+            1:-1
+        ]
+    levels = np.asarray(levels, dtype=np.float64).ravel()
+    colors = [color] * levels.size if isinstance(color, str) else list(color)
+    if len(colors) != levels.size:
+        raise ValueError("color must be a single color or one color per level")
+    order = np.argsort(levels, kind="stable")
+    levels = levels[order]
+    colors = [colors[i] for i in order]
+
+    image = _matrix_to_image(heightmap)
+    shape = (image.shape[0] * resolution_multiply, image.shape[1] * resolution_multiply)
+    palette = list(dict.fromkeys(colors))
+    coverage = np.zeros(shape, dtype=np.float32)
+    if len(palette) == 1:
+        _draw_contours(coverage, image, levels, resolution_multiply, antialias)
+        return _composite_layers(
+            shape, [(_widen_lines(coverage, linewidth), _color_to_rgb(palette[0]))]
+        )
+
+    # Label 0 is no line, label i + 1 the color palette[i]; where lines overlap the later color wins
+    level_label = np.array([palette.index(c) + 1 for c in colors])
+    labels = np.zeros(shape, dtype=np.min_scalar_type(len(palette)))
+    # fmt: off
+    _draw_contours(coverage, image, levels, resolution_multiply, antialias, labels=labels, level_label=level_label)
+    # fmt: on
+    alpha = _widen_lines(coverage, linewidth)
+    labels = _widen_lines(labels, linewidth)
+    lut = np.array([_color_to_rgb(c) for c in palette[:1] + palette], dtype=np.float32)
+    overlay = np.empty(shape + (4,), dtype=np.float32)
+    for rows in _row_chunks(shape[0], shape[1] * 16):
+        overlay[rows, :, :3] = lut[labels[rows]]
+        overlay[rows, :, 3] = alpha[rows]
+    return overlay
+
+
+def _generate_label_overlay(
+    labels: Union[str, list, tuple],
+    x: Union[float, int, list, tuple, np.ndarray],
+    y: Union[float, int, list, tuple, np.ndarray],
+    extent: Any,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    text_size: Union[float, int] = 12,
+    color: str = "black",
+    font: str = "sans-serif",
+    weight: str = "normal",
+    offset: Tuple[float, float] = (0, 0),
+    halo_color: Optional[str] = None,
+    halo_expand: Union[float, int] = 1,
+    halo_alpha: Union[float, int] = 1,
+    point_size: Union[float, int] = 0,
+    point_color: str = "black",
+) -> np.ndarray:
+    """
+    Generate an overlay of text labels.
+
+    The glyphs and labels are rendered once per font, size and weight and kept in a sprite cache. All the
+    occurrences of a label are stamped into the overlay with a single vectorized blit.
+
+    Parameters:
+    ----------
+    labels : Union[str, list, tuple]
+        The text of the labels, or a single text for all positions.
+    x : Union[float, int, list, tuple, np.ndarray]
+        The x coordinates of the labels, in units of the extent.
+    y : Union[float, int, list, tuple, np.ndarray]
+        The y coordinates of the labels, in units of the extent.
+    extent : Any
+        The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+        'top' attributes such as the 'bounds' of a rasterio dataset.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    text_size : Union[float, int], optional
+        Default 12. The size of the text, in pixels.
+    color : str, optional
+        Default 'black'. The color of the text.
+    font : str, optional
+        Default 'sans-serif'. A font family or the path of a font file.
+    weight : str, optional
+        Default 'normal'. The weight of the font, such as 'bold'.
+    offset : Tuple[float, float], optional
+        Default (0, 0). The horizontal and vertical offset of the labels from their points, in units of the
+        extent.
+    halo_color : Optional[str], optional
+        Default None. If given, the color of a halo drawn around the text.
+    halo_expand : Union[float, int], optional
+        Default 1. The width of the halo, in pixels.
+    halo_alpha : Union[float, int], optional
+        Default 1. The opacity of the halo.
+    point_size : Union[float, int], optional
+        Default 0. If positive, the diameter in pixels of a point drawn at the (x, y) position of each label.
+    point_color : str, optional
+        Default 'black'. The color of the points.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"labels": (labels, (str, list, tuple)), "x": (x, (float, int, list, tuple, np.ndarray)),
+              "y": (y, (float, int, list, tuple, np.ndarray)), "extent": (extent, object),
+              "heightmap": (heightmap, (np.ndarray, type(None))), "width": (width, (int, type(None))),
+              "height": (height, (int, type(None))), "text_size": (text_size, (float, int)), "color": (color, str),
+              "font": (font, str), "weight": (weight, str), "offset": (offset, (tuple, list)),
+              "halo_color": (halo_color, Optional[str]), "halo_expand": (halo_expand, (float, int)),
+              "halo_alpha": (halo_alpha, (float, int)), "point_size": (point_size, (float, int)),
+              "point_color": (point_color, str)}
+    # fmt: on
+
+    _validate_params(params)
+
+    bounds = _extent_bounds(extent)
+    shape = _overlay_shape(heightmap, width, height, 1)
+    coords = np.column_stack([np.ravel(x), np.ravel(y)]).astype(np.float64)
+    texts = [labels] * coords.shape[0] if isinstance(labels, str) else list(labels)
+    if len(texts) != coords.shape[0]:
+        raise ValueError("labels, x and y must have the same length")
+    if not 0 <= halo_alpha <= 1:
+        raise ValueError("halo_alpha must be between 0 and 1")
+
+    points = _to_pixels(coords, bounds, shape)
+    anchors = _to_pixels(coords, bounds, shape, offset)
+    text = np.zeros(shape, dtype=np.float32)
+    halo = np.zeros(shape, dtype=np.float32) if halo_color is not None else None
+    names = np.array(texts, dtype=object)
+    for name in dict.fromkeys(texts):
+        where = anchors[names == name]
+        sprite, _ = _text_sprite(name, float(text_size), font, weight)
+        # Labels are centered on their anchor
+        rows = np.rint(where[:, 0] - sprite.shape[0] / 2).astype(np.intp)
+        cols = np.rint(where[:, 1] - sprite.shape[1] / 2).astype(np.intp)
+        _blit(text, sprite, rows, cols)
+        if halo is not None:
+            halo_sprite, pad = _halo_sprite(
+                name, float(text_size), font, weight, float(halo_expand)
+            )
+            _blit(halo, halo_sprite, rows - pad, cols - pad)
+
+    layers = []
+    if point_size > 0:
+        disk = _disk_sprite(float(point_size))
+        marks = np.zeros(shape, dtype=np.float32)
+        corner = np.rint(points - disk.shape[0] / 2 + 0.5).astype(np.intp)
+        _blit(marks, disk, corner[:, 0], corner[:, 1])
+        layers.append((marks, _color_to_rgb(point_color)))
+    if halo is not None:
+        layers.append((halo * halo_alpha, _color_to_rgb(halo_color)))
+    layers.append((text, _color_to_rgb(color)))
+    return _composite_layers(shape, layers)
+
+
+def _line_parts(geometry) -> List[np.ndarray]:
+    """Return the (k, 2) coordinate arrays of a numpy array, a list of numpy arrays or GeoJSON-like input."""
+    if isinstance(geometry, np.ndarray):
+        geometry = [geometry]
+    if isinstance(geometry, (list, tuple)) and all(
+        isinstance(g, np.ndarray) for g in geometry
+    ):
+        for part in geometry:
+            if part.ndim != 2 or part.shape[1] < 2:
+                raise ValueError("coordinate arrays must have shape (n, 2)")
+        return [part[:, :2] for part in geometry]
+    return _geometry_parts(
+        _geometries(geometry),
+        ("LineString", "MultiLineString", "Polygon", "MultiPolygon"),
+    )
+
+
+def _generate_line_overlay(
+    geometry: Any,
+    extent: Any,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    color: str = "black",
+    linewidth: Union[float, int] = 1,
+    offset: Tuple[float, float] = (0, 0),
+    resolution_multiply: int = 1,
+    antialias: bool = True,
+) -> np.ndarray:
+    """
+    Generate an overlay of lines.
+
+    All the segments of all the lines are drawn in a single vectorized pass, so layers with millions of
+    features are rasterized without a per-feature loop.
+
+    Parameters:
+    ----------
+    geometry : Any
+        The lines, as a (n, 2) array of x/y coordinates, a list of such arrays, or GeoJSON-like input
+        (LineString or MultiLineString geometries, Features, a FeatureCollection, or objects implementing
+        '__geo_interface__').
+    extent : Any
+        The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+        'top' attributes such as the 'bounds' of a rasterio dataset.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    color : str, optional
+        Default 'black'. The color of the lines.
+    linewidth : Union[float, int], optional
+        Default 1. The width of the lines, in overlay pixels.
+    offset : Tuple[float, float], optional
+        Default (0, 0). The horizontal and vertical offset applied to the lines, in units of the geometry.
+    resolution_multiply : int, optional
+        Default 1. The number of overlay pixels per heightmap point along each axis.
+    antialias : bool, optional
+        Default True. Whether to antialias the lines.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"extent": (extent, object), "heightmap": (heightmap, (np.ndarray, type(None))),
+              "width": (width, (int, type(None))), "height": (height, (int, type(None))), "color": (color, str),
+              "linewidth": (linewidth, (float, int)), "offset": (offset, (tuple, list)),
+              "resolution_multiply": (resolution_multiply, int), "antialias": (antialias, bool)}
+    # fmt: on
+
+    _validate_params(params)
+
+    bounds = _extent_bounds(extent)
+    shape = _overlay_shape(heightmap, width, height, resolution_multiply)
+    start, end = _segments(_line_parts(geometry), bounds, shape, offset)
+
+    coverage = np.zeros(shape, dtype=np.float32)
+    _draw_segments(coverage, start, end, antialias)
+    return _composite_layers(
+        shape, [(_widen_lines(coverage, linewidth), _color_to_rgb(color))]
+    )
+
+
+def _generate_point_overlay(
+    geometry: Any,
+    extent: Any,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    color: str = "black",
+    size: Union[float, int] = 1,
+    offset: Tuple[float, float] = (0, 0),
+    resolution_multiply: int = 1,
+) -> np.ndarray:
+    """
+    Generate an overlay of points.
+
+    All the points are burned into the overlay in a single vectorized pass, so layers with millions of
+    features are rasterized without a per-feature loop.
+
+    Parameters:
+    ----------
+    geometry : Any
+        The points, as a (n, 2) array of x/y coordinates or GeoJSON-like input (Point or MultiPoint
+        geometries, Features, a FeatureCollection, or objects implementing '__geo_interface__').
+    extent : Any
+        The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+        'top' attributes such as the 'bounds' of a rasterio dataset.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    color : str, optional
+        Default 'black'. The color of the points.
+    size : Union[float, int], optional
+        Default 1. The diameter of the points, in overlay pixels.
+    offset : Tuple[float, float], optional
+        Default (0, 0). The horizontal and vertical offset applied to the points, in units of the geometry.
+    resolution_multiply : int, optional
+        Default 1. The number of overlay pixels per heightmap point along each axis.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"extent": (extent, object), "heightmap": (heightmap, (np.ndarray, type(None))),
+              "width": (width, (int, type(None))), "height": (height, (int, type(None))), "color": (color, str),
+              "size": (size, (float, int)), "offset": (offset, (tuple, list)),
+              "resolution_multiply": (resolution_multiply, int)}
+    # fmt: on
+
+    _validate_params(params)
+
+    bounds = _extent_bounds(extent)
+    shape = _overlay_shape(heightmap, width, height, resolution_multiply)
+    if isinstance(geometry, np.ndarray):
+        if geometry.ndim != 2 or geometry.shape[1] < 2:
+            raise ValueError("geometry must have shape (n, 2)")
+        coords = geometry[:, :2]
+    else:
+        parts = _geometry_parts(_geometries(geometry), ("Point", "MultiPoint"))
+        coords = np.concatenate(parts) if parts else np.empty((0, 2))
+
+    coverage = np.zeros(shape, dtype=np.float32)
+    for batch in _row_chunks(coords.shape[0], 128):
+        pixels = _to_pixels(coords[batch], bounds, shape, offset)
+        _splat(coverage, pixels, np.ones(pixels.shape[0]), nearest=True)
+    return _composite_layers(
+        shape, [(_widen_lines(coverage, size), _color_to_rgb(color))]
+    )
+
+
+def _generate_polygon_overlay(
+    geometry: Any,
+    extent: Any,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    palette: Union[str, list, tuple] = "white",
+    linecolor: Optional[str] = "black",
+    linewidth: Union[float, int] = 1,
+    offset: Tuple[float, float] = (0, 0),
+    resolution_multiply: int = 1,
+    antialias: bool = True,
+) -> np.ndarray:
+    """
+    Generate an overlay of filled polygons.
+
+    The polygons are filled in a single rasterio.features pass and their outlines are drawn in a single
+    vectorized pass, so layers with millions of features are rasterized without a per-feature loop.
+
+    Parameters:
+    ----------
+    geometry : Any
+        The polygons, as a list of (n, 2) arrays of x/y coordinates (one exterior ring per polygon) or
+        GeoJSON-like input (Polygon or MultiPolygon geometries, Features, a FeatureCollection, or objects
+        implementing '__geo_interface__').
+    extent : Any
+        The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+        'top' attributes such as the 'bounds' of a rasterio dataset.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    palette : Union[str, list, tuple], optional
+        Default 'white'. The fill color of the polygons, or one fill color per polygon.
+    linecolor : Optional[str], optional
+        Default 'black'. The color of the outlines. If None, no outline is drawn.
+    linewidth : Union[float, int], optional
+        Default 1. The width of the outlines, in overlay pixels.
+    offset : Tuple[float, float], optional
+        Default (0, 0). The horizontal and vertical offset applied to the polygons, in units of the geometry.
+    resolution_multiply : int, optional
+        Default 1. The number of overlay pixels per heightmap point along each axis.
+    antialias : bool, optional
+        Default True. Whether to antialias the outlines.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"extent": (extent, object), "heightmap": (heightmap, (np.ndarray, type(None))),
+              "width": (width, (int, type(None))), "height": (height, (int, type(None))),
+              "palette": (palette, (str, list, tuple)), "linecolor": (linecolor, Optional[str]),
+              "linewidth": (linewidth, (float, int)), "offset": (offset, (tuple, list)),
+              "resolution_multiply": (resolution_multiply, int), "antialias": (antialias, bool)}
+    # fmt: on
+
+    _validate_params(params)
+
+    bounds = _extent_bounds(extent)
+    shape = _overlay_shape(heightmap, width, height, resolution_multiply)
+    if isinstance(geometry, (list, tuple)) and all(
+        isinstance(g, np.ndarray) for g in geometry
+    ):
+        rings = _line_parts(list(geometry))
+        polygons = []
+        for ring in rings:
+            coords = ring.tolist()
+            if coords[0] != coords[-1]:
+                coords.append(coords[0])
+            polygons.append({"type": "Polygon", "coordinates": [coords]})
+        closed = True
+    else:
+        polygons = _geometries(geometry)
+        rings = _geometry_parts(polygons, ("Polygon", "MultiPolygon"))
+        closed = False
+
+    palette = [palette] * len(polygons) if isinstance(palette, str) else list(palette)
+    if len(palette) != len(polygons):
+        raise ValueError("palette must be a single color or one color per polygon")
+
+    index = _burn_polygons(polygons, bounds, shape, offset)
+    fill_colors = np.array(
+        [(0, 0, 0)] + [_color_to_rgb(c) for c in palette], dtype=np.float32
+    )
+    layers = [((index > 0).astype(np.float32), fill_colors[index])]
+
+    if linecolor is not None and linewidth > 0:
+        start, end = _segments(rings, bounds, shape, offset, closed)
+        coverage = np.zeros(shape, dtype=np.float32)
+        _draw_segments(coverage, start, end, antialias)
+        layers.append((_widen_lines(coverage, linewidth), _color_to_rgb(linecolor)))
+
+    return _composite_layers(shape, layers)
+
+
+def _generate_scalebar_overlay(
+    extent: Any,
+    length: Union[float, int],
+    x: float = 0.05,
+    y: float = 0.05,
+    heightmap: Optional[np.ndarray] = None,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    thickness: Optional[int] = None,
+    segments: int = 2,
+    unit: str = "m",
+    labels: Optional[Union[list, tuple]] = None,
+    text_size: Optional[Union[float, int]] = None,
+    color1: str = "white",
+    color2: str = "black",
+    border_color: str = "black",
+    text_color: str = "black",
+    font: str = "sans-serif",
+) -> np.ndarray:
+    """
+    Generate an overlay with a scale bar.
+
+    The scale bar is rendered once per style and size and kept in a sprite cache, so that decorating many
+    maps only blits the cached sprite.
+
+    Parameters:
+    ----------
+    extent : Any
+        The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+        'top' attributes such as the 'bounds' of a rasterio dataset.
+    length : Union[float, int]
+        The length of the scale bar, in units of the extent.
+    x : float, optional
+        Default 0.05. The horizontal position of the start of the bar, as a fraction of the width.
+    y : float, optional
+        Default 0.05. The vertical position of the bottom of the bar and its labels, as a fraction of the height
+        from the bottom.
+    heightmap : Optional[np.ndarray], optional
+        Default None. The heightmap of the map, which sets the size of the overlay if 'width' or 'height' is
+        missing.
+    width : Optional[int], optional
+        Default None. The width of the overlay.
+    height : Optional[int], optional
+        Default None. The height of the overlay.
+    thickness : Optional[int], optional
+        Default None, which means 1.5% of the height. The thickness of the bar, in pixels.
+    segments : int, optional
+        Default 2. The number of alternating boxes of the bar.
+    unit : str, optional
+        Default 'm'. The unit appended to the last default label.
+    labels : Optional[Union[list, tuple]], optional
+        Default None, which labels the start, the middle and the end of the bar. The labels, evenly spaced
+        along the bar.
+    text_size : Optional[Union[float, int]], optional
+        Default None, which means twice the thickness. The size of the labels, in pixels.
+    color1 : str, optional
+        Default 'white'. The color of the odd boxes of the bar.
+    color2 : str, optional
+        Default 'black'. The color of the even boxes of the bar.
+    border_color : str, optional
+        Default 'black'. The color of the border of the bar.
+    text_color : str, optional
+        Default 'black'. The color of the labels.
+    font : str, optional
+        Default 'sans-serif'. A font family or the path of a font file.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"extent": (extent, object), "length": (length, (float, int)), "x": (x, (float, int)),
+              "y": (y, (float, int)), "heightmap": (heightmap, (np.ndarray, type(None))),
+              "width": (width, (int, type(None))), "height": (height, (int, type(None))),
+              "thickness": (thickness, (int, type(None))), "segments": (segments, int), "unit": (unit, str),
+              "labels": (labels, (list, tuple, type(None))), "text_size": (text_size, (float, int, type(None))),
+              "color1": (color1, str), "color2": (color2, str), "border_color": (border_color, str),
+              "text_color": (text_color, str), "font": (font, str)}
+    # fmt: on
+
+    _validate_params(params)
+
+    xmin, xmax, _, _ = _extent_bounds(extent)
+    shape = _overlay_shape(heightmap, width, height, 1)
+    if length <= 0:
+        raise ValueError("length must be positive")
+    if segments < 1:
+        raise ValueError("segments must be at least 1")
+    bar_length = int(round(length / (xmax - xmin) * shape[1]))
+    if bar_length < 1:
+        raise ValueError("length is too small for the extent of the overlay")
+    if thickness is None:
+        thickness = max(2, int(round(shape[0] * 0.015)))
+    if text_size is None:
+        text_size = max(6, 2 * thickness)
+    if labels is None:
+        labels = ("0", f"{length / 2:g}", f"{length:g} {unit}".strip())
+
+    # fmt: off
+    sprite, pad = _scalebar_sprite(bar_length, thickness, segments, color1, color2, border_color,
+                                   tuple(str(label) for label in labels), text_color, float(text_size), font)
+    # fmt: on
+    overlay = np.zeros(shape + (4,), dtype=np.float32)
+    row = int(round((1 - y) * shape[0])) - sprite.shape[0]
+    col = int(round(x * shape[1])) - pad
+    _blit_rgba(overlay, sprite, row, col)
+    return overlay
+
+
+def _water_distance(
+    heightmap: np.ndarray,
+    boolean: bool,
+    zscale: Union[float, int],
+    cutoff: float,
+    min_area: Optional[float],
+    max_height: Optional[float],
+) -> np.ndarray:
+    """
+    Compute the distance of every point to the nearest water, relative to the largest distance.
+
+    The water mask comes from 'detect_water' (or is the heightmap itself if 'boolean' is True) and the
+    distance field, in the orientation of the hillshade, is kept in the result cache so that waterlines
+    with other breaks, colors or widths reuse it.
+    """
+    # fmt: off
+    params = {"heightmap": (heightmap, np.ndarray), "boolean": (boolean, bool), "zscale": (zscale, (float, int)),
+              "cutoff": (cutoff, (float, int)), "min_area": (min_area, (float, int, type(None))),
+              "max_height": (max_height, (float, int, type(None)))}
+    # fmt: on
+    key = _RESULT_CACHE.key("water_distance", params)
+    distance = _RESULT_CACHE.get(key)
+    if distance is not None:
+        return distance
+
+    if boolean:
+        watermap = heightmap != 0
+    else:
+        watermap = _detect_water(
+            heightmap,
+            zscale=zscale,
+            cutoff=cutoff,
+            min_area=min_area,
+            max_height=max_height,
+        )
+    land = _matrix_to_image(watermap) == 0
+    if land.all():
+        raise ValueError("No water was found in the heightmap.")
+    distance = ndimage.distance_transform_edt(land).astype(np.float32)
+    if distance.max() > 0:
+        distance /= distance.max()
+    _RESULT_CACHE.put(key, distance)
+    return distance
+
+
+def _generate_waterline_overlay(
+    heightmap: np.ndarray,
+    color: str = "white",
+    linewidth: Union[float, int] = 1,
+    boolean: bool = False,
+    min: float = 0.001,
+    max: float = 0.2,
+    breaks: int = 9,
+    evenly_spaced: bool = False,
+    fade: bool = True,
+    alpha_dist: Optional[float] = None,
+    alpha: float = 1,
+    falloff: Union[float, int] = 1.3,
+    zscale: Union[float, int] = 1,
+    cutoff: float = 0.999,
+    min_area: Optional[float] = None,
+    max_height: Optional[float] = None,
+    resolution_multiply: int = 1,
+    antialias: bool = True,
+) -> np.ndarray:
+    """
+    Generate an overlay of lines following the shorelines of bodies of water.
+
+    The waterlines are the contours of the distance to the nearest water. This distance field is computed
+    once per heightmap and water detection parameters (see '_water_distance'), so generating the overlay
+    again with other breaks, colors or widths only runs the contour pass.
+
+    Parameters:
+    ----------
+    heightmap : np.ndarray
+        A two-dimensional matrix, where each entry in the matrix is the elevation at that point. If 'boolean'
+        is True, a matrix where non-zero entries indicate water.
+    color : str, optional
+        Default 'white'. The color of the lines.
+    linewidth : Union[float, int], optional
+        Default 1. The width of the lines, in overlay pixels.
+    boolean : bool, optional
+        Default False. If True, 'heightmap' is used as the water mask instead of detecting the water.
+    min : float, optional
+        Default 0.001. The distance of the first line, as a fraction of the largest distance to water.
+    max : float, optional
+        Default 0.2. The distance of the last line, as a fraction of the largest distance to water.
+    breaks : int, optional
+        Default 9. The number of lines.
+    evenly_spaced : bool, optional
+        Default False. If True, the lines are evenly spaced between 'min' and 'max'. Otherwise the spacing
+        grows with the distance, according to 'falloff'.
+    fade : bool, optional
+        Default True. If True, the lines fade out with the distance to water.
+    alpha_dist : Optional[float], optional
+        Default None, which means 'max'. The distance at which the lines have faded out completely.
+    alpha : float, optional
+        Default 1. The opacity of the lines closest to the water.
+    falloff : Union[float, int], optional
+        Default 1.3. The exponent of the spacing of the lines when 'evenly_spaced' is False.
+    zscale : Union[float, int], optional
+        Default 1. The ratio between the x and y spacing and the z axis, used to detect the water.
+    cutoff : float, optional
+        Default 0.999. The lower limit of the z-component of the unit normal vector to be classified as water.
+    min_area : Optional[float], optional
+        Default None, which means the number of points divided by 400. Minimum area of a body of water.
+    max_height : Optional[float], optional
+        Default None. The maximum height a point can be considered to be water.
+    resolution_multiply : int, optional
+        Default 1. The number of overlay pixels per heightmap point along each axis.
+    antialias : bool, optional
+        Default True. Whether to antialias the lines.
+
+    Returns:
+    ----------
+    np.ndarray
+        A float32 RGBA overlay in the orientation of the hillshade, with values in [0, 1].
+    """
+
+    # fmt: off
+    params = {"heightmap": (heightmap, np.ndarray), "color": (color, str), "linewidth": (linewidth, (float, int)),
+              "boolean": (boolean, bool), "min": (min, (float, int)), "max": (max, (float, int)),
+              "breaks": (breaks, int), "evenly_spaced": (evenly_spaced, bool), "fade": (fade, bool),
+              "alpha_dist": (alpha_dist, (float, int, type(None))), "alpha": (alpha, (float, int)),
+              "falloff": (falloff, (float, int)), "resolution_multiply": (resolution_multiply, int),
+              "antialias": (antialias, bool)}
+    # fmt: on
+
+    _validate_params(params)
+
+    if heightmap.ndim != 2:
+        raise ValueError("heightmap must be a 2D numpy array")
+    if not 0 <= min < max <= 1:
+        raise ValueError("min and max must satisfy 0 <= min < max <= 1")
+    if breaks < 1:
+        raise ValueError("breaks must be at least 1")
+    if resolution_multiply < 1:
+        raise ValueError("resolution_multiply must be at least 1")
+
+    distance = _water_distance(heightmap, boolean, zscale, cutoff, min_area, max_height)
+
+    spacing = np.linspace(0, 1, breaks) if breaks > 1 else np.zeros(1)
+    if not evenly_spaced:
+        spacing = spacing**falloff
+    levels = min + (max - min) * spacing
+    intensity = np.full(breaks, alpha, dtype=np.float64)
+    if fade:
+        alpha_dist = max if alpha_dist is None else alpha_dist
+        intensity *= np.clip(1 - levels / alpha_dist, 0, 1) if alpha_dist > 0 else 0
+
+    shape = (
+        distance.shape[0] * resolution_multiply,
+        distance.shape[1] * resolution_multiply,
+    )
+    coverage = np.zeros(shape, dtype=np.float32)
+    _draw_contours(
+        coverage, distance, levels, resolution_multiply, antialias, intensity
+    )
+    return _composite_layers(
+        shape, [(_widen_lines(coverage, linewidth), _color_to_rgb(color))]
+    )
+
+
+def _flat_mask(
+    heightmap: np.ndarray,
+    rows: slice,
+    zscale: Union[float, int],
+    cutoff: Union[float, int],
+    max_height: Optional[Union[float, int]],
+    normalvectors: Optional[np.ndarray],
+) -> np.ndarray:
+    """Classify the points of a band of rows whose normal z-component is at least 'cutoff'."""
+    if heightmap.dtype == bool:
+        return heightmap[rows].copy()
+
+    if normalvectors is not None:
+        mask = normalvectors[rows, :, 2] >= cutoff
+    else:
+        # n_z >= cutoff  <=>  |grad(heightmap)|^2 <= (1 / cutoff^2 - 1) * zscale^2, with a one row halo
+        # so that the gradient of a band matches the gradient of the full grid.
+        start = max(rows.start - 1, 0)
+        stop = min(rows.stop + 1, heightmap.shape[0])
+        band = heightmap[start:stop].astype(_float_dtype(heightmap), copy=False)
+        slope = np.zeros(band.shape, dtype=band.dtype)
+        for axis in (0, 1):
+            if band.shape[axis] > 1:
+                gradient = np.gradient(band, axis=axis)
+                slope += np.square(gradient, out=gradient)
+        first, last = rows.start - start, rows.stop - start
+        slope = slope[first:last]
+        mask = slope <= (1 / cutoff**2 - 1) * zscale**2
+
+    if max_height is not None:
+        mask &= heightmap[rows] <= max_height
+    return mask
+
+
+def _label_bands(mask_band: Callable[[slice], np.ndarray], shape: Tuple[int, int]):
+    """
+    Label the 4-connected groups of a mask built band by band.
+
+    Each band of rows is labeled on its own, then the groups touching across band boundaries are merged.
+
+    Parameters:
+    ----------
+    mask_band : Callable[[slice], np.ndarray]
+        Function returning the boolean mask of a band of rows.
+    shape : Tuple[int, int]
+        Shape of the mask.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, np.ndarray]
+        The band labels, and the lookup table mapping them to the merged group numbers (0 is no group).
+    """
+    labels = np.zeros(shape, dtype=np.int32)
+    count = 0
+    links = []
+    for rows in _row_chunks(shape[0], shape[1] * 8 * 4):
+        band = labels[rows]
+        band_count = ndimage.label(mask_band(rows), output=band)
+        band[band > 0] += count
+        count += band_count
+        if rows.start > 0:
+            above, below = labels[rows.start - 1], labels[rows.start]
+            touching = (above > 0) & (below > 0)
+            links.append((above[touching], below[touching]))
+
+    if links:
+        above = np.concatenate([a for a, _ in links])
+        below = np.concatenate([b for _, b in links])
+        graph = sparse.coo_matrix(
+            (np.ones(above.size, dtype=np.int8), (above, below)),
+            shape=(count + 1, count + 1),
+        )
+        _, components = csgraph.connected_components(graph, directed=False)
+        # The background (label 0) is never linked, so it is alone in its component.
+        lookup = components.astype(np.int32) + 1
+        lookup[0] = 0
+    else:
+        lookup = np.arange(count + 1, dtype=np.int32)
+    return labels, lookup
 
 
 def _detect_water(
@@ -72,6 +1269,7 @@ def _detect_water(
     normalvectors: Optional[np.ndarray] = None,
     keep_groups: bool = False,
     progbar: bool = False,
+    method: str = "numpy",
 ) -> np.ndarray:
     """
     Detect bodies of water (of a user-defined minimum size) within an elevation matrix.
@@ -90,7 +1288,7 @@ def _detect_water(
         Default 0.999. The lower limit of the z-component of the unit normal vector to be classified as water.
     min_area : Optional[float], optional
         Minimum area (in units of the height matrix x and y spacing) to be considered a body of water.
-        If None, min_area is set to length(heightmap)/400.
+        If None, min_area is set to length(heightmap)/400, i.e. the number of points divided by 400.
     max_height : Optional[float], optional
         Default None. If passed, this number will specify the maximum height a point can be considered to be
         water.
@@ -99,6 +1297,9 @@ def _detect_water(
         this will speed up water detection.
     keep_groups : bool, optional
         Default False. If True, the matrix returned will retain the numbered grouping information.
+    method : str, optional
+        Default 'numpy'. 'numpy' classifies and labels the water in NumPy/SciPy, in bands of rows whose groups
+        are merged across band boundaries. 'r' calls 'rayshader::detect_water'.
 
     Returns:
     ----------
@@ -107,50 +1308,290 @@ def _detect_water(
     """
 
     if min_area is None:
-        min_area = len(heightmap) / 400
+        min_area = heightmap.size / 400 if isinstance(heightmap, np.ndarray) else 0
 
     # fmt: off
     params = {"heightmap": (heightmap, np.ndarray), "zscale": (zscale, (float, int)), "cutoff": (cutoff, (float, int)),
               "min_area": (min_area, (float, int)), "max_height": (max_height, Optional[Union[float, int]]),
               "normalvectors": (normalvectors, Optional[np.ndarray]), "keep_groups": (keep_groups, bool),
-              "progbar": (progbar, bool),
+              "progbar": (progbar, bool), "method": (method, ["numpy", "r"]),
               }
     # fmt: on
 
     _validate_params(params)
-    _assign_params(params)
 
-    water = ro.r(
-        "rayshader::detect_water(heightmap=heightmap, zscale=zscale, cutoff=cutoff, min_area=min_area,"
-        "max_height=max_height, normalvectors=normalvectors, keep_groups=keep_groups, progbar=progbar)"
+    key = _RESULT_CACHE.key("detect_water", params)
+    water = _RESULT_CACHE.get(key)
+    if water is not None:
+        return water
+
+    if method == "r":
+        _assign_params(params)
+        water = ro.r(
+            "rayshader::detect_water(heightmap=heightmap, zscale=zscale, cutoff=cutoff, min_area=min_area,"
+            "max_height=max_height, normalvectors=normalvectors, keep_groups=keep_groups, progbar=progbar)"
+        )
+        _RESULT_CACHE.put(key, water)
+        return water
+
+    if heightmap.ndim != 2:
+        raise ValueError("Heightmap must be a 2D numpy array.")
+    if normalvectors is not None and normalvectors.shape != heightmap.shape + (3,):
+        raise ValueError(
+            "normalvectors must have the shape of the heightmap with 3 components"
+        )
+    if not 0 < cutoff <= 1:
+        raise ValueError("cutoff must be between 0 and 1")
+
+    labels, lookup = _label_bands(
+        lambda rows: _flat_mask(
+            heightmap, rows, zscale, cutoff, max_height, normalvectors
+        ),
+        heightmap.shape,
     )
 
+    # Area filtering on the merged groups
+    sizes = np.bincount(
+        lookup, weights=np.bincount(labels.ravel(), minlength=lookup.size)
+    )
+    kept = sizes >= min_area
+    kept[0] = False
+    if keep_groups:
+        numbers = np.zeros(kept.size, dtype=np.int32)
+        numbers[kept] = np.arange(1, np.count_nonzero(kept) + 1)
+        lookup = numbers[lookup]
+        water = np.empty(heightmap.shape, dtype=np.int32)
+    else:
+        lookup = kept[lookup].astype(np.uint8)
+        water = np.empty(heightmap.shape, dtype=np.uint8)
+    for rows in _row_chunks(heightmap.shape[0], heightmap.shape[1] * 8):
+        np.take(lookup, labels[rows], out=water[rows])
+
+    _RESULT_CACHE.put(key, water)
     return water
 
 
 # Functions adding layers to maps.
 
 
-def _add_overlay(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement add_overlay functionality
-    pass
+def _write_blended(target: np.ndarray, values: np.ndarray) -> None:
+    """Write blended float values into a hillshade chunk, rounding them for uint8 hillshades."""
+    if target.dtype.kind != "f":
+        np.rint(values, out=values)
+        np.clip(values, 0, 255, out=values)
+    target[...] = values
+
+
+def _work_dtype(hillshade: np.ndarray) -> np.dtype:
+    """Return the float dtype in which a hillshade chunk is blended."""
+    return hillshade.dtype if hillshade.dtype.kind == "f" else np.dtype(np.float32)
+
+
+def _shadow_chunk(
+    hillshade: np.ndarray, shadowmap: np.ndarray, max_darken: float
+) -> None:
+    """Darken a hillshade chunk in place by a shadow chunk rescaled from [0, 1] to [max_darken, 1]."""
+    factor = np.multiply(shadowmap, 1 - max_darken, dtype=_work_dtype(hillshade))
+    factor += max_darken
+    if factor.ndim == 2:
+        factor = factor[..., np.newaxis]
+    if hillshade.dtype.kind == "f":
+        np.multiply(hillshade, factor, out=hillshade)
+    else:
+        _write_blended(hillshade, np.multiply(hillshade, factor))
+
+
+def _overlay_chunk(
+    hillshade: np.ndarray, overlay: np.ndarray, alphalayer: float
+) -> None:
+    """Alpha-blend an RGB(A) overlay chunk in place over a hillshade chunk."""
+    dtype = _work_dtype(hillshade)
+    overlay_scale = 255 if overlay.dtype == np.uint8 else 1
+    hillshade_scale = 255 if hillshade.dtype == np.uint8 else 1
+
+    if overlay.shape[2] == 4:
+        alpha = np.multiply(overlay[..., 3], alphalayer / overlay_scale, dtype=dtype)
+    else:
+        alpha = np.full(overlay.shape[:2], alphalayer, dtype=dtype)
+
+    # hillshade + alpha * (overlay - hillshade)
+    blended = np.multiply(
+        overlay[..., :3], hillshade_scale / overlay_scale, dtype=dtype
+    )
+    blended -= hillshade
+    blended *= alpha[..., np.newaxis]
+    blended += hillshade
+    _write_blended(hillshade, blended)
+
+
+def _validate_hillshade(hillshade: np.ndarray) -> None:
+    """Check that the hillshade is a 3D numpy array representing an RGB image."""
+    if hillshade.ndim != 3:
+        raise ValueError("hillshade must be a 3D numpy array")
+    if hillshade.shape[2] != 3:
+        raise ValueError("hillshade must have 3 channels representing RGB")
+
+
+def _validate_overlay(
+    overlay: np.ndarray, shape: Tuple[int, int], alphalayer: Union[float, int]
+) -> None:
+    """Check that an overlay is an RGB(A) image of the given shape and that alphalayer is in [0, 1]."""
+    if overlay.ndim != 3 or overlay.shape[2] not in (3, 4):
+        raise ValueError("overlay must be a 3D numpy array with 3 or 4 channels")
+    if overlay.shape[:2] != tuple(shape):
+        raise ValueError("overlay dimensions do not match hillshade")
+    if not 0 <= alphalayer <= 1:
+        raise ValueError("alphalayer must be between 0 and 1")
+
+
+def _shadow_image(
+    shadowmap: np.ndarray, shape: Tuple[int, int], max_darken: Union[float, int]
+) -> np.ndarray:
+    """Check a shadow map against an image shape and return it in image orientation (a view of 2D maps)."""
+    if shadowmap.ndim == 2:
+        shadowmap = _matrix_to_image(shadowmap)
+    elif shadowmap.ndim != 3 or shadowmap.shape[2] != 3:
+        raise ValueError("shadowmap must be a 2D numpy array or a 3D RGB image")
+    if shadowmap.shape[:2] != tuple(shape):
+        raise ValueError("shadowmap dimensions do not match hillshade")
+    if not 0 <= max_darken <= 1:
+        raise ValueError("max_darken must be between 0 and 1")
+    return shadowmap
+
+
+def _add_overlay(
+    hillshade: np.ndarray,
+    overlay: np.ndarray,
+    alphalayer: Union[float, int] = 1,
+) -> np.ndarray:
+    """
+    Overlay an image with a transparency layer on a map.
+
+    The overlay is blended in place into 'hillshade', in row chunks so that the temporary arrays stay bounded.
+
+    Parameters:
+    ----------
+    hillshade : np.ndarray
+        A three-dimensional matrix representing an RGB image.
+    overlay : np.ndarray
+        A three-dimensional RGB or RGBA image with the same height and width as 'hillshade', with float values
+        in [0, 1] or uint8 values in [0, 255]. Without an alpha channel the overlay is opaque.
+    alphalayer : Union[float, int], optional
+        Default 1. A multiplier for the transparency of the overlay, between 0 (invisible) and 1.
+
+    Returns:
+    ----------
+    np.ndarray
+        The hillshade with the overlay blended in.
+    """
+
+    # fmt: off
+    params = {"hillshade": (hillshade, np.ndarray), "overlay": (overlay, np.ndarray),
+              "alphalayer": (alphalayer, (float, int))}
+    # fmt: on
+
+    _validate_params(params)
+    _validate_hillshade(hillshade)
+    _validate_overlay(overlay, hillshade.shape[:2], alphalayer)
+
+    row_nbytes = hillshade.shape[1] * 4 * 8
+    for rows in _row_chunks(hillshade.shape[0], row_nbytes):
+        _overlay_chunk(hillshade[rows], overlay[rows], alphalayer)
+
+    return hillshade
+
 
+def _add_shadow(
+    hillshade: np.ndarray,
+    shadowmap: np.ndarray,
+    max_darken: Union[float, int] = 0.7,
+) -> np.ndarray:
+    """
+    Multiply a hillshade by a shadow map.
 
-def _add_shadow(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement add_overlay functionality
-    pass
+    The shadow is applied in place to 'hillshade', in row chunks so that the temporary arrays stay bounded.
+
+    Parameters:
+    ----------
+    hillshade : np.ndarray
+        A three-dimensional matrix representing an RGB image.
+    shadowmap : np.ndarray
+        A two-dimensional matrix with the shape of the heightmap (such as the output of 'ray_shade' or
+        'ambient_shade'), or a three-dimensional RGB image with the shape of 'hillshade'. Values range from 0
+        (full shadow) to 1 (no shadow).
+    max_darken : Union[float, int], optional
+        Default 0.7. The lower limit for how much the image will be darkened. 0 is completely black, 1 means
+        the shadow map will have no effect.
+
+    Returns:
+    ----------
+    np.ndarray
+        The hillshade with the shadow applied.
+    """
+
+    # fmt: off
+    params = {"hillshade": (hillshade, np.ndarray), "shadowmap": (shadowmap, np.ndarray),
+              "max_darken": (max_darken, (float, int))}
+    # fmt: on
+
+    _validate_params(params)
+    _validate_hillshade(hillshade)
+    shadowmap = _shadow_image(shadowmap, hillshade.shape[:2], max_darken)
+
+    row_nbytes = hillshade.shape[1] * 3 * 8
+    for rows in _row_chunks(hillshade.shape[0], row_nbytes):
+        _shadow_chunk(hillshade[rows], shadowmap[rows], max_darken)
+
+    return hillshade
+
+
+def _validate_watermap(watermap: np.ndarray) -> None:
+    """Check in a single chunked pass that a watermap only contains the values 1 and 0."""
+    if watermap.dtype == bool:
+        return
+    for rows in _row_chunks(watermap.shape[0], watermap.shape[1] * 2):
+        chunk = watermap[rows]
+        if np.count_nonzero(chunk == 0) + np.count_nonzero(chunk == 1) != chunk.size:
+            raise ValueError("watermap must contain only values 1 and 0")
+
+
+def _water_image(watermap: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Check a watermap against an image shape and return it as a view in image orientation."""
+    if watermap.ndim != 2:
+        raise ValueError("watermap must be a 2D numpy array")
+    _validate_watermap(watermap)
+    image = _matrix_to_image(watermap)
+    if image.shape != tuple(shape):
+        raise ValueError("watermap dimensions do not match hillshade")
+    return image
+
+
+def _water_rgb(color: str, dtype: np.dtype) -> np.ndarray:
+    """Return the RGB value of a water color in the value range of a hillshade dtype."""
+    rgb = np.asarray(_color_to_rgb(WATER_COLORS.get(color, color)))
+    if np.dtype(dtype) == np.uint8:
+        rgb = np.rint(rgb * 255)
+    return rgb.astype(dtype)
+
+
+def _water_chunk(hillshade: np.ndarray, watermap: np.ndarray, rgb: np.ndarray) -> None:
+    """Paint a color in place into the water points of a hillshade chunk."""
+    hillshade[watermap.astype(bool, copy=False)] = rgb
 
 
 def _add_water(
     hillshade: np.ndarray,  # 3D numpy array representing an RGB image
     watermap: np.ndarray,  # 2D numpy array with values 1 and 0
     color: Optional[str] = "imhof1",
+    dtype: Optional[str] = None,
+    method: str = "numpy",
 ):
     """
     Add a layer of water to a map.
 
+    With the default 'numpy' method, the color is written in place into the water points of 'hillshade'
+    (converted first if 'dtype' differs from its dtype).
+
     Parameters:
     ----------
     hillshade : np.ndarray
@@ -161,6 +1602,11 @@ def _add_water(
         Default 'imhof1'. The water fill color. A hexcode or recognized color string. Also includes built-in
         colors to match the palettes included in sphere_shade: ('imhof1','imhof2','imhof3','imhof4', 'desert',
         'bw', and 'unicorn').
+    dtype : Optional[str], optional
+        Default None. The dtype of the returned hillshade ('float64', 'float32' or 'uint8'). If None, the dtype
+        of 'hillshade' is kept.
+    method : str, optional
+        Default 'numpy'. 'numpy' paints the water with a boolean mask write, 'r' calls 'rayshader::add_water'.
 
     Returns:
     ----------
@@ -169,27 +1615,40 @@ def _add_water(
     """
 
     # fmt: off
-    params = {"hillshade": (hillshade, np.ndarray), "watermap": (watermap, np.ndarray), "color": (color, Optional[str])}
+    params = {"hillshade": (hillshade, np.ndarray), "watermap": (watermap, np.ndarray), "color": (color, Optional[str]),
+              "dtype": (dtype, [None] + HILLSHADE_DTYPES), "method": (method, ["numpy", "r"])}
     # fmt: on
 
     _validate_params(params)
+    _validate_hillshade(hillshade)
+    image = _water_image(watermap, hillshade.shape[:2])
 
-    # Validate hillshade is a 3D numpy array representing an RGB image
-    if hillshade.ndim != 3:
-        raise ValueError("hillshade must be a 3D numpy array")
-    if hillshade.shape[2] != 3:
-        raise ValueError("hillshade must have 3 channels representing RGB")
+    if dtype is None:
+        dtype = (
+            hillshade.dtype.name
+            if hillshade.dtype.name in HILLSHADE_DTYPES
+            else "float64"
+        )
 
-    # Validate watermap is a 2D numpy array with values 1 and 0
-    if watermap.ndim != 2:
-        raise ValueError("watermap must be a 2D numpy array")
-    if not np.all(np.isin(watermap, [0, 1])):
-        raise ValueError("watermap must contain only values 1 and 0")
+    if method == "numpy":
+        hillshade = _to_hillshade_dtype(hillshade, dtype)
+        rgb = _water_rgb(color, hillshade.dtype)
+        for rows in _row_chunks(hillshade.shape[0], hillshade.shape[1]):
+            _water_chunk(hillshade[rows], image[rows], rgb)
+        return hillshade
+
+    key = _RESULT_CACHE.key("add_water", params)
+    cached = _RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
 
+    params["hillshade"] = (_hillshade_to_r(hillshade), np.ndarray)
     _assign_params(params)
 
     hillshade = ro.r(
         "rayshader::add_water(hillshade=hillshade, watermap=watermap, color=color)"
     )
+    hillshade = _to_hillshade_dtype(hillshade, dtype)
+    _RESULT_CACHE.put(key, hillshade)
 
     return hillshade
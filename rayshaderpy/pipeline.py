@@ -0,0 +1,291 @@
+"""Declarative pipeline of memoized Renderer steps."""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from ._cache import _hash_value
+from .renderer import Renderer
+
+logger = logging.getLogger(__name__)
+
+# Renderer methods that write into the array passed as their first argument
+_IN_PLACE = {
+    "add_overlay": "hillshade",
+    "add_shadow": "hillshade",
+    "add_water": "hillshade",
+}
+
+
+class Node:
+    """
+    A step of a pipeline: a Renderer method (or any callable) with its parameters.
+
+    Parameters whose value is another Node are the upstream dependencies of the step, and receive the output
+    of that node. The output of the step is kept until one of its parameters or one of its upstream nodes
+    changes.
+    """
+
+    def __init__(self, name: str, func: Union[str, Callable], params: Dict[str, Any]):
+        """
+        Initialize the Node class.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the node in its pipeline.
+        func : Union[str, Callable]
+            The name of a Renderer method, or a callable.
+        params : dict
+            The keyword arguments of the step. Node values are references to upstream nodes.
+        """
+        self.name = name
+        self.func = func
+        self.params = params
+        self.output: Any = None
+        self.dirty = True
+        self.downstream: List["Node"] = []
+
+    def __repr__(self) -> str:
+        """Return the representation of the node."""
+        func = (
+            self.func
+            if isinstance(self.func, str)
+            else getattr(self.func, "__name__", "callable")
+        )
+        return f"Node({self.name!r}, {func!r}, dirty={self.dirty})"
+
+    @property
+    def upstream(self) -> List["Node"]:
+        """Return the nodes this node depends on."""
+        return [value for value in self.params.values() if isinstance(value, Node)]
+
+
+class Pipeline:
+    """
+    Directed acyclic graph of Renderer steps with memoized outputs.
+
+    Each node runs a Renderer method (such as 'raster_to_matrix', 'calculate_normal', 'sphere_shade',
+    'detect_water', 'add_water' or 'plot_3d') or a callable, with parameters that may reference the outputs of
+    other nodes. Outputs are cached in the nodes. Changing the parameters of a node with 'set' invalidates
+    that node and everything downstream of it, and the next 'run' only re-runs the invalidated nodes that the
+    requested outputs depend on.
+
+    Examples:
+    ----------
+    >>> from rayshaderpy.pipeline import Pipeline
+    >>> pipeline = Pipeline()
+    >>> heightmap = pipeline.add("heightmap", "raster_to_matrix", raster="path/to/raster.tif")
+    >>> normals = pipeline.add("normals", "calculate_normal", heightmap=heightmap)
+    >>> shade = pipeline.add("shade", "sphere_shade", heightmap=heightmap, normalvectors=normals)
+    >>> water = pipeline.add("water", "detect_water", heightmap=heightmap, normalvectors=normals)
+    >>> image = pipeline.add("image", "add_water", hillshade=shade, watermap=water)
+    >>> pipeline.add("plot", "plot_3d", hillshade=image, heightmap=heightmap, zscale=10)
+    >>> pipeline.run()
+    >>> pipeline.set("shade", texture="desert")  # re-runs shade, image and plot only
+    >>> pipeline.run()
+    """
+
+    def __init__(self, renderer: Optional[Renderer] = None):
+        """
+        Initialize the Pipeline class.
+
+        Parameters:
+        ----------
+        renderer : Optional[Renderer], optional
+            Default None, which creates a new Renderer. The renderer whose methods the nodes run.
+        """
+        self.renderer = Renderer() if renderer is None else renderer
+        self.nodes: Dict[str, Node] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        """Return the output of a node, running it first if needed."""
+        return self.run(name)
+
+    def add(self, name: str, func: Union[str, Callable], **params: Any) -> Node:
+        """
+        Add a node to the pipeline.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the node.
+        func : Union[str, Callable]
+            The name of a Renderer method, or a callable.
+        **params : Any
+            The keyword arguments of the step. Pass a Node (or its name wrapped with 'Pipeline.ref') to use
+            the output of that node.
+
+        Returns:
+        ----------
+        Node
+            The node, to be passed as a parameter of downstream nodes.
+        """
+        if name in self.nodes:
+            raise ValueError(f"a node named '{name}' already exists")
+        if isinstance(func, str):
+            if func.startswith("_") or not callable(getattr(Renderer, func, None)):
+                raise ValueError(f"'{func}' is not a Renderer method")
+        elif not callable(func):
+            raise ValueError("func must be the name of a Renderer method or a callable")
+
+        node = Node(name, func, self._resolve(params))
+        self.nodes[name] = node
+        for upstream in node.upstream:
+            upstream.downstream.append(node)
+        return node
+
+    def ref(self, name: str) -> Node:
+        """
+        Return the node of a name, to be used as a parameter of another node.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the node.
+
+        Returns:
+        ----------
+        Node
+            The node.
+        """
+        if name not in self.nodes:
+            raise ValueError(f"no node named '{name}'")
+        return self.nodes[name]
+
+    def set(self, name: str, **params: Any) -> None:
+        """
+        Change parameters of a node and invalidate it and its downstream nodes.
+
+        Parameters that keep their value (compared by content for arrays) do not invalidate anything.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the node.
+        **params : Any
+            The new keyword arguments of the step.
+        """
+        node = self.ref(name)
+        params = self._resolve(params)
+        changed = {
+            param: value
+            for param, value in params.items()
+            if param not in node.params or not _same_value(node.params[param], value)
+        }
+        if not changed:
+            return
+        for value in changed.values():
+            if isinstance(value, Node) and node in _ancestors(value) | {value}:
+                raise ValueError(f"'{value.name}' depends on '{name}'")
+
+        for upstream in node.upstream:
+            upstream.downstream.remove(node)
+        node.params.update(changed)
+        for upstream in node.upstream:
+            upstream.downstream.append(node)
+        self.invalidate(name)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Mark a node and all the nodes downstream of it for re-running.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the node.
+        """
+        root = self.ref(name)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node.dirty and node is not root:
+                continue
+            node.dirty = True
+            node.output = None
+            stack.extend(node.downstream)
+
+    def run(self, *names: str) -> Any:
+        """
+        Run the invalidated nodes needed for some outputs.
+
+        Parameters:
+        ----------
+        *names : str
+            The names of the nodes whose outputs are requested. If none is given, all the nodes without
+            downstream nodes are run.
+
+        Returns:
+        ----------
+        Any
+            The output of the node if a single name is given, otherwise a dict of the requested outputs.
+        """
+        targets = [self.ref(name) for name in names] or [
+            node for node in self.nodes.values() if not node.downstream
+        ]
+        for node in _topological_order(targets):
+            if node.dirty:
+                self._run_node(node)
+        if len(names) == 1:
+            return targets[0].output
+        return {node.name: node.output for node in targets}
+
+    def _resolve(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Check that the Node parameters belong to this pipeline."""
+        for value in params.values():
+            if isinstance(value, Node) and self.nodes.get(value.name) is not value:
+                raise ValueError(f"node '{value.name}' is not part of this pipeline")
+        return dict(params)
+
+    def _run_node(self, node: Node) -> None:
+        """Run a node on the outputs of its upstream nodes and store its output."""
+        kwargs = {
+            param: value.output if isinstance(value, Node) else value
+            for param, value in node.params.items()
+        }
+        if isinstance(node.func, str):
+            # Keep the cached upstream output intact when the method writes into its input
+            in_place = _IN_PLACE.get(node.func)
+            if in_place is not None and isinstance(node.params.get(in_place), Node):
+                kwargs[in_place] = kwargs[in_place].copy()
+            func = getattr(self.renderer, node.func)
+        else:
+            func = node.func
+        logger.debug(f"Running pipeline node '{node.name}'")
+        node.output = func(**kwargs)
+        node.dirty = False
+
+
+def _same_value(old: Any, new: Any) -> bool:
+    """Compare two parameter values, nodes by identity and other values by content."""
+    if isinstance(old, Node) or isinstance(new, Node):
+        return old is new
+    return _hash_value(old) == _hash_value(new)
+
+
+def _ancestors(node: Node) -> set:
+    """Return all the nodes a node depends on, directly or not."""
+    seen: set = set()
+    stack = list(node.upstream)
+    while stack:
+        upstream = stack.pop()
+        if upstream not in seen:
+            seen.add(upstream)
+            stack.extend(upstream.upstream)
+    return seen
+
+
+def _topological_order(targets: List[Node]) -> List[Node]:
+    """Return the targets and their ancestors, each node after all the nodes it depends on."""
+    order: List[Node] = []
+    visited: set = set()
+    for target in targets:
+        stack = [(target, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                order.append(node)
+            elif node not in visited:
+                visited.add(node)
+                stack.append((node, True))
+                stack.extend((upstream, False) for upstream in node.upstream)
+    return order
@@ -0,0 +1,302 @@
+"""Pool of worker processes rendering high-quality frames in parallel."""
+
+import inspect
+import logging
+import multiprocessing
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import rpy2.robjects as ro
+from matplotlib import image as mpimg
+
+from .helpers import _row_chunks
+
+logger = logging.getLogger(__name__)
+
+# Camera parameters of a frame, applied with render_camera before rendering
+CAMERA_PARAMS = ["theta", "phi", "zoom", "fov"]
+
+# Gamma of the images written by render_highquality, undone to merge passes in linear light
+RENDER_GAMMA = 2.2
+
+
+def _init_worker(scene: Dict[str, Any]) -> None:
+    """Build the 3D scene of a worker process, in its own embedded R."""
+    from .renderer import Renderer
+
+    # The rgl scene lives in the worker's R session, and is kept for all its frames
+    Renderer().plot_3d(output="discard", **scene)
+
+
+def _render_frame(frame: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Render a frame of the worker's scene with render_highquality."""
+    from .rendering import _render_camera, _render_highquality
+
+    frame = dict(frame)
+    seed = frame.pop("seed", None)
+    if seed is not None:
+        ro.r(f"set.seed({int(seed)})")
+    camera = {name: frame.pop(name) for name in CAMERA_PARAMS if name in frame}
+    if camera:
+        _render_camera(**camera)
+    output = "discard" if frame.get("filename") is not None else "array"
+    return _render_highquality(output=output, **frame)
+
+
+def _render_highquality_params() -> List[str]:
+    """Return the parameters of render_highquality that a frame can set."""
+    from .renderer import Renderer
+
+    names = list(inspect.signature(Renderer.render_highquality).parameters)
+    return [name for name in names if name not in ("self", "output", "pool")]
+
+
+def _split_samples(samples: int, passes: int) -> List[int]:
+    """Split a number of samples per pixel into at most 'passes' near-equal positive shares."""
+    passes = min(passes, samples)
+    share, extra = divmod(samples, passes)
+    return [share + (i < extra) for i in range(passes)]
+
+
+def _merge_passes(passes: Iterable[Tuple[np.ndarray, int]]) -> np.ndarray:
+    """
+    Merge renders of the same image made with different samples, weighting each by its number of samples.
+
+    The color channels are averaged in linear light, by undoing and then reapplying the gamma of the rendered
+    PNGs, and the alpha channel of RGBA images, which has no gamma, linearly. The images are merged one band
+    of rows at a time so that the temporaries stay bounded.
+    """
+    total: Optional[np.ndarray] = None
+    weights = 0
+    for image, weight in passes:
+        if total is None:
+            total = np.zeros(image.shape, dtype=np.float32)
+        elif image.shape != total.shape:
+            raise ValueError("the passes of a render must have the same shape.")
+        row_nbytes = image[0].size * 4 * 2
+        for rows in _row_chunks(image.shape[0], row_nbytes):
+            linear = image[rows] / np.float32(255)
+            linear[..., :3] **= np.float32(RENDER_GAMMA)
+            total[rows] += linear * np.float32(weight)
+        weights += weight
+    if total is None:
+        raise ValueError("there are no passes to merge.")
+    merged = np.empty(total.shape, dtype=np.uint8)
+    for rows in _row_chunks(total.shape[0], total[0].size * 4 * 2):
+        encoded = total[rows] / weights
+        encoded[..., :3] **= np.float32(1 / RENDER_GAMMA)
+        merged[rows] = np.rint(np.clip(encoded, 0, 1) * 255)
+    return merged
+
+
+class RenderPool:
+    """
+    Pool of worker processes rendering frames of a 3D scene with 'render_highquality' in parallel.
+
+    Each worker has its own embedded R and its own copy of the scene. The pool starts its workers with the
+    'spawn' method (never forking a process that already embeds R); each worker loads rayshader and builds the
+    scene with 'plot_3d' once, then renders the frames dispatched to it. Results are returned in the order of
+    the frames.
+
+    Examples:
+    ----------
+    >>> from rayshaderpy.pool import RenderPool
+    >>> with RenderPool(4, heightmap=heightmap, hillshade=hillshade, zscale=10) as pool:
+    ...     images = pool.render([{"theta": theta, "samples": 256} for theta in range(0, 360, 10)])
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        heightmap: Optional[np.ndarray] = None,
+        hillshade: Optional[np.ndarray] = None,
+        renderer: Optional[Any] = None,
+        **plot_3d_params: Any,
+    ):
+        """
+        Initialize the RenderPool class and start its workers.
+
+        Parameters:
+        ----------
+        processes : Optional[int], optional
+            Default None, which starts one worker per CPU. The number of worker processes.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of 'renderer'. A two-dimensional matrix representing
+            elevation.
+        hillshade : Optional[np.ndarray], optional
+            Default None, which uses the hillshade of 'renderer'. The hillshade of the scene.
+        renderer : Optional[Renderer], optional
+            Default None. A renderer whose heightmap and hillshade build the scene.
+        **plot_3d_params : Any
+            The other parameters of 'plot_3d' that build the scene.
+        """
+        if renderer is not None:
+            heightmap = renderer.heightmap if heightmap is None else heightmap
+            hillshade = renderer.hillshade if hillshade is None else hillshade
+        if heightmap is None or hillshade is None:
+            raise ValueError("heightmap and hillshade are required.")
+        if processes is not None and (not isinstance(processes, int) or processes < 1):
+            raise ValueError("processes must be a positive integer.")
+        for name in ("output", "output_path"):
+            if name in plot_3d_params:
+                raise ValueError(f"'{name}' cannot be set for a RenderPool scene.")
+
+        self.processes = processes or multiprocessing.cpu_count()
+        self._frame_params = _render_highquality_params() + CAMERA_PARAMS + ["seed"]
+        scene = dict(plot_3d_params, heightmap=heightmap, hillshade=hillshade)
+        logger.info(f"Starting {self.processes} render workers")
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            self.processes, initializer=_init_worker, initargs=(scene,)
+        )
+
+    def __enter__(self) -> "RenderPool":
+        """Return the pool."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Stop the workers."""
+        self.close()
+
+    def imap(
+        self, frames: Iterable[Dict[str, Any]], chunksize: int = 1
+    ) -> Iterator[Optional[np.ndarray]]:
+        """
+        Render frames in the workers, yielding each result as soon as it and the frames before it are done.
+
+        Parameters:
+        ----------
+        frames : Iterable[Dict[str, Any]]
+            The parameters of 'render_highquality' for each frame (such as 'lightdirection', 'samples',
+            'camera_location', 'camera_lookat' or 'filename'), and optionally its 'theta', 'phi', 'zoom' and
+            'fov', applied with 'render_camera' first, and the 'seed' of the R random number generator. Arrays
+            are accepted for tuple parameters.
+        chunksize : int, optional
+            Default 1. The number of frames sent to a worker at once.
+
+        Returns:
+        ----------
+        Iterator[Optional[np.ndarray]]
+            The (height, width, 3) uint8 image of each frame (with a fourth alpha channel if the render has
+            one), in order, or None for the frames saved to a 'filename'.
+        """
+        return self._pool.imap(
+            _render_frame, map(self._validate_frame, frames), chunksize
+        )
+
+    def render(
+        self, frames: Iterable[Dict[str, Any]], chunksize: int = 1
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Render frames in the workers.
+
+        Parameters:
+        ----------
+        frames : Iterable[Dict[str, Any]]
+            The parameters of each frame, as in 'imap'.
+        chunksize : int, optional
+            Default 1. The number of frames sent to a worker at once.
+
+        Returns:
+        ----------
+        List[Optional[np.ndarray]]
+            The image of each frame, in order, or None for the frames saved to a 'filename'.
+        """
+        return list(self.imap(frames, chunksize))
+
+    def render_highquality(
+        self,
+        filename: Optional[str] = None,
+        samples: int = 128,
+        passes: Optional[int] = None,
+        seed: int = 0,
+        output: Union[str, BinaryIO] = "display",
+        **params: Any,
+    ) -> Optional[np.ndarray]:
+        """
+        Render a single high-quality image with all the workers.
+
+        The samples per pixel are split between the workers: each renders the whole image with its share of
+        the samples and its own random seed, and the passes are merged, weighted by their samples, in linear
+        light. Every pass has the exact framing of the scene, so the merged image has no seams, and the
+        rendering time scales with the number of workers. The passes use random sampling, which keeps their
+        noise independent.
+
+        Parameters:
+        ----------
+        filename : Optional[str], optional
+            Default None. Filename of the saved image.
+        samples : int, optional
+            Default 128. The total number of samples for each pixel.
+        passes : Optional[int], optional
+            Default None, which renders one pass per worker. The number of passes.
+        seed : int, optional
+            Default 0. The seed of the first pass; the following passes use the next seeds.
+        output : Union[str, BinaryIO], optional
+            Default 'display'. Sink of the image, as in 'Renderer.render_highquality'.
+        **params : Any
+            The other parameters of 'render_highquality', such as 'width', 'height', 'lightdirection' or
+            'camera_location'.
+
+        Returns:
+        ----------
+        Optional[np.ndarray]
+            The image with 'output' set to 'array', otherwise None.
+
+        Examples:
+        ----------
+        >>> with RenderPool(16, renderer=renderer, zscale=10) as pool:
+        ...     pool.render_highquality("poster.png", samples=1024, width=8000, height=6000, output="discard")
+        """
+        from .rendering import _finish_render
+        from .visualization import _temporary_png, _validate_output
+
+        if not isinstance(samples, int) or samples < 1:
+            raise ValueError("samples must be a positive integer.")
+        if passes is not None and (not isinstance(passes, int) or passes < 1):
+            raise ValueError("passes must be a positive integer.")
+        _validate_output(output)
+        for name in ("filename", "sample_method", "seed"):
+            params.pop(name, None)
+
+        shares = _split_samples(samples, passes or self.processes)
+        frames = [
+            dict(params, samples=share, sample_method="random", seed=seed + i)
+            for i, share in enumerate(shares)
+        ]
+        logger.info(f"Rendering {samples} samples in {len(frames)} passes")
+        image = _merge_passes(zip(self.imap(frames), shares))
+
+        if filename is not None:
+            mpimg.imsave(filename, image, format="png")
+        # The merged image is already in memory: only the other sinks need a PNG file
+        if output == "array":
+            return image
+        if output == "discard":
+            return None
+        path = filename
+        if path is None:
+            path = _temporary_png()
+            mpimg.imsave(path, image, format="png")
+        return _finish_render(path, output, keep=filename is not None)
+
+    def close(self) -> None:
+        """Stop the workers once the dispatched frames are rendered."""
+        self._pool.close()
+        self._pool.join()
+
+    def terminate(self) -> None:
+        """Stop the workers immediately."""
+        self._pool.terminate()
+        self._pool.join()
+
+    def _validate_frame(self, frame: Dict[str, Any]) -> Dict[str, Any]:
+        """Check the parameters of a frame and convert its arrays to the tuples R expects."""
+        if not isinstance(frame, dict):
+            raise ValueError(f"a frame must be a dict, but got {frame!r}.")
+        unknown = set(frame) - set(self._frame_params)
+        if unknown:
+            raise ValueError(f"unknown frame parameters: {sorted(unknown)}")
+        return {
+            name: tuple(value.tolist()) if isinstance(value, np.ndarray) else value
+            for name, value in frame.items()
+        }
@@ -1,34 +1,247 @@
 """TODO."""
 
-from typing import Any, Optional, Tuple, Union
+import weakref
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
-from .helpers import _quit, _raster_to_matrix
-from .overlay import _add_water, _detect_water
-from .rendering import _render_highquality
+from ._cache import _hash_value
+from ._layers import LAYER_DEFAULTS, LAYER_KINDS, LayerStack
+from ._lod import _build_pyramid, _select_level
+from ._patch import _expand, _patch_normals, _patch_shade, _patch_water
+from ._triangulation import _tune_max_error
+from .helpers import _calculate_normal, _quit, _raster_to_matrix, _rgl_open
+from .overlay import (
+    _add_overlay,
+    _add_shadow,
+    _add_water,
+    _detect_water,
+    _generate_altitude_overlay,
+    _generate_compass_overlay,
+    _generate_contour_overlay,
+    _generate_label_overlay,
+    _generate_line_overlay,
+    _generate_point_overlay,
+    _generate_polygon_overlay,
+    _generate_scalebar_overlay,
+    _generate_waterline_overlay,
+)
+from .rendering import (
+    _orbit_views,
+    _render_camera,
+    _render_highquality,
+    _render_movie,
+)
 from .shading import _sphere_shade
-from .visualization import _plot_3d, _plot_map
+from .visualization import (
+    VIEW_DEFAULTS,
+    _convert_path_to_animation_coords,
+    _iter_snapshot_views,
+    _plot_3d,
+    _plot_map,
+    _save_3dprint,
+    _save_obj,
+    _snapshot,
+    _snapshot_views,
+    _validate_views,
+)
+
+# Parameters of plot_3d that do not change the geometry of the scene
+_SCENE_INDEPENDENT_PARAMS = [
+    "theta",
+    "phi",
+    "zoom",
+    "fov",
+    "output_path",
+    "output",
+    "plot_new",
+    "close_previous",
+    "clear_previous",
+]
 
 
 class Renderer:
     """TODO."""
 
-    def __init__(self):
-        """Initialize the Renderer class."""
+    def __init__(self, dtype: Optional[str] = None, hillshade_dtype: str = "float64"):
+        """
+        Initialize the Renderer class.
+
+        Parameters:
+        ----------
+        dtype : Optional[str], optional
+            Default None, which keeps the dtype of the rasters. 'float32' or 'float64' is the dtype in which
+            heightmaps are kept, as are the float watermaps of the 'r' method of 'detect_water'. The uint8
+            watermaps of the 'numpy' method and group labels keep their dtype.
+        hillshade_dtype : str, optional
+            Default 'float64'. The dtype in which hillshades are returned and kept: 'float64' or 'float32' hold
+            values in [0, 1], 'uint8' holds values in [0, 255] and uses 3 bytes per pixel.
+        """
+        self.dtype = dtype
+        self.hillshade_dtype = hillshade_dtype
         self.heightmap = None
-        self.hillshade = None
+        self.layers = LayerStack()
+        self.normals = None
         self.watermap = None
+        # Parameters and outputs of the steps computed from the heightmap, for update_heightmap
+        self._recipes: Dict[str, Tuple[Dict[str, Any], list]] = {}
+        # Inputs of the open 3D scene, and a counter of the in-place edits of the renderer's arrays
+        self._scene: Optional[Tuple[Dict[str, Any], int, str]] = None
+        self._revision = 0
+        # Decimated levels of the last heightmap and hillshade plotted with 'lod'
+        self._pyramid: Optional[
+            Tuple[list, int, List[Tuple[np.ndarray, np.ndarray]]]
+        ] = None
+
+    @property
+    def hillshade(self) -> Optional[np.ndarray]:
+        """
+        The hillshade with the recorded layers composited over it.
+
+        The shadow, water and overlay layers recorded by 'add_layer' are composited on first access, in a single
+        pass per row tile, and the result is kept until a layer changes. Assigning a hillshade replaces the base
+        and removes the layers.
+        """
+        return self.layers.composite()
+
+    @hillshade.setter
+    def hillshade(self, hillshade: Optional[np.ndarray]) -> None:
+        self.layers.set_base(hillshade, clear=True)
+        # The base may hold painted water, shadows or overlays (even as the same array): re-shading it would
+        # erase them
+        self._recipes.pop("shade", None)
+        self._revision += 1
+
+    def add_layer(
+        self,
+        kind: str,
+        data: Optional[np.ndarray] = None,
+        param: Any = None,
+        name: Optional[str] = None,
+    ) -> str:
+        """
+        Record a shadow, water or overlay layer, composited over the hillshade only when it is next read.
+
+        Unlike 'add_shadow', 'add_water' and 'add_overlay', which apply their layer to the hillshade right away,
+        the layer is kept by reference in the layer stack of the renderer. It can be replaced by adding a layer
+        under the same name, or removed with 'remove_layer', without recomputing the other layers.
+
+        Parameters:
+        ----------
+        kind : str
+            One of 'shadow', 'water' or 'overlay'.
+        data : Optional[np.ndarray], optional
+            Default None, which uses the watermap of the renderer for a water layer. The shadow map, watermap or
+            overlay, as accepted by 'add_shadow', 'add_water' and 'add_overlay'.
+        param : Any, optional
+            Default None, which uses the default of the kind. The 'max_darken' of a shadow, the color of water
+            or the 'alphalayer' of an overlay.
+        name : Optional[str], optional
+            Default None, which names the layer after its kind and position. Adding a layer under an existing
+            name replaces that layer.
+
+        Returns:
+        ----------
+        str
+            The name of the layer.
+        """
+        if kind not in LAYER_KINDS:
+            raise ValueError(f"kind must be one of {LAYER_KINDS}")
+        if data is None:
+            if kind != "water" or self.watermap is None:
+                raise ValueError(f"the data of the {kind} layer is missing.")
+            data = self.watermap
+        if param is None:
+            param = LAYER_DEFAULTS[kind]
+        return self.layers.add(kind, data, param, name=name)
+
+    def add_overlay(
+        self,
+        overlay: np.ndarray,
+        hillshade: Optional[np.ndarray] = None,
+        alphalayer: Union[float, int] = 1,
+    ) -> np.ndarray:
+        """
+        Overlay an image with a transparency layer on a map.
+
+        The overlay is blended in place into the hillshade, in row chunks so that the temporary arrays stay
+        bounded. Use 'add_layer' to record it lazily instead.
+
+        Parameters:
+        ----------
+        overlay : np.ndarray
+            A three-dimensional RGB or RGBA image with the same height and width as 'hillshade', with float
+            values in [0, 1] or uint8 values in [0, 255]. Without an alpha channel the overlay is opaque.
+        hillshade : np.ndarray
+            A three-dimensional matrix representing an RGB image.
+        alphalayer : Union[float, int], optional
+            Default 1. A multiplier for the transparency of the overlay, between 0 (invisible) and 1.
+
+        Returns:
+        ----------
+        np.ndarray
+            The hillshade with the overlay blended in.
+        """
+        if hillshade is None:
+            if self.hillshade is None:
+                raise ValueError("hillshade is missing.")
+            hillshade = self.hillshade
+        params = locals()
+        del params["self"]
+        self.hillshade = _add_overlay(**params)
+        return self.hillshade
+
+    def add_shadow(
+        self,
+        shadowmap: np.ndarray,
+        hillshade: Optional[np.ndarray] = None,
+        max_darken: Union[float, int] = 0.7,
+    ) -> np.ndarray:
+        """
+        Multiply a hillshade by a shadow map.
+
+        The shadow is applied in place to the hillshade, in row chunks so that the temporary arrays stay
+        bounded. Use 'add_layer' to record it lazily instead.
+
+        Parameters:
+        ----------
+        shadowmap : np.ndarray
+            A two-dimensional matrix with the shape of the heightmap (such as the output of 'ray_shade' or
+            'ambient_shade'), or a three-dimensional RGB image with the shape of 'hillshade'. Values range from
+            0 (full shadow) to 1 (no shadow).
+        hillshade : np.ndarray
+            A three-dimensional matrix representing an RGB image.
+        max_darken : Union[float, int], optional
+            Default 0.7. The lower limit for how much the image will be darkened. 0 is completely black, 1
+            means the shadow map will have no effect.
+
+        Returns:
+        ----------
+        np.ndarray
+            The hillshade with the shadow applied.
+        """
+        if hillshade is None:
+            if self.hillshade is None:
+                raise ValueError("hillshade is missing.")
+            hillshade = self.hillshade
+        params = locals()
+        del params["self"]
+        self.hillshade = _add_shadow(**params)
+        return self.hillshade
 
     def add_water(
         self,
         hillshade: Optional[np.ndarray] = None,  # 3D numpy array of an RGB image
         watermap: Optional[np.ndarray] = None,  # 2D numpy array with values 1 and 0
         color: Optional[str] = "imhof1",
-    ):
+        dtype: Optional[str] = None,
+        method: str = "numpy",
+    ) -> np.ndarray:
         """
         Add a layer of water to a map.
 
+        The water is painted into the hillshade right away. Use 'add_layer' to record it lazily instead.
+
         Parameters:
         ----------
         hillshade : np.ndarray
@@ -39,6 +252,12 @@ class Renderer:
             Default 'imhof1'. The water fill color. A hexcode or recognized color string. Also includes built-in
             colors to match the palettes included in sphere_shade: ('imhof1','imhof2','imhof3','imhof4', 'desert',
             'bw', and 'unicorn').
+        dtype : Optional[str], optional
+            Default None. The dtype of the returned hillshade ('float64', 'float32' or 'uint8'). If None, the
+            dtype of 'hillshade' is kept.
+        method : str, optional
+            Default 'numpy'. 'numpy' paints the water in place with a boolean mask write, 'r' calls
+            'rayshader::add_water'.
 
         Returns:
         ----------
@@ -58,6 +277,102 @@ class Renderer:
         self.hillshade = _add_water(**params)
         return self.hillshade
 
+    def calculate_normal(
+        self,
+        heightmap: Optional[np.ndarray] = None,
+        zscale: Union[float, int] = 1,
+    ) -> np.ndarray:
+        """
+        Calculate the unit surface normals of an elevation matrix.
+
+        Parameters:
+        ----------
+        heightmap : np.ndarray
+            A two-dimensional matrix, where each entry in the matrix is the elevation at that point. All points
+            are assumed to be evenly spaced.
+        zscale : Union[float, int], optional
+            Default 1. The ratio between the x and y spacing (which are assumed to be equal) and the z axis.
+
+        Returns:
+        ----------
+        np.ndarray
+            A (rows, columns, 3) array of unit normals, in the float dtype of the heightmap.
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        self.normals = _calculate_normal(**params)
+        self._record("normals", params, self.normals)
+        return self.normals
+
+    def convert_path_to_animation_coords(
+        self,
+        waypoints: np.ndarray,
+        frames: int = 360,
+        heightmap: Optional[np.ndarray] = None,
+        zscale: float = 1,
+        offset: float = 5,
+        spline: str = "catmull-rom",
+        constant_step: bool = True,
+        lookahead: float = 0.05,
+        lookat: Optional[np.ndarray] = None,
+        lookat_offset: float = 0,
+        samples: int = 64,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Convert a path of waypoints to the camera positions and lookats of the frames of an animation.
+
+        The path is a Catmull-Rom spline, a B-spline or a polyline through the waypoints, resampled by arc
+        length so that the camera moves at constant speed. Every frame is computed at once with NumPy.
+
+        Parameters:
+        ----------
+        waypoints : np.ndarray
+            The (n, 3) camera waypoints in the x, y (up), z coordinates of the 3D scene, or the (n, 2) (row, col)
+            points of the heightmap the camera flies over.
+        frames : int, optional
+            Default 360. The number of frames.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the renderer for (row, col) waypoints. A two-dimensional
+            matrix representing elevation.
+        zscale : float, optional
+            Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+        offset : float, optional
+            Default 5. The height of the camera above the terrain for (row, col) waypoints.
+        spline : str, optional
+            Default 'catmull-rom'. One of 'catmull-rom', 'bspline' or 'linear'.
+        constant_step : bool, optional
+            Default True, which moves the camera at constant speed along the path.
+        lookahead : float, optional
+            Default 0.05. The camera looks at the point of the path this fraction of the path length ahead.
+        lookat : Optional[np.ndarray], optional
+            Default None. A fixed (x, y, z) scene point the camera looks at instead.
+        lookat_offset : float, optional
+            Default 0. Added to the height of the lookats.
+        samples : int, optional
+            Default 64. The number of samples per spline segment used to measure arc lengths.
+
+        Returns:
+        ----------
+        Tuple[np.ndarray, np.ndarray]
+            The (frames, 3) camera positions and the (frames, 3) lookats.
+
+        Examples:
+        ----------
+        >>> waypoints = np.array([[10, 10], [200, 80], [350, 400]])
+        >>> positions, lookats = renderer.convert_path_to_animation_coords(waypoints, frames=3000, zscale=10)
+        """
+        if heightmap is None and waypoints.ndim == 2 and waypoints.shape[1] == 2:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _convert_path_to_animation_coords(**params)
+
     def detect_water(
         self,
         heightmap: Optional[np.ndarray] = None,
@@ -68,6 +383,7 @@ class Renderer:
         normalvectors: Optional[np.ndarray] = None,
         keep_groups: bool = False,
         progbar: bool = False,
+        method: str = "numpy",
     ) -> np.ndarray:
         """
         Detect bodies of water (of a user-defined minimum size) within an elevation matrix.
@@ -86,7 +402,7 @@ class Renderer:
             Default 0.999. The lower limit of the z-component of the unit normal vector to be classified as water.
         min_area : Optional[float], optional
             Minimum area (in units of the height matrix x and y spacing) to be considered a body of water.
-            If None, min_area is set to length(heightmap)/400.
+            If None, min_area is set to length(heightmap)/400, i.e. the number of points divided by 400.
         max_height : Optional[float], optional
             Default None. If passed, this number will specify the maximum height a point can be considered to be
             water.
@@ -95,6 +411,9 @@ class Renderer:
             this will speed up water detection.
         keep_groups : bool, optional
             Default False. If True, the matrix returned will retain the numbered grouping information.
+        method : str, optional
+            Default 'numpy'. 'numpy' classifies and labels the water in NumPy/SciPy, in bands of rows whose
+            groups are merged across band boundaries. 'r' calls 'rayshader::detect_water'.
 
         Returns:
         ----------
@@ -108,8 +427,561 @@ class Renderer:
         params = locals()
         del params["self"]
         self.watermap = _detect_water(**params)
+        # The dtype of the renderer sets float precision: integer masks and group labels keep theirs
+        if (
+            self.dtype is not None
+            and not keep_groups
+            and np.issubdtype(self.watermap.dtype, np.floating)
+        ):
+            self.watermap = self.watermap.astype(self.dtype, copy=False)
+        if method == "numpy" and not keep_groups:
+            if min_area is None:
+                params["min_area"] = heightmap.size / 400
+            self._record("water", params, self.watermap)
         return self.watermap
 
+    def generate_altitude_overlay(
+        self,
+        start_transition: Union[float, int],
+        end_transition: Optional[Union[float, int]] = None,
+        lower: bool = True,
+        hillshade: Optional[Union[np.ndarray, str]] = None,
+        heightmap: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Generate an overlay that is only visible below (or above) a certain altitude.
+
+        Parameters:
+        ----------
+        start_transition : Union[float, int]
+            The elevation at which the overlay starts to fade out (or in, if 'lower' is False).
+        end_transition : Optional[Union[float, int]], optional
+            Default None, which means 'start_transition'. The elevation at which the transition ends.
+        lower : bool, optional
+            Default True. If True, the overlay is visible below the transition, otherwise above it.
+        hillshade : Optional[Union[np.ndarray, str]], optional
+            Default None, which uses the hillshade of the Renderer. The image shown by the overlay: a
+            three-dimensional RGB image in the orientation of the hillshade, or a single color.
+        heightmap : np.ndarray
+            A two-dimensional matrix, where each entry in the matrix is the elevation at that point.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if hillshade is None:
+            if self.hillshade is None:
+                raise ValueError("hillshade is missing.")
+            hillshade = self.hillshade
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_altitude_overlay(**params)
+
+    def generate_compass_overlay(
+        self,
+        x: float = 0.85,
+        y: float = 0.15,
+        size: float = 0.075,
+        text_size: Optional[Union[float, int]] = None,
+        bearing: Union[float, int] = 0,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        color1: str = "white",
+        color2: str = "black",
+        text_color: str = "black",
+        border_color: str = "black",
+        border_width: Union[float, int] = 1,
+        font: str = "sans-serif",
+    ) -> np.ndarray:
+        """
+        Generate an overlay with a compass.
+
+        Parameters:
+        ----------
+        x : float, optional
+            Default 0.85. The horizontal position of the center of the compass, as a fraction of the width.
+        y : float, optional
+            Default 0.15. The vertical position of the center of the compass, as a fraction of the height from
+            the bottom.
+        size : float, optional
+            Default 0.075. The radius of the compass, as a fraction of the width.
+        text_size : Optional[Union[float, int]], optional
+            Default None, which scales the 'N' with the compass. The size of the 'N', in pixels.
+        bearing : Union[float, int], optional
+            Default 0. The angle of north, in degrees clockwise from the top of the map.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        color1 : str, optional
+            Default 'white'. The color of the left half of the arms.
+        color2 : str, optional
+            Default 'black'. The color of the right half of the arms.
+        text_color : str, optional
+            Default 'black'. The color of the 'N'.
+        border_color : str, optional
+            Default 'black'. The color of the border.
+        border_width : Union[float, int], optional
+            Default 1. The width of the border, in pixels. 0 draws no border.
+        font : str, optional
+            Default 'sans-serif'. A font family or the path of a font file.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_compass_overlay(**params)
+
+    def generate_contour_overlay(
+        self,
+        heightmap: Optional[np.ndarray] = None,
+        levels: Optional[Union[list, tuple, np.ndarray]] = None,
+        nlevels: Optional[int] = None,
+        resolution_multiply: int = 1,
+        color: Union[str, list, tuple] = "black",
+        linewidth: Union[float, int] = 1,
+        antialias: bool = True,
+    ) -> np.ndarray:
+        """
+        Calculate contours and return an overlay of the contour lines.
+
+        Parameters:
+        ----------
+        heightmap : np.ndarray
+            A two-dimensional matrix, where each entry in the matrix is the elevation at that point.
+        levels : Optional[Union[list, tuple, np.ndarray]], optional
+            Default None. The elevations at which contours are drawn. If None, 'nlevels' evenly spaced levels
+            between the minimum and maximum elevation are used.
+        nlevels : Optional[int], optional
+            Default None, which means 10. The number of contour levels when 'levels' is None.
+        resolution_multiply : int, optional
+            Default 1. The number of overlay pixels per heightmap point along each axis.
+        color : Union[str, list, tuple], optional
+            Default 'black'. The color of the lines, as a hexcode or recognized color string, or one color per
+            level.
+        linewidth : Union[float, int], optional
+            Default 1. The width of the lines, in overlay pixels.
+        antialias : bool, optional
+            Default True. Whether to antialias the lines.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_contour_overlay(**params)
+
+    def generate_label_overlay(
+        self,
+        labels: Union[str, list, tuple],
+        x: Union[float, int, list, tuple, np.ndarray],
+        y: Union[float, int, list, tuple, np.ndarray],
+        extent: Any,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        text_size: Union[float, int] = 12,
+        color: str = "black",
+        font: str = "sans-serif",
+        weight: str = "normal",
+        offset: Tuple[float, float] = (0, 0),
+        halo_color: Optional[str] = None,
+        halo_expand: Union[float, int] = 1,
+        halo_alpha: Union[float, int] = 1,
+        point_size: Union[float, int] = 0,
+        point_color: str = "black",
+    ) -> np.ndarray:
+        """
+        Generate an overlay of text labels.
+
+        Parameters:
+        ----------
+        labels : Union[str, list, tuple]
+            The text of the labels, or a single text for all positions.
+        x : Union[float, int, list, tuple, np.ndarray]
+            The x coordinates of the labels, in units of the extent.
+        y : Union[float, int, list, tuple, np.ndarray]
+            The y coordinates of the labels, in units of the extent.
+        extent : Any
+            The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+            'top' attributes such as the 'bounds' of a rasterio dataset.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        text_size : Union[float, int], optional
+            Default 12. The size of the text, in pixels.
+        color : str, optional
+            Default 'black'. The color of the text.
+        font : str, optional
+            Default 'sans-serif'. A font family or the path of a font file.
+        weight : str, optional
+            Default 'normal'. The weight of the font, such as 'bold'.
+        offset : Tuple[float, float], optional
+            Default (0, 0). The horizontal and vertical offset of the labels from their points, in units of the
+            extent.
+        halo_color : Optional[str], optional
+            Default None. If given, the color of a halo drawn around the text.
+        halo_expand : Union[float, int], optional
+            Default 1. The width of the halo, in pixels.
+        halo_alpha : Union[float, int], optional
+            Default 1. The opacity of the halo.
+        point_size : Union[float, int], optional
+            Default 0. If positive, the diameter in pixels of a point drawn at the (x, y) position of each
+            label.
+        point_color : str, optional
+            Default 'black'. The color of the points.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_label_overlay(**params)
+
+    def generate_line_overlay(
+        self,
+        geometry: Any,
+        extent: Any,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        color: str = "black",
+        linewidth: Union[float, int] = 1,
+        offset: Tuple[float, float] = (0, 0),
+        resolution_multiply: int = 1,
+        antialias: bool = True,
+    ) -> np.ndarray:
+        """
+        Generate an overlay of lines.
+
+        Parameters:
+        ----------
+        geometry : Any
+            The lines, as a (n, 2) array of x/y coordinates, a list of such arrays, or GeoJSON-like input
+            (LineString or MultiLineString geometries, Features, a FeatureCollection, or objects implementing
+            '__geo_interface__').
+        extent : Any
+            The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+            'top' attributes such as the 'bounds' of a rasterio dataset.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        color : str, optional
+            Default 'black'. The color of the lines.
+        linewidth : Union[float, int], optional
+            Default 1. The width of the lines, in overlay pixels.
+        offset : Tuple[float, float], optional
+            Default (0, 0). The horizontal and vertical offset applied to the lines, in units of the geometry.
+        resolution_multiply : int, optional
+            Default 1. The number of overlay pixels per heightmap point along each axis.
+        antialias : bool, optional
+            Default True. Whether to antialias the lines.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_line_overlay(**params)
+
+    def generate_point_overlay(
+        self,
+        geometry: Any,
+        extent: Any,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        color: str = "black",
+        size: Union[float, int] = 1,
+        offset: Tuple[float, float] = (0, 0),
+        resolution_multiply: int = 1,
+    ) -> np.ndarray:
+        """
+        Generate an overlay of points.
+
+        Parameters:
+        ----------
+        geometry : Any
+            The points, as a (n, 2) array of x/y coordinates or GeoJSON-like input (Point or MultiPoint
+            geometries, Features, a FeatureCollection, or objects implementing '__geo_interface__').
+        extent : Any
+            The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+            'top' attributes such as the 'bounds' of a rasterio dataset.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        color : str, optional
+            Default 'black'. The color of the points.
+        size : Union[float, int], optional
+            Default 1. The diameter of the points, in overlay pixels.
+        offset : Tuple[float, float], optional
+            Default (0, 0). The horizontal and vertical offset applied to the points, in units of the geometry.
+        resolution_multiply : int, optional
+            Default 1. The number of overlay pixels per heightmap point along each axis.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_point_overlay(**params)
+
+    def generate_polygon_overlay(
+        self,
+        geometry: Any,
+        extent: Any,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        palette: Union[str, list, tuple] = "white",
+        linecolor: Optional[str] = "black",
+        linewidth: Union[float, int] = 1,
+        offset: Tuple[float, float] = (0, 0),
+        resolution_multiply: int = 1,
+        antialias: bool = True,
+    ) -> np.ndarray:
+        """
+        Generate an overlay of filled polygons.
+
+        Parameters:
+        ----------
+        geometry : Any
+            The polygons, as a list of (n, 2) arrays of x/y coordinates (one exterior ring per polygon) or
+            GeoJSON-like input (Polygon or MultiPolygon geometries, Features, a FeatureCollection, or objects
+            implementing '__geo_interface__').
+        extent : Any
+            The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+            'top' attributes such as the 'bounds' of a rasterio dataset.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        palette : Union[str, list, tuple], optional
+            Default 'white'. The fill color of the polygons, or one fill color per polygon.
+        linecolor : Optional[str], optional
+            Default 'black'. The color of the outlines. If None, no outline is drawn.
+        linewidth : Union[float, int], optional
+            Default 1. The width of the outlines, in overlay pixels.
+        offset : Tuple[float, float], optional
+            Default (0, 0). The horizontal and vertical offset applied to the polygons, in units of the
+            geometry.
+        resolution_multiply : int, optional
+            Default 1. The number of overlay pixels per heightmap point along each axis.
+        antialias : bool, optional
+            Default True. Whether to antialias the outlines.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_polygon_overlay(**params)
+
+    def generate_scalebar_overlay(
+        self,
+        extent: Any,
+        length: Union[float, int],
+        x: float = 0.05,
+        y: float = 0.05,
+        heightmap: Optional[np.ndarray] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        thickness: Optional[int] = None,
+        segments: int = 2,
+        unit: str = "m",
+        labels: Optional[Union[list, tuple]] = None,
+        text_size: Optional[Union[float, int]] = None,
+        color1: str = "white",
+        color2: str = "black",
+        border_color: str = "black",
+        text_color: str = "black",
+        font: str = "sans-serif",
+    ) -> np.ndarray:
+        """
+        Generate an overlay with a scale bar.
+
+        Parameters:
+        ----------
+        extent : Any
+            The extent of the map, as (xmin, xmax, ymin, ymax) or an object with 'left', 'right', 'bottom' and
+            'top' attributes such as the 'bounds' of a rasterio dataset.
+        length : Union[float, int]
+            The length of the scale bar, in units of the extent.
+        x : float, optional
+            Default 0.05. The horizontal position of the start of the bar, as a fraction of the width.
+        y : float, optional
+            Default 0.05. The vertical position of the bottom of the bar and its labels, as a fraction of the
+            height from the bottom.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the Renderer unless 'width' and 'height' are given. The
+            heightmap sets the size of the overlay.
+        width : Optional[int], optional
+            Default None. The width of the overlay.
+        height : Optional[int], optional
+            Default None. The height of the overlay.
+        thickness : Optional[int], optional
+            Default None, which means 1.5% of the height. The thickness of the bar, in pixels.
+        segments : int, optional
+            Default 2. The number of alternating boxes of the bar.
+        unit : str, optional
+            Default 'm'. The unit appended to the last default label.
+        labels : Optional[Union[list, tuple]], optional
+            Default None, which labels the start, the middle and the end of the bar. The labels, evenly spaced
+            along the bar.
+        text_size : Optional[Union[float, int]], optional
+            Default None, which means twice the thickness. The size of the labels, in pixels.
+        color1 : str, optional
+            Default 'white'. The color of the odd boxes of the bar.
+        color2 : str, optional
+            Default 'black'. The color of the even boxes of the bar.
+        border_color : str, optional
+            Default 'black'. The color of the border of the bar.
+        text_color : str, optional
+            Default 'black'. The color of the labels.
+        font : str, optional
+            Default 'sans-serif'. A font family or the path of a font file.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None and (width is None or height is None):
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_scalebar_overlay(**params)
+
+    def generate_waterline_overlay(
+        self,
+        heightmap: Optional[np.ndarray] = None,
+        color: str = "white",
+        linewidth: Union[float, int] = 1,
+        boolean: bool = False,
+        min: float = 0.001,
+        max: float = 0.2,
+        breaks: int = 9,
+        evenly_spaced: bool = False,
+        fade: bool = True,
+        alpha_dist: Optional[float] = None,
+        alpha: float = 1,
+        falloff: Union[float, int] = 1.3,
+        zscale: Union[float, int] = 1,
+        cutoff: float = 0.999,
+        min_area: Optional[float] = None,
+        max_height: Optional[float] = None,
+        resolution_multiply: int = 1,
+        antialias: bool = True,
+    ) -> np.ndarray:
+        """
+        Generate an overlay of lines following the shorelines of bodies of water.
+
+        Parameters:
+        ----------
+        heightmap : np.ndarray
+            A two-dimensional matrix, where each entry in the matrix is the elevation at that point. If
+            'boolean' is True, a matrix where non-zero entries indicate water.
+        color : str, optional
+            Default 'white'. The color of the lines.
+        linewidth : Union[float, int], optional
+            Default 1. The width of the lines, in overlay pixels.
+        boolean : bool, optional
+            Default False. If True, 'heightmap' is used as the water mask instead of detecting the water.
+        min : float, optional
+            Default 0.001. The distance of the first line, as a fraction of the largest distance to water.
+        max : float, optional
+            Default 0.2. The distance of the last line, as a fraction of the largest distance to water.
+        breaks : int, optional
+            Default 9. The number of lines.
+        evenly_spaced : bool, optional
+            Default False. If True, the lines are evenly spaced between 'min' and 'max'. Otherwise the spacing
+            grows with the distance, according to 'falloff'.
+        fade : bool, optional
+            Default True. If True, the lines fade out with the distance to water.
+        alpha_dist : Optional[float], optional
+            Default None, which means 'max'. The distance at which the lines have faded out completely.
+        alpha : float, optional
+            Default 1. The opacity of the lines closest to the water.
+        falloff : Union[float, int], optional
+            Default 1.3. The exponent of the spacing of the lines when 'evenly_spaced' is False.
+        zscale : Union[float, int], optional
+            Default 1. The ratio between the x and y spacing and the z axis, used to detect the water.
+        cutoff : float, optional
+            Default 0.999. The lower limit of the z-component of the unit normal vector to be classified as
+            water.
+        min_area : Optional[float], optional
+            Default None, which means the number of points divided by 400. Minimum area of a body of water.
+        max_height : Optional[float], optional
+            Default None. The maximum height a point can be considered to be water.
+        resolution_multiply : int, optional
+            Default 1. The number of overlay pixels per heightmap point along each axis.
+        antialias : bool, optional
+            Default True. Whether to antialias the lines.
+
+        Returns:
+        ----------
+        np.ndarray
+            A float32 RGBA overlay in the orientation of the hillshade, to be used with 'add_overlay'.
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _generate_waterline_overlay(**params)
+
     def plot_3d(
         self,
         hillshade: Optional[np.ndarray] = None,
@@ -156,10 +1028,23 @@ class Renderer:
         close_previous: bool = True,
         clear_previous: bool = True,
         output_path: Optional[str] = None,
-    ) -> None:
+        output: Union[str, BinaryIO] = "display",
+        reuse_scene: bool = True,
+        triangle_budget: Optional[int] = None,
+        frame_time: Optional[float] = None,
+        lod: bool = False,
+    ) -> Optional[np.ndarray]:
         """
         Plot a 3D visualization with the given parameters.
 
+        The snapshot of the scene is written to 'output_path' when it is given, and handed to 'output'. With
+        'array', the pixels are read from the rgl scene directly, without a PNG file unless 'output_path' is
+        set.
+
+        When the previous call of the renderer built the open scene from the same arrays (compared by identity,
+        edits made through the renderer being tracked) and the same parameters apart from 'theta', 'phi',
+        'zoom', 'fov' and the output, only the camera of that scene is moved instead of rebuilding the mesh.
+
         Parameters:
         ----------
         hillshade : np.ndarray
@@ -270,6 +1155,30 @@ class Renderer:
             Clears the previously open 'rgl' window if 'plot_new = FALSE'.
         output_path : Union[str, None], default None
             File path to save the image.
+        output : Union[str, BinaryIO], default 'display'
+            Sink of the snapshot: 'display' displays it with matplotlib, 'array' returns it as a (height, width,
+            3) uint8 array, 'discard' only keeps the file at 'output_path' (if any), and a writable binary stream
+            receives the PNG bytes.
+
+        reuse_scene : bool, default True
+            If False, the scene is always rebuilt, for example after modifying an array passed to a previous call
+            in place.
+        triangle_budget : Optional[int], default None
+            If given, the heightmap is triangulated with the 'max_error' that best fits this number of
+            triangles, found with 'tune_max_error', and 'triangulate', 'max_error' and 'max_tri' are ignored.
+        frame_time : Optional[float], default None
+            Same as 'triangle_budget', with a frame-time target in seconds converted to a triangle budget.
+        lod : bool, default False
+            If True, the scene is built from a level of a pyramid of decimated heightmaps and hillshades (halved
+            at each level, kept until the arrays change): the coarsest level with a grid point per pixel of
+            'windowsize' at 'zoom'. The coarsest level of the pyramid is shown first, as a preview, unless the
+            selected level is already the open scene. 'zscale' and a numeric 'shadowwidth' are scaled to the
+            level, and 'precomputed_normals' only apply to the full resolution.
+
+        Returns:
+        ----------
+        Optional[np.ndarray]
+            The snapshot with 'output' set to 'array', otherwise None.
         """
         if heightmap is None:
             if self.heightmap is None:
@@ -279,9 +1188,38 @@ class Renderer:
             if self.hillshade is None:
                 raise ValueError("hillshade is missing.")
             hillshade = self.hillshade
+        if lod:
+            params = locals()
+            del params["self"], params["lod"]
+            return self._plot_3d_lod(params)
+        if triangle_budget is not None or frame_time is not None:
+            triangulate, max_tri = True, 0
+            max_error = self.tune_max_error(triangle_budget, frame_time, heightmap)
         params = locals()
-        del params["self"]
-        return _plot_3d(**params)
+        del params["self"], params["reuse_scene"]
+        del params["triangle_budget"], params["frame_time"], params["lod"]
+
+        arrays = {
+            name: value
+            for name, value in params.items()
+            if isinstance(value, np.ndarray)
+        }
+        values = {
+            name: value
+            for name, value in params.items()
+            if name not in arrays and name not in _SCENE_INDEPENDENT_PARAMS
+        }
+        scene = (arrays, self._revision, _hash_value(values))
+        if reuse_scene and self._same_scene(scene) and _rgl_open():
+            _render_camera(theta=theta, phi=phi, zoom=zoom, fov=fov)
+            return _snapshot(output_path, output)
+
+        self._scene = None
+        result = _plot_3d(**params)
+        self._scene = (
+            {name: weakref.ref(value) for name, value in arrays.items()},
+        ) + scene[1:]
+        return result
 
     def plot_map(
         self,
@@ -289,10 +1227,14 @@ class Renderer:
         rotate: int = 0,
         asp: float = 1,
         output_path: Optional[str] = None,
-    ):
+        output: str = "display",
+    ) -> Optional[Union[np.ndarray, bytes]]:
         """
         Plot a map with the given parameters.
 
+        With 'output' set to 'array' or 'bytes', the map is composed in memory and returned, without R, without
+        a temporary file and without a matplotlib figure.
+
         Parameters:
         ----------
         hillshade : np.ndarray
@@ -304,10 +1246,14 @@ class Renderer:
             at higher latitudes to the correct the aspect ratio.
         output_path : Union[str, None]
             Default None. File path to save the image.
+        output : str
+            Default 'display', which plots the map with R and displays it. 'array' returns the map as a
+            (height, width, 3) uint8 array, 'bytes' returns the map encoded as PNG bytes.
 
         Returns:
         ----------
-            None
+        Optional[Union[np.ndarray, bytes]]
+            The map with 'output' set to 'array' or 'bytes', otherwise None.
         """
         if hillshade is None:
             if self.hillshade is None:
@@ -319,12 +1265,14 @@ class Renderer:
 
     def quit(self):
         """Close the 3D rendering window."""
+        self._scene = None
         return _quit()
 
     def raster_to_matrix(
         self,
         raster: Union[np.ndarray, str],
         interactive: bool = True,
+        dtype: Optional[str] = None,
     ) -> np.ndarray:
         """
         Convert a raster (.tif file) to a numpy.ndarray.
@@ -335,6 +1283,9 @@ class Renderer:
             The input raster data as a numpy array or a file path to a .tif file.
         interactive : bool, optional
             If True, prints the dimensions of the matrix.
+        dtype : Optional[str], optional
+            Default None, which uses the 'dtype' of the renderer. 'float32' or 'float64' converts the raster
+            to that dtype.
 
         Returns:
         ----------
@@ -347,11 +1298,52 @@ class Renderer:
         >>> renderer = Renderer()
         >>> heightmap = renderer.raster_to_matrix("path/to/raster.tif")
         """
+        if dtype is None:
+            dtype = self.dtype
         params = locals()
         del params["self"]
         self.heightmap = _raster_to_matrix(**params)
         return self.heightmap
 
+    def remove_layer(self, name: str) -> None:
+        """
+        Remove a layer recorded by 'add_layer'.
+
+        Parameters:
+        ----------
+        name : str
+            The name of the layer, as returned when it was added.
+        """
+        self.layers.remove(name)
+
+    def render_camera(
+        self,
+        theta: Optional[Union[float, int]] = None,
+        phi: Optional[Union[float, int]] = None,
+        zoom: Optional[Union[float, int]] = None,
+        fov: Optional[Union[float, int]] = None,
+        shift_vertical: Union[float, int] = 0,
+    ) -> None:
+        """
+        Change the camera of the current 3D scene, without rebuilding it.
+
+        Parameters:
+        ----------
+        theta : Optional[Union[float, int]], optional
+            Default None, which keeps the current value. Rotation around z-axis.
+        phi : Optional[Union[float, int]], optional
+            Default None, which keeps the current value. Azimuth angle.
+        zoom : Optional[Union[float, int]], optional
+            Default None, which keeps the current value. Zoom factor.
+        fov : Optional[Union[float, int]], optional
+            Default None, which keeps the current value. Field-of-view angle.
+        shift_vertical : Union[float, int], optional
+            Default 0. Amount to shift the viewpoint vertically.
+        """
+        params = locals()
+        del params["self"]
+        return _render_camera(**params)
+
     def render_highquality(
         self,
         filename: Optional[str] = None,
@@ -380,10 +1372,15 @@ class Renderer:
         point_material_args: Any = None,  # Not yet implemented
         path_material: Any = None,  # Not yet implemented
         path_material_args: Any = None,  # Not yet implemented
-    ):
+        output: Union[str, BinaryIO] = "display",
+        pool: Any = None,
+    ) -> Optional[np.ndarray]:
         """
         Render a high-quality image of the current scene.
 
+        With a 'RenderPool', the image is rendered by all the workers of the pool instead, each with a share of
+        the samples, and the passes are merged into a single image (see 'RenderPool.render_highquality').
+
         Parameters
         ----------
         filename : str
@@ -452,11 +1449,239 @@ class Renderer:
         path_material_args : Any, optional
             The function arguments to 'path_material'. The argument `color` will be automatically extracted from the rgl
             scene, but all other arguments can be specified here. NOTE: Not yet implemented.
+        output : Union[str, BinaryIO], optional
+            Default 'display'. Sink of the image: 'display' displays it with matplotlib, 'array' returns it as a
+            uint8 array, 'discard' only keeps the file at 'filename' (if any), and a writable binary stream
+            receives the PNG bytes.
+        pool : Optional[RenderPool], optional
+            Default None. A pool whose workers render the scene they were started with, in parallel.
+
+        Returns:
+        ----------
+        Optional[np.ndarray]
+            The image with 'output' set to 'array', otherwise None.
         """
         params = locals()
-        del params["self"]
+        del params["self"], params["pool"]
+        if pool is not None:
+            return pool.render_highquality(**params)
         return _render_highquality(**params)
 
+    def render_movie(
+        self,
+        filename: str,
+        views: Optional[List[Dict[str, Union[float, int]]]] = None,
+        frames: int = 360,
+        fps: Union[float, int] = 30,
+        theta: Union[float, int] = 0,
+        phi: Union[float, int] = 30,
+        zoom: Union[float, int] = 1,
+        fov: Union[float, int] = 0,
+        encoder: str = "auto",
+        codec: str = "libx264",
+        **plot_3d_params: Any,
+    ) -> int:
+        """
+        Render a movie of the 3D scene, orbiting around it or following a camera path.
+
+        The scene is built once with 'plot_3d', then each frame is rendered by moving its camera and read from
+        rgl as raw pixels, which are piped to the video encoder (the ffmpeg binary, or an imageio writer)
+        without intermediate image files. Encoding runs in a background thread, overlapping with the rendering
+        of the next frames.
+
+        Parameters:
+        ----------
+        filename : str
+            The path of the video file.
+        views : Optional[List[Dict[str, Union[float, int]]]], optional
+            Default None, which orbits around the scene. The camera of each frame, as dicts with any of
+            'theta', 'phi', 'zoom' and 'fov', as in 'snapshot_views'.
+        frames : int, optional
+            Default 360. The number of frames of an orbit.
+        fps : Union[float, int], optional
+            Default 30. Frames per second.
+        theta : Union[float, int], optional
+            Default 0. The rotation around z-axis of the first frame of an orbit.
+        phi : Union[float, int], optional
+            Default 30. Azimuth angle of an orbit, and of the views that do not set it.
+        zoom : Union[float, int], optional
+            Default 1. Zoom factor of an orbit, and of the views that do not set it.
+        fov : Union[float, int], optional
+            Default 0. Field-of-view angle of an orbit, and of the views that do not set it.
+        encoder : str, optional
+            Default 'auto', which uses ffmpeg when it is on the PATH and imageio otherwise. One of 'auto',
+            'ffmpeg' or 'imageio'.
+        codec : str, optional
+            Default 'libx264'. The ffmpeg video codec.
+        **plot_3d_params : Any
+            The parameters of 'plot_3d' that build the scene.
+
+        Returns:
+        ----------
+        int
+            The number of frames encoded.
+
+        Examples:
+        ----------
+        >>> renderer.render_movie("orbit.mp4", frames=720, zscale=10, windowsize=(1280, 720))
+        """
+        for name in ("output", "output_path"):
+            if name in plot_3d_params:
+                raise ValueError(f"'{name}' cannot be set for render_movie.")
+        if views is None:
+            columns = _orbit_views(frames, theta, phi, zoom, fov)
+        else:
+            defaults = {"theta": theta, "phi": phi, "zoom": zoom, "fov": fov}
+            columns = _validate_views(views, defaults)
+
+        self.plot_3d(output="discard", **plot_3d_params)
+        return _render_movie(
+            filename, _iter_snapshot_views(columns), fps, encoder, codec
+        )
+
+    def save_3dprint(
+        self,
+        filename: str,
+        heightmap: Optional[np.ndarray] = None,
+        zscale: float = 1,
+        maxwidth: float = 125,
+        unit: str = "mm",
+        soliddepth: Union[str, float] = "auto",
+    ) -> int:
+        """
+        Save the watertight solid of the heightmap as a binary STL file for 3D printing.
+
+        The solid is generated with NumPy and written one band of rows at a time, without an rgl scene, so that
+        very large heightmaps are exported with bounded memory.
+
+        Parameters:
+        ----------
+        filename : str
+            The path of the .stl file.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the renderer. A two-dimensional matrix representing
+            elevation.
+        zscale : float, optional
+            Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+        maxwidth : float, optional
+            Default 125. The length of the longest side of the print.
+        unit : str, optional
+            Default 'mm'. The unit of 'maxwidth': 'mm', 'cm' or 'in'.
+        soliddepth : Union[str, float], optional
+            Default 'auto', which puts the base a fifth of the elevation range below the lowest point. The
+            elevation of the bottom of the solid.
+
+        Returns:
+        ----------
+        int
+            The number of triangles written.
+
+        Examples:
+        ----------
+        >>> renderer.save_3dprint("print.stl", zscale=10, maxwidth=20, unit="cm")
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        params = locals()
+        del params["self"]
+        return _save_3dprint(**params)
+
+    def save_obj(
+        self,
+        filename: str,
+        heightmap: Optional[np.ndarray] = None,
+        hillshade: Optional[np.ndarray] = None,
+        zscale: float = 1,
+        file_format: Optional[str] = None,
+        texture: bool = True,
+    ) -> None:
+        """
+        Save the mesh of the heightmap as an OBJ, binary PLY or binary glTF (GLB) file.
+
+        The mesh is built with NumPy from the heightmap and written in bulk, without an rgl scene.
+
+        Parameters:
+        ----------
+        filename : str
+            The path of the file.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the renderer. A two-dimensional matrix representing
+            elevation.
+        hillshade : Optional[np.ndarray], optional
+            Default None, which uses the hillshade of the renderer. The texture of the mesh: an OBJ file
+            references it as a PNG written next to it, a PLY file stores it as vertex colors and a GLB file
+            embeds it.
+        zscale : float, optional
+            Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+        file_format : Optional[str], optional
+            Default None, which uses the extension of 'filename'. One of 'obj', 'ply' or 'glb'.
+        texture : bool, optional
+            Default True. If False, the mesh is saved without a texture.
+
+        Examples:
+        ----------
+        >>> renderer.save_obj("tile.glb", zscale=10)
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        if hillshade is None and texture:
+            hillshade = self.hillshade
+        if not texture:
+            hillshade = None
+        _save_obj(filename, heightmap, hillshade, zscale, file_format)
+
+    def snapshot_views(
+        self,
+        views: List[Dict[str, Union[float, int]]],
+        stream: bool = False,
+        **plot_3d_params: Any,
+    ) -> Union[List[np.ndarray], Iterator[np.ndarray]]:
+        """
+        Capture several views of the same 3D scene.
+
+        The scene is built once with 'plot_3d' (or the open scene is reused, see 'plot_3d'), then every view is
+        captured by moving the camera and reading the pixels of the scene inside R, without files.
+
+        Parameters:
+        ----------
+        views : List[Dict[str, Union[float, int]]]
+            The cameras, as dicts with some of the keys 'theta', 'phi', 'zoom' and 'fov'. Missing keys take
+            the value given in 'plot_3d_params', or the default of 'plot_3d'.
+        stream : bool, optional
+            Default False, which captures all the views in a single R call and returns the list of frames. If
+            True, an iterator captures and yields the frames one at a time, so that they need not all be held
+            in memory.
+        **plot_3d_params : Any
+            The parameters of 'plot_3d' building the scene.
+
+        Returns:
+        ----------
+        Union[List[np.ndarray], Iterator[np.ndarray]]
+            The (height, width, 3) uint8 frames, in the order of 'views'.
+
+        Examples:
+        ----------
+        >>> orbit = [{"theta": theta, "phi": 30} for theta in range(0, 360, 45)]
+        >>> frames = renderer.snapshot_views(orbit, zscale=10, windowsize=(800, 800))
+        """
+        for name in ("output", "output_path"):
+            if name in plot_3d_params:
+                raise ValueError(f"'{name}' cannot be set for snapshot_views.")
+        defaults = {
+            name: plot_3d_params.get(name, value)
+            for name, value in VIEW_DEFAULTS.items()
+        }
+        columns = _validate_views(views, defaults)
+
+        self.plot_3d(output="discard", **plot_3d_params)
+        if stream:
+            return _iter_snapshot_views(columns)
+        return _snapshot_views(columns)
+
     def sphere_shade(
         self,
         heightmap: Optional[np.ndarray] = None,  # 2D numpy array
@@ -466,11 +1691,14 @@ class Renderer:
         colorintensity: Union[float, int] = 1,
         zscale: Union[float, int] = 1,
         progbar: bool = False,
+        dtype: Optional[str] = None,
     ) -> np.ndarray:
         """
         Calculate a color for each point on the surface using the surface normals and hemispherical UV mapping.
 
         This uses either a texture map provided by the user (as an RGB array), or a built-in color texture.
+        The result becomes the base of the renderer's hillshade: the recorded shadow, water and overlay layers
+        are kept and composited over the new shading.
 
         Parameters
         ----------
@@ -493,6 +1721,9 @@ class Renderer:
             unless 'colorintensity' missing.
         progbar : bool, optional
             Default True if interactive, False otherwise. If False, turns off progress bar.
+        dtype : Optional[str], optional
+            Default None, which uses the 'hillshade_dtype' of the renderer. The dtype of the returned hillshade
+            ('float64', 'float32' or 'uint8').
 
         Returns
         ----------
@@ -503,7 +1734,224 @@ class Renderer:
             if self.heightmap is None:
                 raise ValueError("heightmap is missing.")
             heightmap = self.heightmap
+        if dtype is None:
+            dtype = self.hillshade_dtype
         params = locals()
         del params["self"]
-        self.hillshade = _sphere_shade(**params)
-        return self.hillshade
+        hillshade = _sphere_shade(**params)
+        self.layers.set_base(hillshade)
+        self._record("shade", params, hillshade)
+        return hillshade
+
+    def tune_max_error(
+        self,
+        triangle_budget: Optional[int] = None,
+        frame_time: Optional[float] = None,
+        heightmap: Optional[np.ndarray] = None,
+    ) -> float:
+        """
+        Find the 'max_error' of 'plot_3d' whose triangulation best fits a triangle budget or a frame-time target.
+
+        The triangle counts of the probed errors are kept per heightmap content, and the result per heightmap
+        and budget, so tuning again the same heightmap is cheap.
+
+        Parameters:
+        ----------
+        triangle_budget : Optional[int], optional
+            Default None. The maximum number of triangles.
+        frame_time : Optional[float], optional
+            Default None. A frame-time target in seconds, converted to a triangle budget with
+            'config.TRIANGLES_PER_SECOND'. Used when 'triangle_budget' is None.
+        heightmap : Optional[np.ndarray], optional
+            Default None, which uses the heightmap of the renderer. A two-dimensional matrix representing
+            elevation.
+
+        Returns:
+        ----------
+        float
+            The tuned 'max_error'.
+        """
+        if heightmap is None:
+            if self.heightmap is None:
+                raise ValueError("heightmap is missing.")
+            heightmap = self.heightmap
+        return _tune_max_error(heightmap, triangle_budget, frame_time)
+
+    def update_heightmap(
+        self,
+        patch: np.ndarray,
+        row: int,
+        col: int,
+        halo: int = 1,
+    ) -> Tuple[slice, slice]:
+        """
+        Write an edit into a rectangle of the heightmap and update the layers derived from it locally.
+
+        The normals, the shading of 'sphere_shade' and the watermap of 'detect_water', when they were computed
+        from the renderer's heightmap, are recomputed only over the edited rectangle grown by 'halo' and
+        spliced into the existing arrays. Water detection also relabels the bodies of water that reach into
+        the rectangle, wherever they extend. The kept composited hillshade is refreshed over the same region.
+
+        Parameters:
+        ----------
+        patch : np.ndarray
+            A two-dimensional matrix of elevations.
+        row : int
+            The row of the heightmap where the first row of 'patch' is written.
+        col : int
+            The column of the heightmap where the first column of 'patch' is written.
+        halo : int, optional
+            Default 1. The number of points around the rectangle whose normals depend on it.
+
+        Returns:
+        ----------
+        Tuple[slice, slice]
+            The rows and columns of the heightmap whose derived values may have changed.
+
+        Examples:
+        ----------
+        >>> renderer.update_heightmap(np.full((100, 100), 250.0), row=5000, col=12000)
+        """
+        if self.heightmap is None:
+            raise ValueError("heightmap is missing.")
+        if not isinstance(patch, np.ndarray) or patch.ndim != 2:
+            raise ValueError("patch must be a 2D numpy array")
+        if halo < 1:
+            raise ValueError("halo must be at least 1")
+        rows = slice(row, row + patch.shape[0])
+        cols = slice(col, col + patch.shape[1])
+        if (
+            row < 0
+            or col < 0
+            or rows.stop > self.heightmap.shape[0]
+            or cols.stop > self.heightmap.shape[1]
+        ):
+            raise ValueError("patch does not fit in the heightmap")
+
+        self.heightmap[rows, cols] = patch
+        self._revision += 1
+        window = _expand((rows, cols), halo, self.heightmap.shape)
+        changed = window
+
+        params = self._recipe("normals", self.normals)
+        if params is not None:
+            _patch_normals(self.normals, self.heightmap, window, params["zscale"])
+        params = self._recipe("shade", self.layers.base)
+        if params is not None:
+            _patch_shade(self.layers.base, self.heightmap, window, params)
+        params = self._recipe("water", self.watermap)
+        if params is not None:
+            changed = _patch_water(self.watermap, self.heightmap, window, params)
+
+        self.layers.refresh(changed[1], changed[0])
+        return changed
+
+    def _same_scene(self, scene: Tuple[Dict[str, Any], int, str]) -> bool:
+        """Check whether a scene has the inputs of the open scene."""
+        if self._scene is None:
+            return False
+        refs, revision, key = self._scene
+        arrays = scene[0]
+        return (
+            (revision, key) == scene[1:]
+            and refs.keys() == arrays.keys()
+            and all(ref() is arrays[name] for name, ref in refs.items())
+        )
+
+    def _plot_3d_lod(self, params: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Plot the level of detail of the arrays selected by 'windowsize' and 'zoom', after a coarse preview."""
+        levels = self._levels(params["heightmap"], params["hillshade"])
+        level = _select_level(
+            [heightmap.shape for heightmap, _ in levels],
+            params["windowsize"],
+            params["zoom"],
+        )
+        coarsest = len(levels) - 1
+        if level < coarsest and not (
+            params["reuse_scene"] and self._showing(levels[level][0])
+        ):
+            self.plot_3d(
+                **dict(
+                    _level_params(levels, coarsest, params),
+                    output_path=None,
+                    output="discard",
+                )
+            )
+        return self.plot_3d(**_level_params(levels, level, params))
+
+    def _levels(
+        self, heightmap: np.ndarray, hillshade: np.ndarray
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Return the pyramid of a heightmap and a hillshade, built once per pair of arrays."""
+        if self._pyramid is not None:
+            refs, revision, decimated = self._pyramid
+            if (
+                revision == self._revision
+                and refs[0]() is heightmap
+                and refs[1]() is hillshade
+            ):
+                return [(heightmap, hillshade)] + decimated
+        levels = _build_pyramid(heightmap, hillshade)
+        # The full resolution is only referenced weakly, so the pyramid never keeps a replaced array alive
+        self._pyramid = (
+            [weakref.ref(heightmap), weakref.ref(hillshade)],
+            self._revision,
+            levels[1:],
+        )
+        return levels
+
+    def _showing(self, heightmap: np.ndarray) -> bool:
+        """Check whether the open scene was built from a heightmap."""
+        if self._scene is None or "heightmap" not in self._scene[0]:
+            return False
+        return self._scene[0]["heightmap"]() is heightmap
+
+    def _record(self, step: str, params: Dict[str, Any], output: np.ndarray) -> None:
+        """Keep the parameters of a step computed from the renderer's heightmap, to patch its output later."""
+        params = dict(params)
+        heightmap = params.pop("heightmap")
+        normalvectors = params.pop("normalvectors", None)
+        if heightmap is not self.heightmap or (
+            normalvectors is not None and normalvectors is not self.normals
+        ):
+            self._recipes.pop(step, None)
+            return
+        # Weak references, so that a recipe never keeps a replaced array alive
+        inputs = (heightmap, normalvectors, output)
+        self._recipes[step] = (
+            params,
+            [a if a is None else weakref.ref(a) for a in inputs],
+        )
+
+    def _recipe(
+        self, step: str, output: Optional[np.ndarray]
+    ) -> Optional[Dict[str, Any]]:
+        """Return the parameters of a step if 'output' and its inputs are still the renderer's arrays."""
+        if step not in self._recipes:
+            return None
+        params, refs = self._recipes[step]
+        heightmap, normalvectors, recorded = (
+            ref if ref is None else ref() for ref in refs
+        )
+        if output is None or recorded is not output or heightmap is not self.heightmap:
+            return None
+        if refs[1] is not None:
+            if normalvectors is not self.normals:
+                return None
+            params = dict(params, normalvectors=normalvectors)
+        return params
+
+
+def _level_params(
+    levels: List[Tuple[np.ndarray, np.ndarray]], level: int, params: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Return the plot_3d parameters of a level of detail, with the lengths in grid units scaled to it."""
+    factor = 2**level
+    heightmap, hillshade = levels[level]
+    params = dict(params, heightmap=heightmap, hillshade=hillshade)
+    if level > 0:
+        params["zscale"] = params["zscale"] * factor
+        params["precomputed_normals"] = None
+        if not isinstance(params["shadowwidth"], str):
+            params["shadowwidth"] = params["shadowwidth"] / factor
+    return params
@@ -1,13 +1,38 @@
 """TODO."""
 
+import itertools
 import os
-import tempfile
-from typing import Any, Optional, Tuple, Union
-
+import queue
+import shutil
+import subprocess
+import threading
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 import rpy2.robjects as ro
 
 from .helpers import _assign_params, _validate_params
-from .visualization import _display_image
+from .visualization import (
+    _deliver_png,
+    _display_image,
+    _temporary_png,
+    _validate_output,
+)
+
+try:
+    import imageio
+except ImportError:  # pragma: no cover
+    imageio = None
 
 
 # Functions for adding features to 3D maps, rendering post-processing effects, and saving snapshots.
@@ -23,10 +48,41 @@ def _render_buildings(self):  # pragma: no cover
     pass
 
 
-def _render_camera(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement render_camera functionality
-    pass
+def _render_camera(
+    theta: Optional[Union[float, int]] = None,
+    phi: Optional[Union[float, int]] = None,
+    zoom: Optional[Union[float, int]] = None,
+    fov: Optional[Union[float, int]] = None,
+    shift_vertical: Union[float, int] = 0,
+) -> None:
+    """
+    Change the camera of the current 3D scene, without rebuilding it.
+
+    Parameters
+    ----------
+    theta : Optional[Union[float, int]], optional
+        Default None, which keeps the current value. Rotation around z-axis.
+    phi : Optional[Union[float, int]], optional
+        Default None, which keeps the current value. Azimuth angle.
+    zoom : Optional[Union[float, int]], optional
+        Default None, which keeps the current value. Zoom factor.
+    fov : Optional[Union[float, int]], optional
+        Default None, which keeps the current value. Field-of-view angle.
+    shift_vertical : Union[float, int], optional
+        Default 0. Amount to shift the viewpoint vertically.
+    """
+
+    # fmt: off
+    params = {"theta": (theta, Optional[Union[float, int]]), "phi": (phi, Optional[Union[float, int]]),
+              "zoom": (zoom, Optional[Union[float, int]]), "fov": (fov, Optional[Union[float, int]]),
+              "shift_vertical": (shift_vertical, (float, int))}
+    # fmt: on
+
+    _validate_params(params)
+    _assign_params(params)
+    ro.r(
+        "rayshader::render_camera(theta=theta, phi=phi, zoom=zoom, fov=fov, shift_vertical=shift_vertical)"
+    )
 
 
 def _render_clouds(self):  # pragma: no cover
@@ -86,10 +142,14 @@ def _render_highquality(
     point_material_args: Any = None,  # Not yet implemented
     path_material: Any = None,  # Not yet implemented
     path_material_args: Any = None,  # Not yet implemented
-):
+    output: Union[str, BinaryIO] = "display",
+) -> Optional[np.ndarray]:
     """
     Render a high-quality image of the current scene.
 
+    The image is written to 'filename' when it is given (to a temporary file otherwise) and handed to
+    'output'.
+
     Parameters
     ----------
     filename : str
@@ -158,6 +218,15 @@ def _render_highquality(
     path_material_args : Any, optional
         The function arguments to 'path_material'. The argument `color` will be automatically extracted from the rgl
         scene, but all other arguments can be specified here. NOTE: Not yet implemented.
+    output : Union[str, BinaryIO], optional
+        Default 'display'. Sink of the image: 'display' displays it with matplotlib, 'array' returns it as a
+        uint8 array, 'discard' only keeps the file at 'filename' (if any), and a writable binary stream
+        receives the PNG bytes.
+
+    Returns
+    ----------
+    Optional[np.ndarray]
+        The image with 'output' set to 'array', otherwise None.
     """
 
     # fmt: off
@@ -176,12 +245,10 @@ def _render_highquality(
     # fmt: on
 
     _validate_params(params)
+    _validate_output(output)
     _assign_params(params)
 
-    if filename is None:
-        path = tempfile.NamedTemporaryFile(suffix=".png", delete=False).name
-    else:
-        path = filename
+    path = _temporary_png() if filename is None else filename
     ro.globalenv["filename"] = path
 
     ro.r(
@@ -192,10 +259,21 @@ def _render_highquality(
         "camera_lookat=camera_lookat, clear=clear)"
     )
 
-    _display_image(path)
+    return _finish_render(path, output, keep=filename is not None)
+
 
-    if filename is None:
-        os.remove(path)
+def _finish_render(
+    path: str, output: Union[str, BinaryIO], keep: bool
+) -> Optional[np.ndarray]:
+    """Hand a rendered PNG to its sink, removing the file unless it is kept."""
+    try:
+        if output == "display":
+            _display_image(path)
+            return None
+        return _deliver_png(path, output)
+    finally:
+        if not keep:
+            os.remove(path)
 
 
 def _render_label(self):  # pragma: no cover
@@ -204,10 +282,177 @@ def _render_label(self):  # pragma: no cover
     pass
 
 
-def _render_movie(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement render_movie functionality
-    pass
+ENCODERS = ["auto", "ffmpeg", "imageio"]
+
+
+def _orbit_views(
+    frames: int,
+    theta: Union[float, int] = 0,
+    phi: Union[float, int] = 30,
+    zoom: Union[float, int] = 1,
+    fov: Union[float, int] = 0,
+) -> Dict[str, List[float]]:
+    """Return the camera columns of a full orbit around the scene, one view per frame."""
+    if not isinstance(frames, int) or frames < 1:
+        raise ValueError("frames must be a positive integer.")
+    return {
+        "theta": [float(theta + 360 * i / frames) for i in range(frames)],
+        "phi": [float(phi)] * frames,
+        "zoom": [float(zoom)] * frames,
+        "fov": [float(fov)] * frames,
+    }
+
+
+def _open_encoder(
+    encoder: str,
+    filename: str,
+    shape: Tuple[int, ...],
+    fps: Union[float, int],
+    codec: str,
+) -> Tuple[Callable[[np.ndarray], None], Callable[[], None]]:
+    """
+    Start a video encoder for frames of a shape.
+
+    'ffmpeg' runs the ffmpeg binary found on the PATH and pipes raw RGB frames to its standard input, 'imageio'
+    uses an imageio writer, and 'auto' picks ffmpeg when it is installed, imageio otherwise.
+
+    Returns:
+    ----------
+    Tuple[Callable, Callable]
+        The function writing a frame, and the function finishing the video.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if encoder == "auto":
+        encoder = "ffmpeg" if ffmpeg is not None else "imageio"
+    if encoder == "ffmpeg":
+        if ffmpeg is None:
+            raise ValueError("ffmpeg was not found on the PATH.")
+        height, width = shape[:2]
+        process = subprocess.Popen(
+            # fmt: off
+            [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+             "-r", str(fps), "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-c:v", codec, "-pix_fmt", "yuv420p",
+             filename],
+            # fmt: on
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+
+        def close() -> None:
+            _, stderr = process.communicate()
+            if process.returncode != 0:
+                raise ValueError(
+                    f"ffmpeg failed: {stderr.decode(errors='replace').strip()}"
+                )
+
+        def write(frame: np.ndarray) -> None:
+            # A byte view of the frame: piping it does not copy the frame as tobytes() would
+            process.stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B"))
+
+        return write, close
+
+    if imageio is None:
+        raise ValueError("render_movie needs the ffmpeg binary or the imageio package.")
+    writer = imageio.get_writer(filename, fps=fps, codec=codec)
+    return writer.append_data, writer.close
+
+
+def _render_movie(
+    filename: str,
+    frames: Iterable[np.ndarray],
+    fps: Union[float, int] = 30,
+    encoder: str = "auto",
+    codec: str = "libx264",
+    queue_size: int = 8,
+) -> int:
+    """
+    Encode a stream of frames into a video file, without writing the frames to disk.
+
+    The frames are handed to the encoder by a background thread through a bounded queue, so that producing
+    a frame (rendering it with rgl) overlaps with encoding the previous ones, and at most 'queue_size'
+    frames wait in memory.
+
+    Parameters:
+    ----------
+    filename : str
+        The path of the video file.
+    frames : Iterable[np.ndarray]
+        The (height, width, 3) uint8 frames, all of the same shape.
+    fps : Union[float, int]
+        Default 30. Frames per second.
+    encoder : str
+        Default 'auto', which uses the ffmpeg binary when it is on the PATH and imageio otherwise. One of
+        'auto', 'ffmpeg' or 'imageio'.
+    codec : str
+        Default 'libx264'. The ffmpeg video codec.
+    queue_size : int
+        Default 8. The maximum number of frames waiting for the encoder.
+
+    Returns:
+    ----------
+    int
+        The number of frames encoded.
+    """
+
+    # fmt: off
+    params = {"filename": (filename, str), "fps": (fps, (float, int)), "encoder": (encoder, ENCODERS),
+              "codec": (codec, str), "queue_size": (queue_size, int),
+              }
+    # fmt: on
+    _validate_params(params)
+    if fps <= 0 or queue_size < 1:
+        raise ValueError("fps and queue_size must be positive.")
+
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("there are no frames to encode.")
+    if first.ndim != 3 or first.shape[2] != 3:
+        raise ValueError("frames must be (height, width, 3) RGB arrays.")
+    write, close = _open_encoder(encoder, filename, first.shape, fps, codec)
+
+    pending: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=queue_size)
+    errors: List[Exception] = []
+
+    def encode() -> None:
+        while True:
+            frame = pending.get()
+            if frame is None:
+                return
+            if not errors:
+                try:
+                    write(frame)
+                except Exception as error:
+                    # Keep consuming, so that the producer never blocks on a full queue
+                    errors.append(error)
+
+    worker = threading.Thread(target=encode, name="rayshaderpy-encoder", daemon=True)
+    worker.start()
+    count = 0
+    close_error: Optional[Exception] = None
+    try:
+        for frame in itertools.chain([first], frames):
+            if errors:
+                break
+            if frame.shape != first.shape:
+                raise ValueError("all the frames must have the same shape.")
+            pending.put(np.ascontiguousarray(frame, dtype=np.uint8))
+            count += 1
+    finally:
+        pending.put(None)
+        worker.join()
+        # A failing close must not replace the exception of the producer or of the encoder
+        try:
+            close()
+        except Exception as error:
+            close_error = error
+    if errors:
+        # The close failure (such as the message of a crashed ffmpeg) explains a broken pipe
+        raise errors[0] from close_error
+    if close_error is not None:
+        raise close_error
+    return count
 
 
 def _render_multipolygonz(self):  # pragma: no cover
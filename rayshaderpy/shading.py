@@ -5,7 +5,13 @@ from typing import Optional, Union
 import numpy as np
 import rpy2.robjects as ro
 
-from .helpers import _assign_params, _validate_params
+from ._cache import _RESULT_CACHE
+from .helpers import (
+    HILLSHADE_DTYPES,
+    _assign_params,
+    _to_hillshade_dtype,
+    _validate_params,
+)
 
 
 # Functions for generating hillshades.
@@ -53,6 +59,7 @@ def _sphere_shade(
     colorintensity: Union[float, int] = 1,
     zscale: Union[float, int] = 1,
     progbar: bool = False,
+    dtype: str = "float64",
 ) -> np.ndarray:
     """
     Calculate a color for each point on the surface using the surface normals and hemispherical UV mapping.
@@ -80,6 +87,9 @@ def _sphere_shade(
         unless 'colorintensity' missing.
     progbar : bool, optional
         Default True if interactive, False otherwise. If False, turns off progress bar.
+    dtype : str, optional
+        Default 'float64'. The dtype of the returned hillshade: 'float64' or 'float32' hold values in [0, 1],
+        'uint8' holds values in [0, 255] and uses 3 bytes per pixel.
 
     Returns
     ----------
@@ -91,7 +101,7 @@ def _sphere_shade(
     params = {
         "heightmap": (heightmap, np.ndarray), "sunangle": (sunangle, (float, int)), "texture": (texture, (np.ndarray, str)),
         "normalvectors": (normalvectors, Optional[np.ndarray]), "colorintensity": (colorintensity, (float, int)),
-        "zscale": (zscale, (float, int)), "progbar": (progbar, bool),
+        "zscale": (zscale, (float, int)), "progbar": (progbar, bool), "dtype": (dtype, HILLSHADE_DTYPES),
     }
     # fmt: on
     _validate_params(params)
@@ -105,11 +115,18 @@ def _sphere_shade(
     if heightmap.ndim != 2:
         raise ValueError("Heightmap must be a 2D numpy array.")
 
+    key = _RESULT_CACHE.key("sphere_shade", params)
+    hillshade = _RESULT_CACHE.get(key)
+    if hillshade is not None:
+        return hillshade
+
     _assign_params(params)
 
     hillshade = ro.r(
         "rayshader::sphere_shade(heightmap, sunangle, texture, normalvectors, colorintensity, zscale, progbar)"
     )
+    hillshade = _to_hillshade_dtype(hillshade, dtype)
+    _RESULT_CACHE.put(key, hillshade)
     return hillshade
 
 
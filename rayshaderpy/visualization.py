@@ -1,15 +1,30 @@
 """TODO."""
 
 import os
+import shutil
 import tempfile
-from typing import Optional, Tuple, Union
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 import rpy2.robjects as ro
 
-from .helpers import _assign_params, _validate_params
+from ._mesh import (
+    _terrain_mesh,
+    _texture_png,
+    _write_glb,
+    _write_obj,
+    _write_ply,
+    _write_stl,
+)
+from ._splines import SPLINES, _resample, _sample_spline
+from .helpers import (
+    _assign_params,
+    _hillshade_to_r,
+    _to_hillshade_dtype,
+    _validate_params,
+)
 
 
 # Functions for displaying/saving 2D visualizations and 3D prints/models
@@ -27,11 +42,82 @@ def _display_image(image_path: str) -> None:
         None
     """
     img = plt.imread(image_path)
-    plt.figure(figsize=(10, 10))
+    figure = plt.figure(figsize=(10, 10))
     plt.imshow(img)
     plt.axis("off")
     if matplotlib.get_backend().lower() != "agg":
         plt.show()
+    else:
+        plt.close(figure)
+
+
+# Sinks of the rendered images, besides the optional output file
+OUTPUTS = ["display", "array", "discard"]
+
+
+def _validate_output(output: Union[str, BinaryIO]) -> None:
+    """Check that an output is one of OUTPUTS or a writable binary stream."""
+    if isinstance(output, str):
+        if output not in OUTPUTS:
+            raise ValueError(f"output must be one of {OUTPUTS} or a binary stream.")
+    elif not callable(getattr(output, "write", None)):
+        raise ValueError(f"output must be one of {OUTPUTS} or a binary stream.")
+
+
+def _temporary_png() -> str:
+    """Return the path of a new temporary .png file."""
+    f = tempfile.NamedTemporaryFile(suffix=".png", delete=False)
+    f.close()
+    return f.name
+
+
+def _read_png(path: str) -> np.ndarray:
+    """Decode a PNG file into a uint8 array with R's png package, without matplotlib."""
+    image = np.asarray(ro.r("png::readPNG")(path))
+    return _to_hillshade_dtype(image, "uint8")
+
+
+def _pixels_to_image(pixels: Any) -> np.ndarray:
+    """Convert the output of rgl::rgl.pixels to a (height, width, 3) uint8 array."""
+    pixels = np.asarray(pixels)
+    # rgl returns (width, height, 3) with the first row at the bottom
+    return np.ascontiguousarray(
+        _to_hillshade_dtype(pixels, "uint8").transpose(1, 0, 2)[::-1]
+    )
+
+
+def _rgl_pixels() -> np.ndarray:
+    """Read the pixels of the current rgl scene into a (height, width, 3) uint8 array, without a file."""
+    return _pixels_to_image(
+        ro.r('rgl::rgl.pixels(component = c("red", "green", "blue"))')
+    )
+
+
+def _deliver_png(path: str, output: Union[str, BinaryIO]) -> Optional[np.ndarray]:
+    """
+    Hand a rendered PNG file to its sink.
+
+    Parameters:
+    ----------
+    path : str
+        The PNG file.
+    output : Union[str, BinaryIO]
+        'display' displays the image with matplotlib, 'array' returns it as a uint8 array, 'discard' does
+        nothing and a binary stream receives the PNG bytes.
+
+    Returns:
+    ----------
+    Optional[np.ndarray]
+        The image with 'output' set to 'array', otherwise None.
+    """
+    if output == "display":
+        _display_image(path)
+    elif output == "array":
+        return _read_png(path)
+    elif not isinstance(output, str):
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, output)
+    return None
 
 
 def _plot_3d(
@@ -79,10 +165,14 @@ def _plot_3d(
     close_previous: bool = True,
     clear_previous: bool = True,
     output_path: Optional[str] = None,
-) -> None:
+    output: Union[str, BinaryIO] = "display",
+) -> Optional[np.ndarray]:
     """
     Plot a 3D visualization with the given parameters.
 
+    The snapshot of the scene is written to 'output_path' when it is given, and handed to 'output'. With
+    'array', the pixels are read from the rgl scene directly, without a PNG file unless 'output_path' is set.
+
     Parameters:
     ----------
     hillshade : np.ndarray
@@ -193,6 +283,15 @@ def _plot_3d(
         Clears the previously open 'rgl' window if 'plot_new = FALSE'.
     output_path : Optional[str], default None
         File path to save the image.
+    output : Union[str, BinaryIO], default 'display'
+        Sink of the snapshot: 'display' displays it with matplotlib, 'array' returns it as a (height, width, 3)
+        uint8 array, 'discard' only keeps the file at 'output_path' (if any), and a writable binary stream
+        receives the PNG bytes.
+
+    Returns:
+    ----------
+    Optional[np.ndarray]
+        The snapshot with 'output' set to 'array', otherwise None.
     """
 
     # fmt: off
@@ -216,14 +315,10 @@ def _plot_3d(
     # fmt: on
 
     _validate_params(params)
+    _validate_output(output)
+    params["hillshade"] = (_hillshade_to_r(hillshade), np.ndarray)
     _assign_params(params)
 
-    if output_path is None:
-        path = tempfile.NamedTemporaryFile(suffix=".png", delete=False).name
-    else:
-        path = output_path
-    ro.globalenv["output_path"] = path
-
     ro.r(
         "rayshader::plot_3d(hillshade=hillshade, heightmap=heightmap, zscale=zscale, baseshape=baseshape, "
         "solid=solid, soliddepth=soliddepth, solidcolor=solidcolor, solidlinecolor=solidlinecolor, shadow=shadow, "
@@ -235,12 +330,114 @@ def _plot_3d(
         "windowsize=windowsize, precomputed_normals=precomputed_normals, asp=asp, triangulate=triangulate, max_error=max_error, "
         "max_tri=max_tri, verbose=verbose, plot_new=plot_new, close_previous=close_previous, clear_previous=clear_previous)"
     )
-    ro.r("rayshader::render_snapshot(output_path)")
+    return _snapshot(output_path, output)
 
-    _display_image(path)
 
+def _snapshot(
+    output_path: Optional[str] = None, output: Union[str, BinaryIO] = "display"
+) -> Optional[np.ndarray]:
+    """
+    Snapshot the current rgl scene to a file and/or a sink.
+
+    Parameters:
+    ----------
+    output_path : Optional[str]
+        Default None. File path to save the image.
+    output : Union[str, BinaryIO]
+        Default 'display'. Sink of the snapshot, as in 'plot_3d'. The pixels of an 'array' sink are read from
+        the scene without a file unless 'output_path' is set.
+
+    Returns:
+    ----------
+    Optional[np.ndarray]
+        The snapshot with 'output' set to 'array', otherwise None.
+    """
     if output_path is None:
-        os.remove(path)
+        if output == "array":
+            return _rgl_pixels()
+        if output == "discard":
+            return None
+    path = _temporary_png() if output_path is None else output_path
+    ro.globalenv["output_path"] = path
+    ro.r("rayshader::render_snapshot(output_path)")
+
+    try:
+        return _deliver_png(path, output)
+    finally:
+        if output_path is None:
+            os.remove(path)
+
+
+# Camera parameters of a view, with the defaults of plot_3d
+VIEW_DEFAULTS = {"theta": 45, "phi": 45, "zoom": 1, "fov": 0}
+
+
+def _validate_views(
+    views: List[Dict[str, Union[float, int]]], defaults: Dict
+) -> Dict[str, List]:
+    """
+    Check a list of views and gather their camera parameters.
+
+    Parameters:
+    ----------
+    views : List[Dict[str, Union[float, int]]]
+        Dicts with some of the keys 'theta', 'phi', 'zoom' and 'fov'.
+    defaults : dict
+        The values of the parameters missing from a view.
+
+    Returns:
+    ----------
+    Dict[str, List]
+        The values of each camera parameter, view after view.
+    """
+    if not isinstance(views, (list, tuple)) or not views:
+        raise ValueError("views must be a non-empty list of dicts.")
+    columns: Dict[str, List] = {name: [] for name in VIEW_DEFAULTS}
+    for view in views:
+        if not isinstance(view, dict) or not set(view) <= set(VIEW_DEFAULTS):
+            raise ValueError(
+                f"each view must be a dict with keys among {list(VIEW_DEFAULTS)}."
+            )
+        for name, values in columns.items():
+            value = view.get(name, defaults[name])
+            if not isinstance(value, (float, int)) or isinstance(value, bool):
+                raise ValueError(
+                    f"'{name}' of a view must be a number, but got {value!r}."
+                )
+            values.append(float(value))
+    return columns
+
+
+def _snapshot_views(columns: Dict[str, List]) -> List[np.ndarray]:
+    """
+    Capture the current rgl scene from several cameras in a single R call.
+
+    Parameters:
+    ----------
+    columns : Dict[str, List]
+        The 'theta', 'phi', 'zoom' and 'fov' of each view, as returned by '_validate_views'.
+
+    Returns:
+    ----------
+    List[np.ndarray]
+        The (height, width, 3) uint8 frames.
+    """
+    for name, values in columns.items():
+        ro.globalenv[f"view_{name}"] = ro.FloatVector(values)
+    frames = ro.r(
+        "lapply(seq_along(view_theta), function(i) {"
+        "rayshader::render_camera(theta=view_theta[i], phi=view_phi[i], zoom=view_zoom[i], fov=view_fov[i]); "
+        'rgl::rgl.pixels(component = c("red", "green", "blue"))})'
+    )
+    return [_pixels_to_image(frame) for frame in frames]
+
+
+def _iter_snapshot_views(columns: Dict[str, List]) -> Iterator[np.ndarray]:
+    """Capture the current rgl scene from several cameras, yielding each frame as soon as it is read."""
+    for values in zip(*columns.values()):
+        yield _snapshot_views({name: [value] for name, value in zip(columns, values)})[
+            0
+        ]
 
 
 def _plot_gg(self):  # pragma: no cover
@@ -249,15 +446,48 @@ def _plot_gg(self):  # pragma: no cover
     pass
 
 
+def _map_image(hillshade: np.ndarray, rotate: int = 0, asp: float = 1) -> np.ndarray:
+    """
+    Compose the image drawn by 'rayshader::plot_map' in NumPy.
+
+    The hillshade is converted to uint8, rotated clockwise by 'rotate' degrees like 'plot_map' does, and its
+    rows are resampled (nearest neighbor) to 'asp' times its height.
+
+    Parameters:
+    ----------
+    hillshade : np.ndarray
+        A hillshade with float values in [0, 1] or uint8 values in [0, 255].
+    rotate : int
+        Default 0. Rotates the output. Possible values: 0, 90, 180, 270.
+    asp : float
+        Default 1. Aspect ratio of the image.
+
+    Returns:
+    ----------
+    np.ndarray
+        A C-contiguous uint8 image.
+    """
+    image = np.rot90(_to_hillshade_dtype(hillshade, "uint8"), k=-(rotate // 90))
+    if asp != 1:
+        height = image.shape[0]
+        rows = (np.arange(max(round(height * asp), 1)) + 0.5) / asp
+        image = image[np.minimum(rows.astype(np.intp), height - 1)]
+    return np.ascontiguousarray(image)
+
+
 def _plot_map(
     hillshade: np.ndarray,
     rotate: int = 0,
     asp: float = 1,
     output_path: Optional[str] = None,
-) -> None:
+    output: str = "display",
+) -> Optional[Union[np.ndarray, bytes]]:
     """
     Plot a map with the given parameters.
 
+    With 'output' set to 'array' or 'bytes', the map is composed in memory and returned, without R, without
+    a temporary file and without a matplotlib figure.
+
     Parameters:
     ----------
     hillshade : np.ndarray
@@ -269,18 +499,33 @@ def _plot_map(
         at higher latitudes to the correct the aspect ratio.
     output_path : Optional[str]
         Default None. File path to save the image.
+    output : str
+        Default 'display', which plots the map with R and displays it. 'array' returns the map as a
+        (height, width, 3) uint8 array, 'bytes' returns the map encoded as PNG bytes.
 
     Returns:
     ----------
-        None
+    Optional[Union[np.ndarray, bytes]]
+        The map with 'output' set to 'array' or 'bytes', otherwise None.
     """
 
     # fmt: off
     params = {"hillshade": (hillshade, np.ndarray), "rotate": (rotate, [0, 90, 180, 270]),
-              "asp": (asp, (float, int)),
+              "asp": (asp, (float, int)), "output": (output, ["display", "array", "bytes"]),
               }
     # fmt: on
     _validate_params(params)
+    del params["output"]
+
+    if output != "display":
+        if output_path is not None:
+            raise ValueError("output_path can only be used with output='display'.")
+        if asp <= 0:
+            raise ValueError("asp must be positive.")
+        image = _map_image(hillshade, rotate, asp)
+        return image if output == "array" else _texture_png(image)
+
+    params["hillshade"] = (_hillshade_to_r(hillshade), np.ndarray)
     _assign_params(params)
 
     if not isinstance(output_path, (str, type(None))):
@@ -300,10 +545,76 @@ def _plot_map(
         os.remove(path)
 
 
-def _save_3dprint(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement save_3dprint functionality
-    pass
+# Millimeters per unit of the 3D print sizes
+PRINT_UNITS = {"mm": 1, "cm": 10, "in": 25.4}
+
+
+def _save_3dprint(
+    filename: str,
+    heightmap: np.ndarray,
+    zscale: float = 1,
+    maxwidth: float = 125,
+    unit: str = "mm",
+    soliddepth: Union[str, float] = "auto",
+) -> int:
+    """
+    Save the watertight solid of a heightmap as a binary STL file for 3D printing.
+
+    The solid (top surface, walls and base) is generated with NumPy and written one band of rows at a time,
+    so the memory used does not grow with the size of the heightmap. Points that are not finite are lowered
+    to the lowest elevation. The STL coordinates are in millimeters.
+
+    Parameters:
+    ----------
+    filename : str
+        The path of the .stl file.
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    zscale : float
+        Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+    maxwidth : float
+        Default 125. The length of the longest side of the print.
+    unit : str
+        Default 'mm'. The unit of 'maxwidth': 'mm', 'cm' or 'in'.
+    soliddepth : Union[str, float]
+        Default 'auto', which puts the base a fifth of the elevation range (or 1 for a flat heightmap) below
+        the lowest point. The elevation of the bottom of the solid.
+
+    Returns:
+    ----------
+    int
+        The number of triangles written.
+    """
+
+    # fmt: off
+    params = {"filename": (filename, str), "heightmap": (heightmap, np.ndarray), "zscale": (zscale, (float, int)),
+              "maxwidth": (maxwidth, (float, int)), "unit": (unit, list(PRINT_UNITS)),
+              "soliddepth": (soliddepth, (str, float, int)),
+              }
+    # fmt: on
+    _validate_params(params)
+    if heightmap.ndim != 2 or min(heightmap.shape) < 2:
+        raise ValueError(
+            "Heightmap must be a 2D numpy array with at least 2 rows and columns."
+        )
+    if zscale <= 0 or maxwidth <= 0:
+        raise ValueError("zscale and maxwidth must be positive.")
+    if not np.isfinite(heightmap).any():
+        raise ValueError("Heightmap has no finite elevation.")
+
+    low, high = float(np.nanmin(heightmap)), float(np.nanmax(heightmap))
+    if isinstance(soliddepth, str):
+        if soliddepth != "auto":
+            raise ValueError("soliddepth must be 'auto' or a number.")
+        base = low - ((high - low) / 5 or 1)
+    elif soliddepth >= low:
+        raise ValueError("soliddepth must be below the lowest elevation.")
+    else:
+        base = soliddepth
+
+    spacing = maxwidth * PRINT_UNITS[unit] / (max(heightmap.shape) - 1)
+    with open(filename, "wb") as stream:
+        return _write_stl(stream, heightmap, spacing, zscale, base, fill=low)
 
 
 def _save_multipolygonz_to_obj(self):  # pragma: no cover
@@ -312,10 +623,58 @@ def _save_multipolygonz_to_obj(self):  # pragma: no cover
     pass
 
 
-def _save_obj(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement save_obj functionality
-    pass
+MESH_FORMATS = ["obj", "ply", "glb"]
+
+
+def _save_obj(
+    filename: str,
+    heightmap: np.ndarray,
+    hillshade: Optional[np.ndarray] = None,
+    zscale: float = 1,
+    file_format: Optional[str] = None,
+) -> None:
+    """
+    Save the mesh of a heightmap as an OBJ, binary PLY or binary glTF (GLB) file.
+
+    The vertices, faces and texture coordinates are built with NumPy from the heightmap and written in bulk,
+    without an rgl scene. A point per vertex and two triangles per grid cell are written; points that are
+    not finite are left out.
+
+    Parameters:
+    ----------
+    filename : str
+        The path of the file.
+    heightmap : np.ndarray
+        A two-dimensional matrix representing elevation.
+    hillshade : Optional[np.ndarray]
+        Default None. The texture of the mesh: an OBJ file references it as a PNG written next to it (with a
+        .mtl material), a PLY file stores it as vertex colors and a GLB file embeds it.
+    zscale : float
+        Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+    file_format : Optional[str]
+        Default None, which uses the extension of 'filename'. One of 'obj', 'ply' or 'glb'.
+    """
+    if file_format is None:
+        file_format = os.path.splitext(filename)[1].lstrip(".").lower()
+
+    # fmt: off
+    params = {"filename": (filename, str), "heightmap": (heightmap, np.ndarray),
+              "hillshade": (hillshade, (np.ndarray, type(None))), "zscale": (zscale, (float, int)),
+              "file_format": (file_format, MESH_FORMATS),
+              }
+    # fmt: on
+    _validate_params(params)
+    if hillshade is not None and hillshade.shape[:2] != heightmap.shape[::-1]:
+        raise ValueError("hillshade dimensions do not match heightmap")
+
+    mesh = _terrain_mesh(heightmap, zscale)
+    if file_format == "obj":
+        _write_obj(filename, mesh, hillshade)
+    elif file_format == "ply":
+        _write_ply(filename, mesh, hillshade)
+    else:
+        with open(filename, "wb") as stream:
+            _write_glb(stream, mesh, hillshade)
 
 
 def _save_png(self):  # pragma: no cover
@@ -324,10 +683,124 @@ def _save_png(self):  # pragma: no cover
     pass
 
 
-def _convert_path_to_animation_coords(self):  # pragma: no cover
-    """TODO."""
-    # TODO: Implement convert_path_to_animation_coords functionality
-    pass
+def _sample_heightmap(heightmap: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Bilinearly interpolate a heightmap at (row, col) points, clamped to its extent."""
+    rows = np.clip(points[:, 0], 0, heightmap.shape[0] - 1)
+    cols = np.clip(points[:, 1], 0, heightmap.shape[1] - 1)
+    row0 = np.minimum(rows.astype(np.intp), heightmap.shape[0] - 2)
+    col0 = np.minimum(cols.astype(np.intp), heightmap.shape[1] - 2)
+    fr, fc = rows - row0, cols - col0
+    top = heightmap[row0, col0] * (1 - fc) + heightmap[row0, col0 + 1] * fc
+    bottom = heightmap[row0 + 1, col0] * (1 - fc) + heightmap[row0 + 1, col0 + 1] * fc
+    return top * (1 - fr) + bottom * fr
+
+
+def _grid_to_scene(
+    points: np.ndarray, heights: np.ndarray, shape: Tuple[int, int], zscale: float
+) -> np.ndarray:
+    """Convert (row, col) grid points and elevations to the x, y (up), z coordinates of the 3D scene."""
+    return np.stack(
+        [
+            points[:, 0] - (shape[0] - 1) / 2,
+            heights / zscale,
+            (shape[1] - 1) / 2 - points[:, 1],
+        ],
+        axis=1,
+    )
+
+
+def _convert_path_to_animation_coords(
+    waypoints: np.ndarray,
+    frames: int = 360,
+    heightmap: Optional[np.ndarray] = None,
+    zscale: float = 1,
+    offset: float = 5,
+    spline: str = "catmull-rom",
+    constant_step: bool = True,
+    lookahead: float = 0.05,
+    lookat: Optional[np.ndarray] = None,
+    lookat_offset: float = 0,
+    samples: int = 64,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert a path of waypoints to the camera positions and lookats of the frames of an animation.
+
+    The spline through the waypoints is sampled densely for all its segments at once, then resampled at the
+    frames by arc length, with NumPy only, so even tens of thousands of frames take milliseconds.
+
+    Parameters:
+    ----------
+    waypoints : np.ndarray
+        The (n, 3) camera waypoints in the x, y (up), z coordinates of the 3D scene (those of 'save_obj'), or
+        with 'heightmap', the (n, 2) (row, col) points of the heightmap the camera flies over.
+    frames : int
+        Default 360. The number of frames.
+    heightmap : Optional[np.ndarray]
+        Default None. A two-dimensional matrix representing elevation, required for (row, col) waypoints.
+        The camera then follows the terrain along the whole path, 'offset' above it.
+    zscale : float
+        Default 1. Ratio between x, y spacing and z axis, as in 'plot_3d'.
+    offset : float
+        Default 5. The height of the camera above the terrain for (row, col) waypoints, in elevation units.
+    spline : str
+        Default 'catmull-rom', which passes through every waypoint. 'bspline' is smoother but only passes
+        through the first and last waypoints, and 'linear' follows the polyline.
+    constant_step : bool
+        Default True, which moves the camera at constant speed along the path. If False, the frames are spaced
+        evenly between the waypoints.
+    lookahead : float
+        Default 0.05. The camera looks at the point of the path this fraction of the path length ahead.
+    lookat : Optional[np.ndarray]
+        Default None. A fixed (x, y, z) scene point the camera looks at instead.
+    lookat_offset : float
+        Default 0. Added to the height of the lookats, relative to the path (or with a heightmap, to the
+        terrain under the point ahead), in elevation units.
+    samples : int
+        Default 64. The number of samples per spline segment used to measure arc lengths.
+
+    Returns:
+    ----------
+    Tuple[np.ndarray, np.ndarray]
+        The (frames, 3) camera positions and the (frames, 3) lookats.
+    """
+
+    # fmt: off
+    params = {"waypoints": (waypoints, np.ndarray), "frames": (frames, int),
+              "heightmap": (heightmap, (np.ndarray, type(None))), "zscale": (zscale, (float, int)),
+              "offset": (offset, (float, int)), "spline": (spline, SPLINES), "constant_step": (constant_step, bool),
+              "lookahead": (lookahead, (float, int)), "lookat": (lookat, (np.ndarray, list, tuple, type(None))),
+              "lookat_offset": (lookat_offset, (float, int)), "samples": (samples, int),
+              }
+    # fmt: on
+    _validate_params(params)
+    if frames < 1 or samples < 1 or zscale <= 0:
+        raise ValueError("frames, samples and zscale must be positive.")
+    dims = 3 if heightmap is None else 2
+    if waypoints.ndim != 2 or waypoints.shape[1] != dims:
+        raise ValueError(
+            f"waypoints must be a (n, {dims}) array {'without' if dims == 3 else 'with'} a heightmap."
+        )
+
+    curve = _sample_spline(waypoints, spline, samples)
+    points, ahead = _resample(curve, frames, constant_step, lookahead)
+
+    if heightmap is None:
+        positions = points
+        lookats = ahead.copy()
+        lookats[:, 1] += lookat_offset / zscale
+    else:
+        ground = _sample_heightmap(heightmap, points)
+        positions = _grid_to_scene(points, ground + offset, heightmap.shape, zscale)
+        lookat_ground = _sample_heightmap(heightmap, ahead)
+        lookats = _grid_to_scene(
+            ahead, lookat_ground + lookat_offset, heightmap.shape, zscale
+        )
+    if lookat is not None:
+        lookat = np.asarray(lookat, dtype=np.float64)
+        if lookat.shape != (3,):
+            raise ValueError("lookat must be an (x, y, z) point.")
+        lookats = np.broadcast_to(lookat, positions.shape).copy()
+    return positions, lookats
 
 
 def _convert_rgl_to_raymesh(self):  # pragma: no cover
@@ -0,0 +1,105 @@
+"""Tests for the result cache."""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy._cache import _RESULT_CACHE, ResultCache
+from rayshaderpy.shading import _sphere_shade
+
+
+class TestResultCache(unittest.TestCase):
+    """Test the ResultCache class."""
+
+    def setUp(self):
+        """Set up the test data."""
+        self.array = np.arange(12, dtype=np.float64).reshape(3, 4)
+        self.params = {"heightmap": (self.array, np.ndarray), "zscale": (1, int)}
+
+    def test_key_depends_on_content(self):
+        """Test that the key changes with the array content and the parameters."""
+        key = ResultCache.key("sphere_shade", self.params)
+        self.assertEqual(key, ResultCache.key("sphere_shade", dict(self.params)))
+        changed = {"heightmap": (self.array + 1, np.ndarray), "zscale": (1, int)}
+        self.assertNotEqual(key, ResultCache.key("sphere_shade", changed))
+        rescaled = {"heightmap": (self.array, np.ndarray), "zscale": (2, int)}
+        self.assertNotEqual(key, ResultCache.key("sphere_shade", rescaled))
+        self.assertNotEqual(key, ResultCache.key("detect_water", self.params))
+
+    def test_key_ignores_progbar(self):
+        """Test that the progress bar flag does not change the key."""
+        with_progbar = dict(self.params, progbar=(True, bool))
+        self.assertEqual(
+            ResultCache.key("sphere_shade", self.params),
+            ResultCache.key("sphere_shade", with_progbar),
+        )
+
+    def test_memory_hit_returns_copy(self):
+        """Test that a hit returns an independent copy of the stored array."""
+        cache = ResultCache(max_bytes=1024)
+        cache.put("a", self.array)
+        result = cache.get("a")
+        np.testing.assert_array_equal(result, self.array)
+        result[0, 0] = -1
+        np.testing.assert_array_equal(cache.get("a"), self.array)
+
+    def test_memory_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        cache = ResultCache(max_bytes=2 * self.array.nbytes)
+        cache.put("a", self.array)
+        cache.put("b", self.array)
+        cache.get("a")
+        cache.put("c", self.array)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_disk_tier(self):
+        """Test that results survive in the on-disk tier and are evicted by size."""
+        with tempfile.TemporaryDirectory() as disk_dir:
+            cache = ResultCache(
+                max_bytes=0, disk_dir=disk_dir, disk_max_bytes=3 * self.array.nbytes
+            )
+            cache.put("a", self.array)
+            self.assertTrue(os.path.exists(os.path.join(disk_dir, "a.npy")))
+            np.testing.assert_array_equal(cache.get("a"), self.array)
+
+            for key in ["b", "c", "d"]:
+                cache.put(key, self.array)
+            self.assertLessEqual(len(os.listdir(disk_dir)), 2)
+
+    def test_non_array_values_are_not_cached(self):
+        """Test that values which are not numpy arrays are ignored."""
+        cache = ResultCache()
+        cache.put("a", None)
+        self.assertIsNone(cache.get("a"))
+
+
+class TestCachedSphereShade(unittest.TestCase):
+    """Test that sphere_shade results are served from the cache."""
+
+    def tearDown(self):
+        """Empty the shared cache."""
+        _RESULT_CACHE.clear()
+
+    @patch("rayshaderpy.shading._assign_params")
+    @patch("rayshaderpy.shading.ro.r")
+    def test_hit_skips_r(self, mock_r, mock_assign_params):
+        """Test that a repeated call skips both the R transfer and the R compute."""
+        heightmap = np.random.rand(5, 5)
+        mock_r.return_value = np.random.rand(5, 5, 3)
+        first = _sphere_shade(heightmap=heightmap)
+        second = _sphere_shade(heightmap=heightmap)
+        np.testing.assert_array_equal(first, second)
+        mock_r.assert_called_once()
+        mock_assign_params.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,7 +11,13 @@ import rasterio
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 print(sys.path)
 
-from rayshaderpy.helpers import _raster_to_matrix
+from rayshaderpy.helpers import (
+    _assign_params,
+    _calculate_normal,
+    _hillshade_to_r,
+    _raster_to_matrix,
+    _to_hillshade_dtype,
+)
 
 
 class TestRasterToMatrix(unittest.TestCase):
@@ -82,6 +88,113 @@ class TestRasterToMatrix(unittest.TestCase):
             _raster_to_matrix("valid_file.tif", interactive=True)
             mock_print.assert_called_with("Dimensions of matrix are 2x2")
 
+    def test_float32_dtype(self):
+        """Test the conversion of the raster to float32."""
+        raster = np.array([[1, 2], [3, 4]], dtype=np.int16)
+        result = _raster_to_matrix(raster, interactive=False, dtype="float32")
+        self.assertEqual(result.dtype, np.float32)
+        np.testing.assert_array_equal(result, raster)
+
+    @patch("rasterio.open")
+    def test_float32_dtype_tif_file(self, mock_rasterio_open):
+        """Test that the .tif file is read directly in the requested dtype."""
+        mock_read = mock_rasterio_open.return_value.__enter__.return_value.read
+        mock_read.return_value = np.array([[5, 6], [7, 8]], dtype=np.float32)
+        result = _raster_to_matrix("valid_file.tif", interactive=False, dtype="float32")
+        mock_read.assert_called_once_with(1, out_dtype="float32")
+        self.assertEqual(result.dtype, np.float32)
+
+    def test_invalid_dtype(self):
+        """Test when dtype is not a heightmap dtype."""
+        with self.assertRaises(ValueError) as context:
+            _raster_to_matrix(np.ones((2, 2)), interactive=False, dtype="uint8")
+        self.assertIn("'dtype' must be one of", str(context.exception))
+
+
+class TestHillshadeDtype(unittest.TestCase):
+    """Test the compact hillshade conversions."""
+
+    def setUp(self):
+        """Set up the test data."""
+        self.hillshade = np.array([[[0.0, 0.5, 1.0], [0.2, 0.4, 0.6]]])
+
+    def test_to_uint8(self):
+        """Test the conversion of a float hillshade to uint8."""
+        result = _to_hillshade_dtype(self.hillshade, "uint8")
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result, [[[0, 128, 255], [51, 102, 153]]])
+
+    def test_to_float32(self):
+        """Test the conversion of a float64 hillshade to float32."""
+        result = _to_hillshade_dtype(self.hillshade, "float32")
+        self.assertEqual(result.dtype, np.float32)
+        np.testing.assert_allclose(result, self.hillshade)
+
+    def test_same_dtype_is_not_copied(self):
+        """Test that a hillshade already in the requested dtype is returned as is."""
+        self.assertIs(_to_hillshade_dtype(self.hillshade, "float64"), self.hillshade)
+
+    def test_uint8_round_trip_at_r_boundary(self):
+        """Test that uint8 hillshades are converted back to [0, 1] floats for R."""
+        compact = _to_hillshade_dtype(self.hillshade, "uint8")
+        result = _hillshade_to_r(compact)
+        self.assertEqual(result.dtype, np.float64)
+        np.testing.assert_allclose(result, self.hillshade, atol=0.5 / 255)
+
+
+class TestCalculateNormal(unittest.TestCase):
+    """Test the _calculate_normal function."""
+
+    def test_flat_heightmap(self):
+        """Test that a flat heightmap has vertical normals."""
+        normals = _calculate_normal(np.zeros((3, 4)))
+        self.assertEqual(normals.shape, (3, 4, 3))
+        np.testing.assert_array_equal(normals[..., 2], 1)
+
+    def test_plane(self):
+        """Test the normals of a plane rising along the rows."""
+        heightmap = np.repeat(np.arange(4, dtype=np.float32)[:, None], 3, axis=1)
+        normals = _calculate_normal(heightmap, zscale=2)
+        self.assertEqual(normals.dtype, np.float32)
+        expected = np.array([-1, 0, 2]) / np.sqrt(5)
+        np.testing.assert_allclose(
+            normals, np.broadcast_to(expected, (4, 3, 3)), rtol=1e-6
+        )
+
+
+class TestNormalsToR(unittest.TestCase):
+    """Test the conversion of normals to the list of rayshader::calculate_normal."""
+
+    @patch("rayshaderpy.helpers.numpy2ri")
+    @patch("rayshaderpy.helpers.ro")
+    def test_assign_normals(self, mock_ro, mock_numpy2ri):
+        """Test that 3D normals are assigned as padded x, y and z matrices."""
+        mock_ro.globalenv = {}
+        mock_ro.ListVector.side_effect = dict
+        mock_numpy2ri.py2rpy.side_effect = lambda array: array
+        normals = _calculate_normal(np.arange(12.0).reshape(3, 4))
+        _assign_params({"normalvectors": (normals, np.ndarray)})
+
+        converted = mock_ro.globalenv["normalvectors"]
+        self.assertEqual(list(converted), ["x", "y", "z"])
+        for axis, name in enumerate("xyz"):
+            matrix = converted[name]
+            self.assertEqual(matrix.shape, (5, 6))
+            self.assertTrue(matrix.flags.f_contiguous)
+            np.testing.assert_array_equal(matrix[1:-1, 1:-1], normals[..., axis])
+            np.testing.assert_array_equal(matrix[0, 1:-1], normals[0, :, axis])
+            np.testing.assert_array_equal(matrix[1:-1, -1], normals[:, -1, axis])
+
+    @patch("rayshaderpy.helpers.numpy2ri")
+    @patch("rayshaderpy.helpers.ro")
+    def test_assign_matrix(self, mock_ro, mock_numpy2ri):
+        """Test that other arrays are converted as they are."""
+        mock_ro.globalenv = {}
+        matrix = np.ones((3, 4))
+        _assign_params({"normalvectors": (matrix, np.ndarray)})
+        mock_numpy2ri.py2rpy.assert_called_once_with(matrix)
+        mock_ro.ListVector.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
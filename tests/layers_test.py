@@ -0,0 +1,137 @@
+"""Tests for the lazy layer stack."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy._layers import LayerStack
+from rayshaderpy.overlay import _add_overlay, _add_shadow, _add_water
+from rayshaderpy.renderer import Renderer
+
+
+class TestLayerStack(unittest.TestCase):
+    """Test the LayerStack class."""
+
+    def setUp(self):
+        """Set up a hillshade and one layer of each kind."""
+        rng = np.random.default_rng(0)
+        self.hillshade = rng.random((6, 5, 3))
+        self.shadowmap = rng.random((5, 6))
+        self.watermap = np.zeros((5, 6))
+        self.watermap[1:3, 2:4] = 1
+        self.overlay = rng.random((6, 5, 4))
+        self.stack = LayerStack()
+        self.stack.set_base(self.hillshade)
+
+    def eager(self, hillshade):
+        """Apply the layers one after the other with the eager functions."""
+        hillshade = _add_shadow(hillshade.copy(), self.shadowmap, 0.5)
+        hillshade = _add_water(hillshade, self.watermap, "imhof2")
+        return _add_overlay(hillshade, self.overlay, 0.8)
+
+    def test_composite_matches_eager_layers(self):
+        """Test that the fused composite matches applying the layers one by one."""
+        self.stack.add("shadow", self.shadowmap, 0.5)
+        self.stack.add("water", self.watermap, "imhof2")
+        self.stack.add("overlay", self.overlay, 0.8)
+        np.testing.assert_allclose(self.stack.composite(), self.eager(self.hillshade))
+        np.testing.assert_array_equal(self.stack.base, self.hillshade)
+
+    def test_composite_is_deferred_and_kept(self):
+        """Test that layers are only composited on request and that the result is kept until a change."""
+        with patch("rayshaderpy._layers._apply_layer") as mock_apply:
+            self.stack.add("shadow", self.shadowmap, 0.5)
+            self.stack.add("overlay", self.overlay, 0.8)
+            mock_apply.assert_not_called()
+            first = self.stack.composite()
+            self.assertIs(self.stack.composite(), first)
+            self.assertGreaterEqual(mock_apply.call_count, 2)
+        self.stack.add("water", self.watermap, "imhof2")
+        self.assertIsNot(self.stack.composite(), first)
+
+    def test_replace_and_remove(self):
+        """Test that a named layer is replaced where it stands and can be removed."""
+        self.stack.add("shadow", self.shadowmap, 0.5, name="shadow")
+        self.stack.add("water", self.watermap, "imhof2", name="water")
+        self.stack.add("overlay", self.overlay, 0.8, name="labels")
+        self.stack.add("shadow", self.shadowmap, 0.5, name="shadow")
+        self.assertEqual(self.stack.names, ["shadow", "water", "labels"])
+        np.testing.assert_allclose(self.stack.composite(), self.eager(self.hillshade))
+
+        self.stack.remove("water")
+        self.stack.remove("labels")
+        expected = _add_shadow(self.hillshade.copy(), self.shadowmap, 0.5)
+        np.testing.assert_allclose(self.stack.composite(), expected)
+        with self.assertRaises(ValueError):
+            self.stack.remove("labels")
+
+    def test_uint8_output(self):
+        """Test compositing a float base into a uint8 image."""
+        self.stack.add("water", self.watermap, "imhof2")
+        composited = self.stack.composite("uint8")
+        self.assertEqual(composited.dtype, np.uint8)
+        expected = _add_water(self.hillshade.copy(), self.watermap, "imhof2", "uint8")
+        np.testing.assert_array_equal(composited, expected)
+
+    def test_invalid_input(self):
+        """Test the LayerStack class with invalid input."""
+        with self.assertRaises(ValueError):
+            LayerStack().add("shadow", self.shadowmap, 0.5)
+        with self.assertRaises(ValueError):
+            self.stack.add("texture", self.shadowmap, 0.5)
+        with self.assertRaises(ValueError):
+            self.stack.add("shadow", self.shadowmap.T, 0.5)
+        with self.assertRaises(ValueError):
+            self.stack.add("water", self.watermap * 2, "imhof2")
+
+
+class TestRendererLayers(unittest.TestCase):
+    """Test that the renderer records its layers lazily."""
+
+    def test_layers_are_recorded(self):
+        """Test that add_layer records layers and that hillshade composites them."""
+        renderer = Renderer()
+        hillshade = np.random.rand(4, 3, 3)
+        renderer.hillshade = hillshade
+        renderer.watermap = np.eye(3, 4)
+        name = renderer.add_layer("water")
+        self.assertIsInstance(name, str)
+        self.assertEqual(renderer.layers.names, [name])
+        np.testing.assert_array_equal(renderer.layers.base, hillshade)
+
+        expected = _add_water(hillshade.copy(), np.eye(3, 4), "imhof1")
+        np.testing.assert_array_equal(renderer.hillshade, expected)
+
+        renderer.remove_layer(name)
+        self.assertIs(renderer.hillshade, hillshade)
+        with self.assertRaises(ValueError):
+            renderer.add_layer("shadow")
+        with self.assertRaises(ValueError):
+            renderer.add_layer("texture", np.zeros((3, 4)))
+
+    def test_add_methods_are_eager(self):
+        """Test that add_* apply their layer right away and return the hillshade, with or without one."""
+        renderer = Renderer()
+        renderer.hillshade = np.ones((4, 3, 3))
+        renderer.add_layer("shadow", np.zeros((3, 4)), 0.5)
+        result = renderer.add_shadow(np.zeros((3, 4)), max_darken=0.5)
+        self.assertIsInstance(result, np.ndarray)
+        np.testing.assert_array_equal(result, np.full((4, 3, 3), 0.25))
+        self.assertEqual(len(renderer.layers), 0)
+        self.assertIs(renderer.hillshade, result)
+
+        hillshade = np.ones((4, 3, 3))
+        result = renderer.add_shadow(np.zeros((3, 4)), hillshade, max_darken=0.5)
+        np.testing.assert_array_equal(result, np.full((4, 3, 3), 0.5))
+        self.assertIs(renderer.hillshade, result)
+        renderer.watermap = np.eye(3, 4)
+        self.assertIsInstance(renderer.add_water(), np.ndarray)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+"""Tests for the level-of-detail pyramid of 3D previews."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy._lod import _build_pyramid, _halve, _select_level
+from rayshaderpy.renderer import Renderer
+
+
+class TestPyramid(unittest.TestCase):
+    """Test the _halve, _build_pyramid and _select_level functions."""
+
+    def test_halve(self):
+        """Test that 2x2 blocks are averaged and odd sides keep their last row or column."""
+        array = np.arange(15, dtype=float).reshape(3, 5)
+        halved = _halve(array)
+        self.assertEqual(halved.shape, (2, 3))
+        self.assertEqual(halved[0, 0], np.mean([0, 1, 5, 6]))
+        self.assertEqual(halved[1, 2], 14)
+
+    def test_halve_uint8(self):
+        """Test that uint8 images stay uint8."""
+        image = np.full((4, 6, 3), 200, dtype=np.uint8)
+        halved = _halve(image)
+        self.assertEqual(halved.dtype, np.uint8)
+        self.assertEqual(halved.shape, (2, 3, 3))
+        self.assertTrue((halved == 200).all())
+
+    def test_build_pyramid(self):
+        """Test that levels halve until the coarsest level fits the minimum size."""
+        heightmap = np.random.default_rng(0).random((300, 200))
+        hillshade = np.random.default_rng(1).random((200, 300, 3))
+        levels = _build_pyramid(heightmap, hillshade, min_size=64)
+        self.assertIs(levels[0][0], heightmap)
+        self.assertEqual(
+            [level[0].shape for level in levels],
+            [(300, 200), (150, 100), (75, 50), (38, 25)],
+        )
+        for level_heightmap, level_hillshade in levels:
+            self.assertEqual(level_hillshade.shape[:2], level_heightmap.shape[::-1])
+
+    def test_build_pyramid_mismatch(self):
+        """Test that a hillshade of another shape raises a ValueError."""
+        with self.assertRaises(ValueError):
+            _build_pyramid(np.zeros((10, 20)), np.zeros((10, 20, 3)))
+
+    def test_select_level(self):
+        """Test that the coarsest level covering the window pixels is selected."""
+        shapes = [(4000, 4000), (2000, 2000), (1000, 1000), (500, 500)]
+        self.assertEqual(_select_level(shapes, 600, 1), 2)
+        self.assertEqual(_select_level(shapes, (800, 1200), 1), 1)
+        self.assertEqual(_select_level(shapes, 600, 0.25), 0)
+        self.assertEqual(_select_level(shapes, 400, 1), 3)
+        self.assertEqual(_select_level(shapes, 10000, 1), 0)
+        with self.assertRaises(ValueError):
+            _select_level(shapes, 600, 0)
+
+
+@patch("rayshaderpy.renderer._rgl_open", return_value=True)
+@patch("rayshaderpy.renderer._snapshot")
+@patch("rayshaderpy.renderer._render_camera")
+@patch("rayshaderpy.renderer._plot_3d")
+class TestPlot3dLod(unittest.TestCase):
+    """Test the lod parameter of Renderer.plot_3d."""
+
+    def setUp(self):
+        """Set up a renderer with a 2048 x 2048 terrain."""
+        self.renderer = Renderer()
+        self.renderer.heightmap = np.random.default_rng(0).random((2048, 2048))
+        self.renderer.hillshade = np.zeros((2048, 2048, 3))
+
+    def test_preview_then_level(self, mock_plot_3d, mock_camera, mock_snapshot, _):
+        """Test that the coarsest level is shown before the selected one."""
+        self.renderer.plot_3d(zscale=2, windowsize=600, lod=True)
+        preview, final = [call.kwargs for call in mock_plot_3d.call_args_list]
+        self.assertEqual(preview["heightmap"].shape, (256, 256))
+        self.assertEqual(preview["zscale"], 16)
+        self.assertEqual(preview["output"], "discard")
+        self.assertEqual(final["heightmap"].shape, (1024, 1024))
+        self.assertEqual(final["zscale"], 4)
+        self.assertEqual(final["output"], "display")
+
+    def test_camera_change_reuses_level(
+        self, mock_plot_3d, mock_camera, mock_snapshot, _
+    ):
+        """Test that moving the camera reuses the pyramid and the open scene."""
+        self.renderer.plot_3d(windowsize=600, lod=True)
+        self.renderer.plot_3d(windowsize=600, theta=90, lod=True)
+        self.assertEqual(mock_plot_3d.call_count, 2)
+        mock_camera.assert_called_once()
+
+    def test_full_resolution(self, mock_plot_3d, mock_camera, mock_snapshot, _):
+        """Test that zooming in far enough plots the renderer's arrays."""
+        self.renderer.plot_3d(windowsize=600, zoom=0.2, lod=True)
+        final = mock_plot_3d.call_args.kwargs
+        self.assertIs(final["heightmap"], self.renderer.heightmap)
+        self.assertNotIn("lod", final)
+
+
+if __name__ == "__main__":
+    unittest.main()
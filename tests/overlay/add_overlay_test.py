@@ -0,0 +1,66 @@
+"""Tests for the add_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _add_overlay
+
+
+class TestAddOverlay(unittest.TestCase):
+    """Test the add_overlay function."""
+
+    def setUp(self):
+        """Set up the test data."""
+        self.hillshade = np.random.rand(5, 7, 3)
+        self.overlay = np.random.rand(5, 7, 4)
+
+    def expected(self, hillshade, overlay, alphalayer):
+        """Compute the expected result without chunking."""
+        alpha = overlay[..., 3:] * alphalayer
+        return hillshade * (1 - alpha) + overlay[..., :3] * alpha
+
+    def test_add_overlay_in_place(self):
+        """Test that the overlay is blended into the hillshade buffer."""
+        expected = self.expected(self.hillshade, self.overlay, 1)
+        result = _add_overlay(self.hillshade, self.overlay)
+        self.assertIs(result, self.hillshade)
+        np.testing.assert_allclose(result, expected)
+
+    def test_add_overlay_chunked(self):
+        """Test that row chunking gives the same result."""
+        expected = self.expected(self.hillshade, self.overlay, 0.5)
+        with patch("rayshaderpy.overlay._row_chunks") as mock_chunks:
+            mock_chunks.return_value = [slice(0, 2), slice(2, 4), slice(4, 5)]
+            result = _add_overlay(self.hillshade, self.overlay, alphalayer=0.5)
+        np.testing.assert_allclose(result, expected)
+
+    def test_add_overlay_rgb_is_opaque(self):
+        """Test that an overlay without alpha channel replaces the hillshade."""
+        overlay = np.random.rand(5, 7, 3)
+        result = _add_overlay(self.hillshade, overlay)
+        np.testing.assert_allclose(result, overlay)
+
+    def test_add_overlay_uint8(self):
+        """Test a uint8 overlay on a uint8 hillshade."""
+        hillshade = np.zeros((5, 7, 3), dtype=np.uint8)
+        overlay = np.full((5, 7, 4), 255, dtype=np.uint8)
+        overlay[..., 3] = 51  # 20% opacity
+        result = _add_overlay(hillshade, overlay)
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result, 51)
+
+    def test_add_overlay_dimension_mismatch(self):
+        """Test the add_overlay function with an overlay of the wrong shape."""
+        with self.assertRaises(ValueError) as context:
+            _add_overlay(self.hillshade, np.random.rand(7, 5, 4))
+        self.assertIn("overlay dimensions do not match", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Tests for the add_shadow function in overlay.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _add_shadow
+
+
+class TestAddShadow(unittest.TestCase):
+    """Test the add_shadow function."""
+
+    def setUp(self):
+        """Set up the test data."""
+        self.hillshade = np.random.rand(6, 4, 3)  # Image of a 4x6 heightmap
+        self.shadowmap = np.random.rand(4, 6)  # Heightmap-shaped shadow map
+
+    def expected(self, hillshade, shadowmap, max_darken):
+        """Compute the expected result without chunking."""
+        factor = max_darken + (1 - max_darken) * shadowmap.T
+        return hillshade * factor[..., np.newaxis]
+
+    def test_add_shadow_in_place(self):
+        """Test that the shadow is multiplied into the hillshade buffer."""
+        expected = self.expected(self.hillshade, self.shadowmap, 0.7)
+        result = _add_shadow(self.hillshade, self.shadowmap)
+        self.assertIs(result, self.hillshade)
+        np.testing.assert_allclose(result, expected)
+
+    def test_add_shadow_chunked(self):
+        """Test that row chunking gives the same result."""
+        expected = self.expected(self.hillshade, self.shadowmap, 0.2)
+        with patch("rayshaderpy.overlay._row_chunks") as mock_chunks:
+            mock_chunks.return_value = [slice(i, i + 1) for i in range(6)]
+            result = _add_shadow(self.hillshade, self.shadowmap, max_darken=0.2)
+        np.testing.assert_allclose(result, expected)
+
+    def test_add_shadow_uint8(self):
+        """Test the shadow on a compact uint8 hillshade."""
+        hillshade = np.full((6, 4, 3), 200, dtype=np.uint8)
+        shadowmap = np.zeros((4, 6))
+        result = _add_shadow(hillshade, shadowmap, max_darken=0.5)
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result, 100)
+
+    def test_add_shadow_dimension_mismatch(self):
+        """Test the add_shadow function with a shadow map of the wrong shape."""
+        with self.assertRaises(ValueError) as context:
+            _add_shadow(self.hillshade, np.random.rand(6, 4))
+        self.assertIn("shadowmap dimensions do not match", str(context.exception))
+
+    def test_add_shadow_invalid_max_darken(self):
+        """Test the add_shadow function with max_darken out of range."""
+        with self.assertRaises(ValueError) as context:
+            _add_shadow(self.hillshade, self.shadowmap, max_darken=2)
+        self.assertIn("max_darken must be between 0 and 1", str(context.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,10 +24,43 @@ class TestAddWater(unittest.TestCase):
     def test_add_water_valid_input(self, mock_r):
         """Test the add_water function with valid input."""
         mock_r.return_value = self.hillshade
-        result = _add_water(self.hillshade, self.watermap)
+        result = _add_water(self.hillshade, self.watermap, method="r")
         np.testing.assert_array_equal(result, mock_r.return_value)
         mock_r.assert_called_once()
 
+    @patch("rayshaderpy.overlay.ro.r")
+    def test_add_water_numpy_in_place(self, mock_r):
+        """Test that the numpy method paints the water color in place without calling R."""
+        hillshade = self.hillshade.copy()
+        result = _add_water(hillshade, self.watermap, color="#ff8000")
+        self.assertIs(result, hillshade)
+        water = self.watermap.T == 1
+        np.testing.assert_allclose(
+            result[water], np.tile([1, 128 / 255, 0], (water.sum(), 1))
+        )
+        np.testing.assert_array_equal(result[~water], self.hillshade[~water])
+        mock_r.assert_not_called()
+
+    def test_add_water_numpy_palette_uint8(self):
+        """Test the numpy method with a built-in color and a uint8 hillshade."""
+        hillshade = np.random.randint(0, 256, size=(100, 100, 3), dtype=np.uint8)
+        watermap = self.watermap.astype(bool)
+        result = _add_water(hillshade, watermap, color="unicorn")
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(
+            result[watermap.T], np.tile([255, 0, 255], (watermap.sum(), 1))
+        )
+
+    def test_add_water_numpy_dtype_conversion(self):
+        """Test that the numpy method converts the hillshade to the requested dtype."""
+        result = _add_water(self.hillshade.copy(), self.watermap, dtype="uint8")
+        self.assertEqual(result.dtype, np.uint8)
+
+    def test_add_water_shape_mismatch(self):
+        """Test that a watermap of another size than the hillshade is rejected."""
+        with self.assertRaises(ValueError):
+            _add_water(self.hillshade, np.ones((50, 100)))
+
     def test_add_water_invalid_hillshade_dimension(self):
         """Test the add_water function with invalid hillshade dimensions."""
         hillshade = np.random.rand(100, 100)  # Invalid 2D array
@@ -51,10 +84,12 @@ class TestAddWater(unittest.TestCase):
     def test_add_water_invalid_watermap_values(self):
         """Test the add_water function with invalid watermap values."""
         watermap = np.random.rand(100, 100)  # Invalid values
+        hillshade = self.hillshade.copy()
         with self.assertRaises(
             ValueError, msg="watermap must contain only values 1 and 0"
         ):
-            _add_water(self.hillshade, watermap)
+            _add_water(hillshade, watermap)
+        np.testing.assert_array_equal(hillshade, self.hillshade)
 
 
 if __name__ == "__main__":
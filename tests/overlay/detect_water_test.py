@@ -9,7 +9,9 @@ import numpy as np
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+from rayshaderpy._cache import _RESULT_CACHE
 from rayshaderpy.overlay import _detect_water
+from rayshaderpy.renderer import Renderer
 
 
 class TestDetectWater(unittest.TestCase):
@@ -23,7 +25,7 @@ class TestDetectWater(unittest.TestCase):
     def test_detect_water_default_params(self, mock_r):
         """Test the detect_water function with default parameters."""
         mock_r.return_value = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]])
-        result = _detect_water(self.heightmap)
+        result = _detect_water(self.heightmap, method="r")
         np.testing.assert_array_equal(result, mock_r.return_value)
         mock_r.assert_called_once()
 
@@ -31,7 +33,7 @@ class TestDetectWater(unittest.TestCase):
     def test_detect_water_with_min_area(self, mock_r):
         """Test the detect_water function with min_area parameter."""
         mock_r.return_value = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]])
-        result = _detect_water(self.heightmap, min_area=0.5)
+        result = _detect_water(self.heightmap, min_area=0.5, method="r")
         np.testing.assert_array_equal(result, mock_r.return_value)
         mock_r.assert_called_once()
 
@@ -39,7 +41,7 @@ class TestDetectWater(unittest.TestCase):
     def test_detect_water_with_max_height(self, mock_r):
         """Test the detect_water function with max_height parameter."""
         mock_r.return_value = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]])
-        result = _detect_water(self.heightmap, max_height=5)
+        result = _detect_water(self.heightmap, max_height=5, method="r")
         np.testing.assert_array_equal(result, mock_r.return_value)
         mock_r.assert_called_once()
 
@@ -48,10 +50,80 @@ class TestDetectWater(unittest.TestCase):
         """Test the detect_water function with normalvectors parameter."""
         mock_r.return_value = np.array([[0, 0, 0], [0, 1, 0], [0, 0, 0]])
         normalvectors = np.array([[0, 0, 1], [0, 0, 1], [0, 0, 1]])
-        result = _detect_water(self.heightmap, normalvectors=normalvectors)
+        result = _detect_water(self.heightmap, normalvectors=normalvectors, method="r")
         np.testing.assert_array_equal(result, mock_r.return_value)
         mock_r.assert_called_once()
 
 
+class TestDetectWaterNumpy(unittest.TestCase):
+    """Test the NumPy implementation of the detect_water function."""
+
+    def setUp(self):
+        """Set up a sloped terrain with two flat lakes with 4 and 2 interior points."""
+        rows, cols = np.mgrid[0:12, 0:10]
+        self.heightmap = (rows * 3.0 + cols * 2.0).astype(np.float32)
+        self.heightmap[1:5, 1:5] = 0
+        self.heightmap[7:10, 5:9] = 0
+        self.lakes = np.zeros((12, 10), dtype=np.uint8)
+        self.lakes[2:4, 2:4] = 1
+        self.lakes[8, 6:8] = 1
+
+    def tearDown(self):
+        """Empty the shared cache."""
+        _RESULT_CACHE.clear()
+
+    @patch("rayshaderpy.overlay.ro.r")
+    def test_flat_areas_detected_without_r(self, mock_r):
+        """Test that flat interior points are detected without calling R."""
+        result = _detect_water(self.heightmap, min_area=1)
+        np.testing.assert_array_equal(result, self.lakes)
+        mock_r.assert_not_called()
+
+    def test_min_area(self):
+        """Test that groups smaller than min_area are removed."""
+        result = _detect_water(self.heightmap, min_area=3)
+        expected = self.lakes.copy()
+        expected[8] = 0
+        np.testing.assert_array_equal(result, expected)
+
+    def test_max_height(self):
+        """Test that points above max_height are not water."""
+        result = _detect_water(self.heightmap + 10, min_area=1, max_height=5)
+        np.testing.assert_array_equal(result, 0)
+
+    def test_keep_groups(self):
+        """Test that the group numbers are kept."""
+        result = _detect_water(self.heightmap, min_area=1, keep_groups=True)
+        self.assertEqual(set(np.unique(result)), {0, 1, 2})
+        self.assertEqual(len(set(np.unique(result[2:4, 2:4]))), 1)
+
+    def test_renderer_dtype_keeps_masks(self):
+        """Test that the float dtype of a renderer leaves the uint8 mask and the group labels alone."""
+        renderer = Renderer(dtype="float32")
+        renderer.heightmap = self.heightmap
+        self.assertEqual(renderer.detect_water(min_area=1).dtype, np.uint8)
+        groups = renderer.detect_water(min_area=1, keep_groups=True)
+        self.assertTrue(np.issubdtype(groups.dtype, np.integer))
+
+    def test_groups_merged_across_bands(self):
+        """Test that groups split over several bands of rows are merged."""
+        heightmap = np.ones((8, 8))
+        heightmap[:, 4] = 10  # Wall splitting the map into two U shapes
+        heightmap[7, :] = 1
+        with patch("rayshaderpy.overlay._row_chunks") as mock_chunks:
+            mock_chunks.side_effect = lambda n, _: (slice(i, i + 1) for i in range(n))
+            banded = _detect_water(heightmap, min_area=1, keep_groups=True)
+        _RESULT_CACHE.clear()
+        whole = _detect_water(heightmap, min_area=1, keep_groups=True)
+        np.testing.assert_array_equal(banded, whole)
+
+    def test_normalvectors(self):
+        """Test that pre-computed normals are used for the classification."""
+        normalvectors = np.zeros((12, 10, 3))
+        normalvectors[..., 2] = 1
+        result = _detect_water(self.heightmap, normalvectors=normalvectors, min_area=1)
+        np.testing.assert_array_equal(result, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+"""Tests for the generate_altitude_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._cache import _RESULT_CACHE
+from rayshaderpy.overlay import _elevation_index, _generate_altitude_overlay
+
+
+class TestGenerateAltitudeOverlay(unittest.TestCase):
+    """Test the generate_altitude_overlay function."""
+
+    def setUp(self):
+        """Set up a heightmap whose elevation increases with the image rows."""
+        self.heightmap = np.tile(np.arange(30.0), (20, 1))
+        self.hillshade = np.random.rand(30, 20, 3)
+
+    def tearDown(self):
+        """Empty the shared cache."""
+        _RESULT_CACHE.clear()
+
+    def test_transition(self):
+        """Test that the overlay fades out linearly between the transitions."""
+        overlay = _generate_altitude_overlay(self.hillshade, self.heightmap, 10, 20)
+        self.assertEqual(overlay.shape, (30, 20, 4))
+        np.testing.assert_allclose(overlay[..., :3], self.hillshade, rtol=1e-6)
+        np.testing.assert_allclose(
+            overlay[:, 0, 3], np.clip(1 - (np.arange(30) - 10) / 10, 0, 1), atol=1e-3
+        )
+
+    def test_above_with_color(self):
+        """Test a sharp transition above which a single color is visible."""
+        overlay = _generate_altitude_overlay("#00ff00", self.heightmap, 10, lower=False)
+        np.testing.assert_array_equal(overlay[9, 0], [0, 1, 0, 0])
+        np.testing.assert_array_equal(overlay[10, 0], [0, 1, 0, 1])
+
+    def test_uint8_hillshade_and_nan(self):
+        """Test a uint8 hillshade and missing elevations, which are never visible."""
+        heightmap = self.heightmap.copy()
+        heightmap[0, 0] = np.nan
+        hillshade = np.full((30, 20, 3), 255, dtype=np.uint8)
+        overlay = _generate_altitude_overlay(hillshade, heightmap, 100)
+        np.testing.assert_array_equal(overlay[..., :3], 1)
+        self.assertEqual(overlay[0, 0, 3], 0)
+        self.assertEqual(overlay[1, 0, 3], 1)
+
+    def test_index_is_reused(self):
+        """Test that the elevation index is computed once per heightmap."""
+        _elevation_index(self.heightmap)
+        with patch("rayshaderpy.overlay.np.nanmin") as mock_nanmin:
+            _generate_altitude_overlay(self.hillshade, self.heightmap, 5, 15)
+            _generate_altitude_overlay(self.hillshade, self.heightmap, 15, 25)
+            mock_nanmin.assert_not_called()
+
+    def test_invalid_input(self):
+        """Test the generate_altitude_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_altitude_overlay(self.hillshade, self.heightmap.T, 10)
+        with self.assertRaises(ValueError):
+            _generate_altitude_overlay(self.hillshade, self.heightmap, 20, 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
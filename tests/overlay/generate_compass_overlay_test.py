@@ -0,0 +1,51 @@
+"""Tests for the generate_compass_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._sprites import _compass_sprite
+from rayshaderpy.overlay import _generate_compass_overlay
+
+
+class TestGenerateCompassOverlay(unittest.TestCase):
+    """Test the generate_compass_overlay function."""
+
+    def test_position(self):
+        """Test that the compass is centered on its position."""
+        overlay = _generate_compass_overlay(x=0.5, y=0.5, width=200, height=100)
+        self.assertEqual(overlay.shape, (100, 200, 4))
+        rows, cols = np.nonzero(overlay[..., 3] > 0.5)
+        self.assertAlmostEqual(np.median(cols), 100, delta=2)
+        self.assertLess(rows.min(), 50 - 15)
+        self.assertGreater(rows.max(), 50 + 10)
+        self.assertEqual(overlay[:, :70, 3].max(), 0)
+
+    def test_sprite_is_cached(self):
+        """Test that the sprite is rendered once per style and size."""
+        _compass_sprite.cache_clear()
+        first = _generate_compass_overlay(width=200, height=100, bearing=30)
+        second = _generate_compass_overlay(width=200, height=100, bearing=30)
+        np.testing.assert_array_equal(first, second)
+        info = _compass_sprite.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
+    def test_clipped_at_edges(self):
+        """Test that a compass partly outside the overlay is clipped."""
+        overlay = _generate_compass_overlay(x=1, y=0, width=200, height=100)
+        self.assertGreater(overlay[..., 3].max(), 0)
+
+    def test_invalid_input(self):
+        """Test the generate_compass_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_compass_overlay()
+        with self.assertRaises(ValueError):
+            _generate_compass_overlay(size=0.001, width=100, height=100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests for the generate_contour_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+from scipy import ndimage
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _generate_contour_overlay
+
+
+class TestGenerateContourOverlay(unittest.TestCase):
+    """Test the generate_contour_overlay function."""
+
+    def setUp(self):
+        """Set up a cone whose contours are circles around the center."""
+        rows, cols = np.mgrid[0:81, 0:61]
+        self.heightmap = np.hypot(rows - 40, cols - 30)
+
+    def _ring_distance(self, overlay, radii):
+        """Return the distances of the drawn pixels to the nearest expected circle."""
+        image_rows, image_cols = np.nonzero(overlay[..., 3] > 0.5)
+        distance = np.hypot(image_cols - 40, image_rows - 30)
+        return np.min([np.abs(distance - r) for r in radii], axis=0)
+
+    def test_shape_and_orientation(self):
+        """Test that the overlay has the orientation of the hillshade."""
+        overlay = _generate_contour_overlay(self.heightmap, levels=[10, 20])
+        self.assertEqual(overlay.shape, (61, 81, 4))
+        self.assertEqual(overlay.dtype, np.float32)
+        self.assertLessEqual(overlay.max(), 1)
+        self.assertGreaterEqual(overlay.min(), 0)
+
+    def test_lines_follow_levels(self):
+        """Test that the lines of all levels lie on the expected circles."""
+        for antialias in (True, False):
+            overlay = _generate_contour_overlay(
+                self.heightmap, levels=[10, 20], antialias=antialias
+            )
+            distance = self._ring_distance(overlay, [10, 20])
+            self.assertGreater(distance.size, 2 * np.pi * 25)
+            self.assertLess(distance.max(), 1)
+
+    def test_closed_lines(self):
+        """Test that a contour line is drawn without gaps."""
+        overlay = _generate_contour_overlay(
+            self.heightmap, levels=[15], antialias=False, resolution_multiply=2
+        )
+        drawn = overlay[..., 3] > 0
+        _, n_components = ndimage.label(drawn, structure=np.ones((3, 3)))
+        self.assertEqual(n_components, 1)
+        self.assertEqual(drawn.shape, (122, 162))
+
+    def test_colors_per_level(self):
+        """Test that each level is drawn in its own color."""
+        overlay = _generate_contour_overlay(
+            self.heightmap,
+            levels=[20, 10],
+            color=["#ff0000", "#0000ff"],
+            antialias=False,
+        )
+        drawn = overlay[..., 3] > 0
+        image_rows, image_cols = np.nonzero(drawn)
+        inner = np.hypot(image_cols - 40, image_rows - 30) < 15
+        np.testing.assert_allclose(overlay[drawn][inner, :3], [[0, 0, 1]] * inner.sum())
+        np.testing.assert_allclose(
+            overlay[drawn][~inner, :3], [[1, 0, 0]] * (~inner).sum()
+        )
+
+    def test_colors_share_one_coverage(self):
+        """Test that colored lines have the coverage of single-color lines, with widened colors."""
+        for antialias in (True, False):
+            params = dict(levels=[10, 20], linewidth=3, antialias=antialias)
+            plain = _generate_contour_overlay(self.heightmap, **params)
+            colored = _generate_contour_overlay(
+                self.heightmap, color=["#0000ff", "#ff0000"], **params
+            )
+            np.testing.assert_array_equal(colored[..., 3], plain[..., 3])
+            drawn = colored[..., 3] > 0
+            self.assertTrue(np.isin(colored[drawn, 2], [0, 1]).all())
+
+    def test_default_levels(self):
+        """Test that the default levels are spread over the elevation range."""
+        overlay = _generate_contour_overlay(self.heightmap, nlevels=3)
+        self.assertGreater(np.count_nonzero(overlay[..., 3]), 0)
+
+    def test_linewidth(self):
+        """Test that wider lines cover more pixels."""
+        thin = _generate_contour_overlay(self.heightmap, levels=[15])
+        thick = _generate_contour_overlay(self.heightmap, levels=[15], linewidth=3)
+        self.assertGreater(
+            np.count_nonzero(thick[..., 3] > 0.5), np.count_nonzero(thin[..., 3] > 0.5)
+        )
+
+    def test_invalid_input(self):
+        """Test the generate_contour_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_contour_overlay(np.random.rand(5, 5, 2))
+        with self.assertRaises(ValueError):
+            _generate_contour_overlay(self.heightmap, levels=[1, 2], color=["red"])
+        with self.assertRaises(ValueError):
+            _generate_contour_overlay(self.heightmap, resolution_multiply=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
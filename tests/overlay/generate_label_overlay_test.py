@@ -0,0 +1,73 @@
+"""Tests for the generate_label_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._sprites import _glyph_sprite, _text_sprite
+from rayshaderpy.overlay import _generate_label_overlay
+
+
+class TestGenerateLabelOverlay(unittest.TestCase):
+    """Test the generate_label_overlay function."""
+
+    def setUp(self):
+        """Set up an extent of 200 x 100 map units on a 200 x 100 overlay."""
+        self.extent = (0, 200, 0, 100)
+        self.size = {"width": 200, "height": 100}
+
+    def test_labels_are_centered(self):
+        """Test that each label is centered on its position."""
+        overlay = _generate_label_overlay(
+            ["Lake", "Peak"],
+            [50, 150],
+            [50, 20],
+            self.extent,
+            color="#ff0000",
+            **self.size
+        )
+        self.assertEqual(overlay.shape, (100, 200, 4))
+        alpha = overlay[..., 3]
+        for row, col in ((50, 50), (80, 150)):
+            window = (slice(row - 15, row + 15), slice(col - 30, col + 30))
+            rows, cols = np.nonzero(alpha[window] > 0.5)
+            self.assertAlmostEqual(rows.mean() + row - 15, row, delta=3)
+            self.assertAlmostEqual(cols.mean() + col - 30, col, delta=3)
+        np.testing.assert_allclose(
+            overlay[alpha > 0.5, :3], [[1, 0, 0]] * (alpha > 0.5).sum()
+        )
+
+    def test_halo(self):
+        """Test that the halo surrounds the text."""
+        plain = _generate_label_overlay("A", 100, 50, self.extent, **self.size)
+        halo = _generate_label_overlay(
+            "A", 100, 50, self.extent, halo_color="white", halo_expand=2, **self.size
+        )
+        self.assertGreater(
+            np.count_nonzero(halo[..., 3]), np.count_nonzero(plain[..., 3])
+        )
+
+    def test_glyphs_are_cached(self):
+        """Test that repeated labels reuse the cached sprites."""
+        _generate_label_overlay(
+            ["ab", "ba"], [50, 150], [50, 50], self.extent, **self.size
+        )
+        with patch("rayshaderpy._sprites.TextPath") as mock_path:
+            _generate_label_overlay("ab" * 3, 60, 40, self.extent, **self.size)
+            mock_path.assert_not_called()
+        self.assertGreater(_glyph_sprite.cache_info().hits, 0)
+        self.assertGreater(_text_sprite.cache_info().currsize, 0)
+
+    def test_invalid_input(self):
+        """Test the generate_label_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_label_overlay(["a", "b"], [1], [1], self.extent, **self.size)
+
+
+if __name__ == "__main__":
+    unittest.main()
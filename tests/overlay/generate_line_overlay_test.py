@@ -0,0 +1,70 @@
+"""Tests for the generate_line_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._raster import _draw_segments
+from rayshaderpy.overlay import _generate_line_overlay
+
+
+class TestGenerateLineOverlay(unittest.TestCase):
+    """Test the generate_line_overlay function."""
+
+    def setUp(self):
+        """Set up a heightmap of a raster with 20 rows and 40 columns covering the extent."""
+        self.heightmap = np.zeros((40, 20))
+        self.extent = (0, 40, 0, 20)
+
+    def test_numpy_lines(self):
+        """Test that separate lines are drawn without joining them."""
+        lines = [
+            np.array([[0.5, 15.5], [39.5, 15.5]]),
+            np.array([[0.5, 5.5], [39.5, 5.5]]),
+        ]
+        overlay = _generate_line_overlay(
+            lines, self.extent, heightmap=self.heightmap, antialias=False
+        )
+        self.assertEqual(overlay.shape, (20, 40, 4))
+        drawn = overlay[..., 3] > 0
+        np.testing.assert_array_equal(np.flatnonzero(drawn.any(axis=1)), [4, 14])
+        self.assertTrue(drawn[4].all() and drawn[14].all())
+
+    def test_geojson_antialiased(self):
+        """Test GeoJSON-like lines with antialiasing."""
+        geometry = [
+            {"type": "MultiLineString", "coordinates": [[[0, 10.25], [40, 10.25]]]},
+        ]
+        overlay = _generate_line_overlay(
+            geometry, self.extent, heightmap=self.heightmap
+        )
+        alpha = overlay[:, 20, 3]
+        self.assertEqual(np.count_nonzero(alpha), 2)
+        np.testing.assert_allclose(alpha[[9, 10]], [0.75, 0.25], atol=0.05)
+
+    def test_linewidth(self):
+        """Test that wider lines cover more rows."""
+        line = np.array([[0.5, 10.5], [39.5, 10.5]])
+        overlay = _generate_line_overlay(
+            line, self.extent, heightmap=self.heightmap, linewidth=3, antialias=False
+        )
+        np.testing.assert_array_equal(
+            np.flatnonzero(overlay[..., 3].any(axis=1)), [8, 9, 10]
+        )
+
+    def test_overlapping_intensities(self):
+        """Test that the stronger of overlapping aliased segments is kept on every pixel."""
+        coverage = np.zeros((5, 10))
+        start = np.array([[2.0, 0.0], [2.0, 0.0]])
+        end = np.array([[2.0, 9.0], [2.0, 9.0]])
+        _draw_segments(coverage, start, end, False, intensity=np.array([0.9, 0.2]))
+        np.testing.assert_allclose(coverage[2], 0.9)
+        np.testing.assert_array_equal(np.delete(coverage, 2, axis=0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
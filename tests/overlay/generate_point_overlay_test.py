@@ -0,0 +1,83 @@
+"""Tests for the generate_point_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+from rasterio.coords import BoundingBox
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _generate_point_overlay
+
+
+class TestGeneratePointOverlay(unittest.TestCase):
+    """Test the generate_point_overlay function."""
+
+    def setUp(self):
+        """Set up a heightmap of a raster with 20 rows and 40 columns covering the extent."""
+        self.heightmap = np.zeros((40, 20))
+        self.extent = (0, 40, 0, 20)
+
+    def test_numpy_points(self):
+        """Test that points are burned at their pixel, north up."""
+        points = np.array([[0.5, 19.5], [39.5, 0.5], [100, 100], [np.nan, 1]])
+        overlay = _generate_point_overlay(
+            points, self.extent, heightmap=self.heightmap, color="#ff0000"
+        )
+        self.assertEqual(overlay.shape, (20, 40, 4))
+        self.assertEqual(np.argwhere(overlay[..., 3] > 0).tolist(), [[0, 0], [19, 39]])
+        np.testing.assert_array_equal(overlay[0, 0], [1, 0, 0, 1])
+
+    def test_geojson_points(self):
+        """Test GeoJSON-like points and a rasterio-style extent."""
+        geometry = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": [10.5, 10.5]},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": "MultiPoint",
+                        "coordinates": [[1.5, 1.5], [2.5, 1.5]],
+                    },
+                },
+            ],
+        }
+        extent = BoundingBox(left=0, bottom=0, right=40, top=20)
+        overlay = _generate_point_overlay(geometry, extent, width=40, height=20)
+        self.assertEqual(
+            np.argwhere(overlay[..., 3] > 0).tolist(), [[9, 10], [18, 1], [18, 2]]
+        )
+
+    def test_size_and_resolution(self):
+        """Test that the point size and the resolution multiplier enlarge the points."""
+        points = np.array([[20, 10]])
+        overlay = _generate_point_overlay(
+            points, self.extent, heightmap=self.heightmap, size=5, resolution_multiply=2
+        )
+        self.assertEqual(overlay.shape, (40, 80, 4))
+        self.assertGreater(np.count_nonzero(overlay[..., 3]), 9)
+
+    def test_invalid_input(self):
+        """Test the generate_point_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_point_overlay(np.zeros((3, 2)), self.extent)
+        with self.assertRaises(ValueError):
+            _generate_point_overlay(
+                np.zeros((3, 2)), (0, 1, 2), heightmap=self.heightmap
+            )
+        with self.assertRaises(ValueError):
+            _generate_point_overlay(
+                {"type": "LineString", "coordinates": [[0, 0], [1, 1]]},
+                self.extent,
+                heightmap=self.heightmap,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for the generate_polygon_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _generate_polygon_overlay
+
+
+class TestGeneratePolygonOverlay(unittest.TestCase):
+    """Test the generate_polygon_overlay function."""
+
+    def setUp(self):
+        """Set up a heightmap of a raster with 20 rows and 40 columns covering the extent."""
+        self.heightmap = np.zeros((40, 20))
+        self.extent = (0, 40, 0, 20)
+        self.square = np.array([[10, 5], [20, 5], [20, 15], [10, 15]])
+
+    def test_numpy_polygons(self):
+        """Test that open numpy rings are filled with one color per polygon."""
+        polygons = [self.square, self.square + [20, 0]]
+        overlay = _generate_polygon_overlay(
+            polygons,
+            self.extent,
+            heightmap=self.heightmap,
+            palette=["#ff0000", "#0000ff"],
+            linecolor=None,
+        )
+        self.assertEqual(overlay.shape, (20, 40, 4))
+        filled = overlay[..., 3] > 0
+        self.assertEqual(filled.sum(), 200)
+        np.testing.assert_array_equal(overlay[10, 15], [1, 0, 0, 1])
+        np.testing.assert_array_equal(overlay[10, 35], [0, 0, 1, 1])
+
+    def test_geojson_outline(self):
+        """Test that GeoJSON-like polygons get an outline over their fill."""
+        geometry = {
+            "type": "Feature",
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [self.square.tolist() + [[10, 5]]],
+            },
+        }
+        overlay = _generate_polygon_overlay(
+            geometry, self.extent, heightmap=self.heightmap, antialias=False
+        )
+        np.testing.assert_array_equal(overlay[10, 15], [1, 1, 1, 1])
+        np.testing.assert_array_equal(overlay[10, 10, :3], [0, 0, 0])
+
+    def test_invalid_palette(self):
+        """Test that the palette must match the number of polygons."""
+        with self.assertRaises(ValueError):
+            _generate_polygon_overlay(
+                [self.square],
+                self.extent,
+                heightmap=self.heightmap,
+                palette=["red", "blue"],
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Tests for the generate_scalebar_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.overlay import _generate_scalebar_overlay
+
+
+class TestGenerateScalebarOverlay(unittest.TestCase):
+    """Test the generate_scalebar_overlay function."""
+
+    def setUp(self):
+        """Set up an extent of 4000 x 3000 map units."""
+        self.extent = (0, 4000, 0, 3000)
+
+    def test_bar_length(self):
+        """Test that the bar spans its length in map units."""
+        overlay = _generate_scalebar_overlay(
+            self.extent, 1000, labels=[], thickness=4, width=400, height=300
+        )
+        self.assertEqual(overlay.shape, (300, 400, 4))
+        rows, cols = np.nonzero(overlay[..., 3] > 0)
+        self.assertEqual(cols.min(), 19)
+        self.assertEqual(cols.max(), 120)
+        self.assertEqual(rows.max(), 284)
+        row = overlay[rows.min() + 2]
+        np.testing.assert_array_equal(row[30, :3], [1, 1, 1])
+        np.testing.assert_array_equal(row[100, :3], [0, 0, 0])
+
+    def test_labels(self):
+        """Test that the default labels are drawn under the bar."""
+        with_labels = _generate_scalebar_overlay(
+            self.extent, 1000, width=400, height=300
+        )
+        without = _generate_scalebar_overlay(
+            self.extent, 1000, labels=[], width=400, height=300
+        )
+        self.assertGreater(
+            np.count_nonzero(with_labels[..., 3]), np.count_nonzero(without[..., 3])
+        )
+
+    def test_invalid_input(self):
+        """Test the generate_scalebar_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_scalebar_overlay(self.extent, -1, width=400, height=300)
+        with self.assertRaises(ValueError):
+            _generate_scalebar_overlay(self.extent, 1, width=400, height=300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""Tests for the generate_waterline_overlay function in overlay.py."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._cache import _RESULT_CACHE
+from rayshaderpy.overlay import _generate_waterline_overlay
+
+
+class TestGenerateWaterlineOverlay(unittest.TestCase):
+    """Test the generate_waterline_overlay function."""
+
+    def setUp(self):
+        """Set up a square lake in the middle of the map."""
+        self.watermap = np.zeros((60, 60))
+        self.watermap[20:40, 20:40] = 1
+
+    def tearDown(self):
+        """Empty the shared cache."""
+        _RESULT_CACHE.clear()
+
+    def test_lines_around_water(self):
+        """Test that the lines surround the water and fade out with the distance."""
+        overlay = _generate_waterline_overlay(
+            self.watermap, boolean=True, breaks=2, min=0.05, max=0.5, evenly_spaced=True
+        )
+        self.assertEqual(overlay.shape, (60, 60, 4))
+        alpha = overlay[..., 3]
+        self.assertLess(alpha[20:40, 20:40].max(), 1e-6)
+        near, far = alpha[30, 17:20].max(), alpha[30, 0:14].max()
+        self.assertGreater(near, 0.5)
+        self.assertEqual(far, 0)
+        np.testing.assert_allclose(overlay[alpha > 0, :3], 1)
+
+    def test_no_fade(self):
+        """Test that without fading all lines are opaque."""
+        overlay = _generate_waterline_overlay(
+            self.watermap, boolean=True, breaks=3, fade=False, antialias=False
+        )
+        self.assertEqual(np.unique(overlay[..., 3]).tolist(), [0, 1])
+
+    def test_distance_is_reused(self):
+        """Test that the distance to water is computed once for several variants."""
+        _generate_waterline_overlay(self.watermap, boolean=True)
+        with patch("rayshaderpy.overlay.ndimage.distance_transform_edt") as mock_edt:
+            _generate_waterline_overlay(
+                self.watermap, boolean=True, breaks=5, color="blue"
+            )
+            mock_edt.assert_not_called()
+
+    def test_invalid_input(self):
+        """Test the generate_waterline_overlay function with invalid input."""
+        with self.assertRaises(ValueError):
+            _generate_waterline_overlay(self.watermap, boolean=True, min=0.5, max=0.1)
+        with self.assertRaises(ValueError):
+            _generate_waterline_overlay(np.zeros((10, 10)), boolean=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""Tests for the local recomputation of the layers after heightmap edits."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy.helpers import _calculate_normal
+from rayshaderpy.overlay import _detect_water
+from rayshaderpy.renderer import Renderer
+
+
+def fake_sphere_shade(heightmap, zscale=1, dtype="float64", **kwargs):
+    """Shade each point from its normal, like sphere_shade does, without R."""
+    normals = _calculate_normal(heightmap, zscale)
+    return ((normals + 1) / 2).transpose(1, 0, 2).astype(dtype)
+
+
+@patch("rayshaderpy._patch._sphere_shade", side_effect=fake_sphere_shade)
+@patch("rayshaderpy.renderer._sphere_shade", side_effect=fake_sphere_shade)
+class TestUpdateHeightmap(unittest.TestCase):
+    """Test the update_heightmap method of the Renderer class."""
+
+    def setUp(self):
+        """Set up a rough heightmap with two lakes, one of them large."""
+        rng = np.random.default_rng(0)
+        self.heightmap = rng.random((80, 60)) * 10
+        self.heightmap[5:40, 5:50] = 0
+        self.heightmap[60:70, 10:20] = 0
+
+    def render(self, heightmap):
+        """Run the steps derived from a heightmap, recording them in a renderer."""
+        renderer = Renderer()
+        renderer.heightmap = heightmap
+        renderer.calculate_normal(zscale=2)
+        renderer.sphere_shade(zscale=2, normalvectors=renderer.normals)
+        renderer.detect_water(zscale=2, min_area=40, normalvectors=renderer.normals)
+        renderer.add_layer("water", param="#0000ff")
+        renderer.hillshade
+        return renderer
+
+    def assert_matches_full(self, renderer):
+        """Check the patched layers against a full recomputation."""
+        full = self.render(renderer.heightmap.copy())
+        np.testing.assert_allclose(renderer.normals, full.normals)
+        np.testing.assert_allclose(renderer.layers.base, full.layers.base)
+        np.testing.assert_array_equal(renderer.watermap, full.watermap)
+        np.testing.assert_allclose(renderer.hillshade, full.hillshade)
+
+    def test_edit_matches_full_recompute(self, *mocks):
+        """Test that raising ground inside a large lake is patched exactly."""
+        renderer = self.render(self.heightmap.copy())
+        rows, cols = renderer.update_heightmap(np.full((4, 4), 5.0), 20, 20)
+        self.assertEqual((rows.start, cols.start), (0, 0))
+        self.assert_matches_full(renderer)
+
+    def test_split_lake_drops_small_part(self, *mocks):
+        """Test that a lake cut below the minimum area by an edit disappears outside the dirty window."""
+        renderer = self.render(self.heightmap.copy())
+        self.assertEqual(renderer.watermap[60:70, 10:20].max(), 1)
+        renderer.update_heightmap(np.full((2, 14), 5.0), 64, 8)
+        self.assertEqual(renderer.watermap[60:70, 10:20].max(), 0)
+        self.assert_matches_full(renderer)
+
+    def test_only_window_is_shaded(self, mock_shade, mock_patch_shade):
+        """Test that the shading is recomputed over the window grown by the halo only."""
+        renderer = self.render(self.heightmap.copy())
+        renderer.update_heightmap(np.ones((5, 5)), 70, 40, halo=2)
+        shaded = mock_patch_shade.call_args.args[0]
+        self.assertEqual(shaded.shape, (5 + 2 * 3, 5 + 2 * 3))
+
+    def test_eager_layers_are_kept(self, mock_shade, mock_patch_shade):
+        """Test that an edit does not re-shade a base painted by add_water."""
+        renderer = Renderer()
+        renderer.heightmap = self.heightmap.copy()
+        renderer.sphere_shade(zscale=2)
+        renderer.detect_water(zscale=2, min_area=40)
+        renderer.add_water(color="#0000ff")
+        blue = np.all(renderer.hillshade == [0, 0, 1], axis=2).sum()
+        self.assertGreater(blue, 0)
+
+        renderer.update_heightmap(np.zeros((4, 4)), 20, 20)
+        mock_patch_shade.assert_not_called()
+        self.assertEqual(np.all(renderer.hillshade == [0, 0, 1], axis=2).sum(), blue)
+
+    def test_outputs_from_other_inputs_are_left(self, *mocks):
+        """Test that a watermap detected from another heightmap is not patched."""
+        renderer = self.render(self.heightmap.copy())
+        renderer.watermap = _detect_water(self.heightmap, zscale=2, min_area=40)
+        watermap = renderer.watermap.copy()
+        renderer.update_heightmap(np.full((4, 4), 5.0), 20, 20)
+        np.testing.assert_array_equal(renderer.watermap, watermap)
+
+    def test_invalid_input(self, *mocks):
+        """Test the update_heightmap method with invalid input."""
+        renderer = Renderer()
+        with self.assertRaises(ValueError):
+            renderer.update_heightmap(np.ones((2, 2)), 0, 0)
+        renderer.heightmap = self.heightmap.copy()
+        with self.assertRaises(ValueError):
+            renderer.update_heightmap(np.ones((2, 2)), 79, 0)
+        with self.assertRaises(ValueError):
+            renderer.update_heightmap(np.ones(2), 0, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+"""Tests for the pipeline of memoized Renderer steps."""
+
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy._cache import clear_cache
+from rayshaderpy.pipeline import Pipeline
+
+
+class TestPipeline(unittest.TestCase):
+    """Test the Pipeline class."""
+
+    def setUp(self):
+        """Set up a pipeline detecting the water of a heightmap and painting it on a hillshade."""
+        heightmap = np.random.default_rng(0).random((40, 30))
+        heightmap[5:20, 5:20] = 0
+        self.load = MagicMock(return_value=heightmap)
+        self.shade = MagicMock(
+            side_effect=lambda heightmap, value: np.full(
+                heightmap.T.shape + (3,), value
+            )
+        )
+
+        self.pipeline = Pipeline()
+        source = self.pipeline.add("heightmap", self.load)
+        normals = self.pipeline.add("normals", "calculate_normal", heightmap=source)
+        shade = self.pipeline.add("shade", self.shade, heightmap=source, value=0.5)
+        water = self.pipeline.add(
+            "water",
+            "detect_water",
+            heightmap=source,
+            normalvectors=normals,
+            min_area=10,
+        )
+        self.pipeline.add(
+            "image", "add_water", hillshade=shade, watermap=water, color="#ff0000"
+        )
+
+    def test_outputs_are_memoized(self):
+        """Test that running twice runs each node once."""
+        image = self.pipeline.run("image")
+        self.assertEqual(image.shape, (30, 40, 3))
+        np.testing.assert_array_equal(image[10, 10], [1, 0, 0])
+        np.testing.assert_array_equal(image[25, 35], [0.5, 0.5, 0.5])
+        self.assertIs(self.pipeline["image"], image)
+        self.load.assert_called_once()
+        self.shade.assert_called_once()
+
+    def test_set_invalidates_downstream_only(self):
+        """Test that changing a parameter only re-runs the node and its downstream nodes."""
+        self.pipeline.run()
+        water = self.pipeline["water"]
+        self.pipeline.set("shade", value=0.25)
+        self.assertTrue(self.pipeline.nodes["image"].dirty)
+        self.assertFalse(self.pipeline.nodes["water"].dirty)
+
+        image = self.pipeline.run("image")
+        np.testing.assert_array_equal(image[25, 35], [0.25, 0.25, 0.25])
+        self.assertIs(self.pipeline["water"], water)
+        self.load.assert_called_once()
+        self.assertEqual(self.shade.call_count, 2)
+
+    def test_unchanged_parameter_keeps_outputs(self):
+        """Test that setting a parameter to its current value invalidates nothing."""
+        self.pipeline.run()
+        self.pipeline.set("shade", value=0.5)
+        self.assertFalse(self.pipeline.nodes["image"].dirty)
+
+    def test_upstream_output_is_not_modified(self):
+        """Test that a step writing into its input leaves the cached upstream output intact."""
+        self.pipeline.run()
+        np.testing.assert_array_equal(self.pipeline["shade"], 0.5)
+
+    @patch("rayshaderpy.helpers.numpy2ri")
+    @patch("rayshaderpy.helpers.ro")
+    @patch("rayshaderpy.shading.ro")
+    def test_normals_feed_r_step(self, mock_shading_ro, mock_ro, mock_numpy2ri):
+        """Test that computed normals reach an R step as rayshader's list of normal matrices."""
+        mock_ro.globalenv = {}
+        mock_ro.ListVector.side_effect = dict
+        mock_numpy2ri.py2rpy.side_effect = lambda array: array
+        mock_shading_ro.r.return_value = np.full((30, 40, 3), 0.5)
+        clear_cache()
+        self.pipeline.add(
+            "sphere",
+            "sphere_shade",
+            heightmap=self.pipeline.nodes["heightmap"],
+            normalvectors=self.pipeline.nodes["normals"],
+        )
+        self.pipeline.run("sphere")
+
+        normals = self.pipeline["normals"]
+        converted = mock_ro.globalenv["normalvectors"]
+        self.assertEqual(list(converted), ["x", "y", "z"])
+        np.testing.assert_array_equal(converted["z"][1:-1, 1:-1], normals[..., 2])
+        mock_shading_ro.r.assert_called_once()
+
+    def test_invalid_input(self):
+        """Test the Pipeline class with invalid input."""
+        with self.assertRaises(ValueError):
+            self.pipeline.add("shade", self.shade)
+        with self.assertRaises(ValueError):
+            self.pipeline.add("plot", "_plot_3d")
+        with self.assertRaises(ValueError):
+            self.pipeline.run("missing")
+        with self.assertRaises(ValueError):
+            self.pipeline.set("heightmap", value=self.pipeline.ref("shade"))
+        with self.assertRaises(ValueError):
+            Pipeline().add(
+                "normals", "calculate_normal", heightmap=self.pipeline.ref("heightmap")
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
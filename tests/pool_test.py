@@ -0,0 +1,217 @@
+"""Tests for the pool of render worker processes."""
+
+import os
+import sys
+import unittest
+from multiprocessing import dummy
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy.pool import RenderPool, _merge_passes, _split_samples
+from rayshaderpy.renderer import Renderer
+
+
+def fake_render_highquality(output="display", **params):
+    """Return an image encoding the light direction (or the samples) of the frame, or None when it is saved."""
+    if output == "discard":
+        return None
+    value = params.get("lightdirection", params.get("samples", 0)) % 256
+    return np.full((2, 3, 3), value, dtype=np.uint8)
+
+
+def fake_multiprocessing():
+    """Return a multiprocessing module whose pools run their workers as threads of the test process."""
+    module = MagicMock()
+    module.get_context.return_value.Pool.side_effect = dummy.Pool
+    return module
+
+
+@patch("rayshaderpy.pool.ro")
+@patch("rayshaderpy.pool.multiprocessing", new_callable=fake_multiprocessing)
+@patch("rayshaderpy.rendering._render_highquality", side_effect=fake_render_highquality)
+@patch("rayshaderpy.rendering._render_camera")
+@patch("rayshaderpy.renderer._plot_3d")
+class TestRenderPool(unittest.TestCase):
+    """Test the RenderPool class."""
+
+    def setUp(self):
+        """Set up a scene."""
+        self.heightmap = np.zeros((4, 5))
+        self.hillshade = np.zeros((5, 4, 3))
+
+    def test_render_in_order(self, mock_plot_3d, mock_camera, mock_render, *_):
+        """Test that every worker builds the scene and results come back in order."""
+        with RenderPool(3, self.heightmap, self.hillshade, zscale=5) as pool:
+            images = pool.render([{"lightdirection": d} for d in range(20)])
+        self.assertEqual([image[0, 0, 0] for image in images], list(range(20)))
+        self.assertEqual(mock_plot_3d.call_count, 3)
+        scene = mock_plot_3d.call_args.kwargs
+        self.assertEqual(scene["zscale"], 5)
+        self.assertEqual(scene["output"], "discard")
+        self.assertIs(scene["heightmap"], self.heightmap)
+        mock_camera.assert_not_called()
+
+    def test_camera_and_files(self, mock_plot_3d, mock_camera, mock_render, *_):
+        """Test that camera parameters move the camera and frames with a filename are saved."""
+        positions = np.array([[1.0, 2.0, 3.0]])
+        with RenderPool(1, self.heightmap, self.hillshade) as pool:
+            images = pool.render(
+                [{"theta": 30, "camera_location": positions[0], "filename": "f.png"}]
+            )
+        self.assertEqual(images, [None])
+        mock_camera.assert_called_once_with(theta=30)
+        params = mock_render.call_args.kwargs
+        self.assertEqual(params["camera_location"], (1.0, 2.0, 3.0))
+        self.assertEqual(params["output"], "discard")
+
+    def test_renderer_scene(self, mock_plot_3d, mock_camera, mock_render, *_):
+        """Test that the scene can come from a renderer."""
+        renderer = Renderer()
+        renderer.heightmap = self.heightmap
+        renderer.hillshade = self.hillshade
+        with RenderPool(2, renderer=renderer) as pool:
+            self.assertEqual(pool.processes, 2)
+            self.assertEqual(len(list(pool.imap([{}, {}]))), 2)
+        self.assertIs(mock_plot_3d.call_args.kwargs["hillshade"], self.hillshade)
+
+    def test_invalid_input(self, mock_plot_3d, mock_camera, mock_render, *_):
+        """Test that invalid scenes and frames raise a ValueError."""
+        with self.assertRaises(ValueError):
+            RenderPool(2, self.heightmap)
+        with self.assertRaises(ValueError):
+            RenderPool(0, self.heightmap, self.hillshade)
+        with self.assertRaises(ValueError):
+            RenderPool(2, self.heightmap, self.hillshade, output="array")
+        with RenderPool(1, self.heightmap, self.hillshade) as pool:
+            with self.assertRaises(ValueError):
+                pool.render([{"lightdirection": 0}, {"output": "array"}])
+            with self.assertRaises(ValueError):
+                pool.render(["theta"])
+
+    def test_spawned_workers(
+        self, mock_plot_3d, mock_camera, mock_render, mock_mp, mock_ro
+    ):
+        """Test that the workers are spawned rather than forked."""
+        with RenderPool(2, self.heightmap, self.hillshade):
+            pass
+        mock_mp.get_context.assert_called_once_with("spawn")
+
+    def test_render_highquality_passes(
+        self, mock_plot_3d, mock_camera, mock_render, mock_mp, mock_ro
+    ):
+        """Test that an image is rendered as seeded passes sharing the samples, then merged."""
+        with RenderPool(3, self.heightmap, self.hillshade) as pool:
+            image = pool.render_highquality(
+                samples=10, width=3, height=2, sample_method="sobol", output="array"
+            )
+        frames = [call.kwargs for call in mock_render.call_args_list]
+        self.assertEqual(sorted(frame["samples"] for frame in frames), [3, 3, 4])
+        self.assertTrue(all(frame["sample_method"] == "random" for frame in frames))
+        self.assertTrue(all(frame["width"] == 3 for frame in frames))
+        seeds = sorted(call.args[0] for call in mock_ro.r.call_args_list)
+        self.assertEqual(seeds, [f"set.seed({i})" for i in range(3)])
+        self.assertEqual(image.shape, (2, 3, 3))
+        self.assertEqual(image.dtype, np.uint8)
+
+    @patch("rayshaderpy.rendering._display_image")
+    def test_renderer_pool_option(
+        self, mock_display, mock_plot_3d, mock_camera, mock_render, mock_mp, mock_ro
+    ):
+        """Test that Renderer.render_highquality renders with a pool when one is given."""
+        renderer = Renderer()
+        with RenderPool(2, self.heightmap, self.hillshade) as pool:
+            renderer.render_highquality(samples=8, pool=pool)
+        self.assertEqual(mock_render.call_count, 2)
+        mock_display.assert_called_once()
+        self.assertFalse(os.path.exists(mock_display.call_args.args[0]))
+
+
+def fake_r(expression):
+    """Evaluate an R expression: png::readPNG decodes an existing file as a half-gray RGBA image."""
+    if expression == "png::readPNG":
+
+        def read_png(path):
+            assert os.path.exists(path)
+            return np.full((2, 3, 4), 0.5)
+
+        return read_png
+    return None
+
+
+@patch("rayshaderpy.pool.multiprocessing", new_callable=fake_multiprocessing)
+@patch("rayshaderpy.renderer._plot_3d")
+class TestRenderPoolWorkers(unittest.TestCase):
+    """Test the RenderPool workers with the real render_highquality and only R mocked."""
+
+    def setUp(self):
+        """Share one mocked R between the modules."""
+        self.r = MagicMock(globalenv={})
+        self.r.r.side_effect = fake_r
+        self.patches = [
+            patch(f"rayshaderpy.{module}.ro", self.r)
+            for module in ("pool", "helpers", "rendering", "visualization")
+        ]
+        for r_patch in self.patches:
+            r_patch.start()
+            self.addCleanup(r_patch.stop)
+        self.heightmap = np.zeros((4, 5))
+        self.hillshade = np.zeros((5, 4, 3))
+
+    def test_render_arrays(self, *_):
+        """Test that frames without a filename are rendered to a temporary file and decoded."""
+        with RenderPool(2, self.heightmap, self.hillshade) as pool:
+            images = pool.render([{"samples": 16, "seed": 1}, {"theta": 10}])
+        for image in images:
+            np.testing.assert_array_equal(image, np.full((2, 3, 4), 128, np.uint8))
+        expressions = [call.args[0] for call in self.r.r.call_args_list]
+        self.assertEqual(expressions.count("png::readPNG"), 2)
+        self.assertIn("set.seed(1)", expressions)
+        self.assertFalse(os.path.exists(self.r.globalenv["filename"]))
+
+    def test_render_highquality(self, *_):
+        """Test that a pooled render merges decoded RGBA passes."""
+        with RenderPool(2, self.heightmap, self.hillshade) as pool:
+            image = pool.render_highquality(samples=8, output="array")
+        np.testing.assert_array_equal(image, np.full((2, 3, 4), 128, np.uint8))
+
+
+class TestMergePasses(unittest.TestCase):
+    """Test the splitting and merging of render passes."""
+
+    def test_split_samples(self):
+        """Test that samples are split into near-equal positive shares."""
+        self.assertEqual(_split_samples(10, 4), [3, 3, 2, 2])
+        self.assertEqual(_split_samples(2, 8), [1, 1])
+
+    def test_linear_light(self):
+        """Test that passes are averaged in linear light, weighted by their samples."""
+        black = np.zeros((2, 2, 3), dtype=np.uint8)
+        white = np.full((2, 2, 3), 255, dtype=np.uint8)
+        merged = _merge_passes([(black, 1), (white, 1)])
+        self.assertEqual(merged[0, 0, 0], round(0.5 ** (1 / 2.2) * 255))
+        merged = _merge_passes([(white, 3), (white, 1)])
+        self.assertTrue((merged == 255).all())
+        gray = np.full((2, 2, 3), 100, dtype=np.uint8)
+        self.assertTrue((_merge_passes([(gray, 5)]) == 100).all())
+
+    def test_alpha(self):
+        """Test that the alpha channel of RGBA passes is averaged without the gamma."""
+        opaque = np.full((2, 2, 4), 255, dtype=np.uint8)
+        clear = np.zeros((2, 2, 4), dtype=np.uint8)
+        merged = _merge_passes([(opaque, 1), (clear, 1)])
+        self.assertEqual(merged[0, 0, 0], round(0.5 ** (1 / 2.2) * 255))
+        self.assertEqual(merged[0, 0, 3], 128)
+
+    def test_invalid_passes(self):
+        """Test that no passes, or passes of different shapes, raise a ValueError."""
+        with self.assertRaises(ValueError):
+            _merge_passes([])
+        with self.assertRaises(ValueError):
+            _merge_passes([(np.zeros((2, 2, 3)), 1), (np.zeros((3, 2, 3)), 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
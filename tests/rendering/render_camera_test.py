@@ -0,0 +1,85 @@
+"""Tests for the render_camera function and the reuse of 3D scenes."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.rendering import _render_camera
+
+
+class TestRenderCamera(unittest.TestCase):
+    """Tests for the render_camera function."""
+
+    @patch("rayshaderpy.rendering._assign_params")
+    @patch("rayshaderpy.rendering.ro")
+    def test_render_camera(self, mock_ro, mock_assign_params):
+        """Test that the camera is moved with rayshader::render_camera."""
+        _render_camera(theta=30, zoom=0.5)
+        params = mock_assign_params.call_args.args[0]
+        self.assertEqual(params["theta"][0], 30)
+        self.assertIsNone(params["phi"][0])
+        mock_ro.r.assert_called_once_with(
+            "rayshader::render_camera(theta=theta, phi=phi, zoom=zoom, fov=fov, shift_vertical=shift_vertical)"
+        )
+
+    def test_invalid_input(self):
+        """Test the render_camera function with invalid input."""
+        with self.assertRaises(ValueError):
+            _render_camera(theta="north")
+
+
+@patch("rayshaderpy.renderer._rgl_open", return_value=True)
+@patch("rayshaderpy.renderer._snapshot")
+@patch("rayshaderpy.renderer._render_camera")
+@patch("rayshaderpy.renderer._plot_3d")
+class TestSceneReuse(unittest.TestCase):
+    """Tests for the reuse of the 3D scene by Renderer.plot_3d."""
+
+    def setUp(self):
+        """Set up a renderer with a heightmap and a hillshade."""
+        self.renderer = Renderer()
+        self.renderer.heightmap = np.random.rand(4, 5)
+        self.renderer.hillshade = np.random.rand(5, 4, 3)
+
+    def test_camera_change_reuses_scene(
+        self, mock_plot, mock_camera, mock_snapshot, mock_open
+    ):
+        """Test that changing only the camera moves the camera of the open scene."""
+        self.renderer.plot_3d(zscale=2, theta=0)
+        self.renderer.plot_3d(zscale=2, theta=90, phi=30, output="array")
+        mock_plot.assert_called_once()
+        mock_camera.assert_called_once_with(theta=90, phi=30, zoom=1, fov=0)
+        mock_snapshot.assert_called_once_with(None, "array")
+
+    def test_geometry_change_rebuilds_scene(
+        self, mock_plot, mock_camera, mock_snapshot, mock_open
+    ):
+        """Test that changing a geometry parameter or an array rebuilds the scene."""
+        self.renderer.plot_3d(zscale=2)
+        self.renderer.plot_3d(zscale=3)
+        self.renderer.add_shadow(np.zeros((4, 5)))
+        self.renderer.plot_3d(zscale=3)
+        self.renderer.update_heightmap(np.zeros((1, 1)), 0, 0)
+        self.renderer.plot_3d(zscale=3)
+        self.renderer.plot_3d(zscale=3, reuse_scene=False)
+        self.assertEqual(mock_plot.call_count, 5)
+        mock_camera.assert_not_called()
+
+    def test_closed_window_rebuilds_scene(
+        self, mock_plot, mock_camera, mock_snapshot, mock_open
+    ):
+        """Test that the scene is rebuilt once the window is closed."""
+        self.renderer.plot_3d()
+        mock_open.return_value = False
+        self.renderer.plot_3d(theta=10)
+        self.assertEqual(mock_plot.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
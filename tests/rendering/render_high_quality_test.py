@@ -2,9 +2,12 @@
 
 import os
 import sys
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 
+import numpy as np
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from rayshaderpy.rendering import _render_highquality
@@ -84,3 +87,37 @@ class TestRenderHighQuality(unittest.TestCase):
         # Check if the image was displayed and the file was not removed
         mock_display_image.assert_called_once_with(filename)
         mock_remove.assert_not_called()
+
+    @patch("rayshaderpy.rendering._assign_params")
+    @patch("rayshaderpy.rendering.ro")
+    @patch("rayshaderpy.visualization.ro")
+    @patch("rayshaderpy.rendering._display_image")
+    def test_render_highquality_array_output(
+        self, mock_display_image, mock_visualization_ro, mock_ro, mock_assign_params
+    ):
+        """Test that the array output decodes the image without displaying it."""
+        mock_ro.globalenv = {}
+        mock_visualization_ro.r.return_value.return_value = np.ones((2, 3, 3))
+        image = _render_highquality(output="array")
+
+        np.testing.assert_array_equal(image, np.full((2, 3, 3), 255, dtype=np.uint8))
+        mock_visualization_ro.r.assert_called_once_with("png::readPNG")
+        mock_visualization_ro.r.return_value.assert_called_once_with(
+            mock_ro.globalenv["filename"]
+        )
+        self.assertFalse(os.path.exists(mock_ro.globalenv["filename"]))
+        mock_display_image.assert_not_called()
+
+    @patch("rayshaderpy.rendering._assign_params")
+    @patch("rayshaderpy.rendering.ro")
+    @patch("rayshaderpy.rendering._display_image")
+    def test_render_highquality_discard_output(
+        self, mock_display_image, mock_ro, mock_assign_params
+    ):
+        """Test that a discarded render keeps the requested file only."""
+        mock_ro.globalenv = {}
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "render.png")
+            self.assertIsNone(_render_highquality(filename=filename, output="discard"))
+            self.assertEqual(mock_ro.globalenv["filename"], filename)
+        mock_display_image.assert_not_called()
@@ -0,0 +1,194 @@
+"""Tests for the streaming encoding of movies."""
+
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.rendering import _orbit_views, _render_movie
+
+
+def make_frames(count, shape=(2, 4, 3)):
+    """Return frames whose first pixel encodes their number."""
+    frames = []
+    for i in range(count):
+        frame = np.zeros(shape, dtype=np.uint8)
+        frame[0, 0, 0] = i
+        frames.append(frame)
+    return frames
+
+
+class TestRenderMovie(unittest.TestCase):
+    """Tests for the _render_movie function."""
+
+    @patch("rayshaderpy.rendering._open_encoder")
+    def test_frames_encoded_in_order(self, mock_open):
+        """Test that every frame is written, in order, before the video is closed."""
+        written, close = [], MagicMock()
+        mock_open.return_value = (written.append, close)
+        count = _render_movie("movie.mp4", iter(make_frames(20)), queue_size=2)
+        self.assertEqual(count, 20)
+        self.assertEqual([frame[0, 0, 0] for frame in written], list(range(20)))
+        close.assert_called_once()
+        self.assertEqual(mock_open.call_args.args[2], (2, 4, 3))
+
+    @patch("rayshaderpy.rendering._open_encoder")
+    def test_rendering_overlaps_encoding(self, mock_open):
+        """Test that frames are encoded while the next frames are still being produced."""
+        encoded = threading.Event()
+
+        def write(frame):
+            encoded.set()
+
+        def produce():
+            frames = make_frames(3)
+            yield frames[0]
+            # The first frame is encoded before the producer is done with the second one
+            self.assertTrue(encoded.wait(timeout=5))
+            yield from frames[1:]
+
+        mock_open.return_value = (write, MagicMock())
+        self.assertEqual(_render_movie("movie.mp4", produce()), 3)
+
+    @patch("rayshaderpy.rendering._open_encoder")
+    def test_encoder_error(self, mock_open):
+        """Test that an encoder failure stops the production of frames and is raised."""
+        close = MagicMock()
+        mock_open.return_value = (MagicMock(side_effect=OSError("broken pipe")), close)
+        produced = []
+
+        def produce():
+            for frame in make_frames(100):
+                produced.append(frame)
+                yield frame
+
+        with self.assertRaises(OSError):
+            _render_movie("movie.mp4", produce(), queue_size=1)
+        close.assert_called_once()
+        self.assertLess(len(produced), 100)
+
+    @patch("rayshaderpy.rendering._open_encoder")
+    def test_close_error_keeps_first_error(self, mock_open):
+        """Test that a failing close does not replace the error of the producer or of the encoder."""
+        close = MagicMock(side_effect=ValueError("ffmpeg failed"))
+
+        def produce():
+            yield from make_frames(2)
+            raise KeyError("producer")
+
+        mock_open.return_value = (MagicMock(), close)
+        with self.assertRaises(KeyError):
+            _render_movie("movie.mp4", produce())
+        close.assert_called_once()
+
+        mock_open.return_value = (MagicMock(side_effect=BrokenPipeError()), close)
+        with self.assertRaises(BrokenPipeError) as raised:
+            _render_movie("movie.mp4", make_frames(3))
+        self.assertIsInstance(raised.exception.__cause__, ValueError)
+
+        mock_open.return_value = (MagicMock(), close)
+        with self.assertRaisesRegex(ValueError, "ffmpeg failed"):
+            _render_movie("movie.mp4", make_frames(3))
+
+    @patch("rayshaderpy.rendering.subprocess.Popen")
+    @patch("rayshaderpy.rendering.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_ffmpeg_pipe(self, mock_which, mock_popen):
+        """Test that raw RGB frames are piped to ffmpeg."""
+        process = mock_popen.return_value
+        process.communicate.return_value = (None, b"")
+        process.returncode = 0
+        _render_movie("movie.mp4", make_frames(3), fps=24)
+        command = mock_popen.call_args.args[0]
+        self.assertEqual(command[0], "/usr/bin/ffmpeg")
+        self.assertIn("rawvideo", command)
+        self.assertEqual(command[command.index("-s") + 1], "4x2")
+        self.assertEqual(command[command.index("-r") + 1], "24")
+        self.assertEqual(command[-1], "movie.mp4")
+        self.assertEqual(process.stdin.write.call_count, 3)
+        written = process.stdin.write.call_args.args[0]
+        self.assertIsInstance(written, memoryview)
+        self.assertEqual(written.nbytes, 2 * 4 * 3)
+
+    @patch("rayshaderpy.rendering.subprocess.Popen")
+    @patch("rayshaderpy.rendering.shutil.which", return_value="/usr/bin/ffmpeg")
+    def test_ffmpeg_failure(self, mock_which, mock_popen):
+        """Test that a failing ffmpeg raises a ValueError with its message."""
+        process = mock_popen.return_value
+        process.communicate.return_value = (None, b"Unknown encoder")
+        process.returncode = 1
+        with self.assertRaisesRegex(ValueError, "Unknown encoder"):
+            _render_movie("movie.mp4", make_frames(3))
+
+    @patch("rayshaderpy.rendering.imageio", None)
+    @patch("rayshaderpy.rendering.shutil.which", return_value=None)
+    def test_no_encoder(self, mock_which):
+        """Test that a missing encoder raises a ValueError."""
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", make_frames(3))
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", make_frames(3), encoder="ffmpeg")
+
+    @patch("rayshaderpy.rendering._open_encoder")
+    def test_invalid_input(self, mock_open):
+        """Test that invalid inputs raise a ValueError."""
+        mock_open.return_value = (MagicMock(), MagicMock())
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", [])
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", make_frames(3), encoder="gstreamer")
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", make_frames(3), fps=0)
+        with self.assertRaises(ValueError):
+            _render_movie("movie.mp4", make_frames(2) + make_frames(1, (4, 4, 3)))
+
+
+class TestRendererRenderMovie(unittest.TestCase):
+    """Tests for the Renderer.render_movie method."""
+
+    def setUp(self):
+        """Set up a renderer with a heightmap and a hillshade."""
+        self.renderer = Renderer()
+        self.renderer.heightmap = np.zeros((5, 5))
+        self.renderer.hillshade = np.zeros((5, 5, 3))
+
+    @patch("rayshaderpy.renderer._render_movie", return_value=4)
+    @patch("rayshaderpy.renderer._iter_snapshot_views")
+    @patch("rayshaderpy.renderer._plot_3d")
+    def test_orbit(self, mock_plot_3d, mock_views, mock_render_movie):
+        """Test that an orbit turns around the scene built once."""
+        count = self.renderer.render_movie("orbit.mp4", frames=4, phi=20, zscale=3)
+        self.assertEqual(count, 4)
+        mock_plot_3d.assert_called_once()
+        self.assertEqual(mock_plot_3d.call_args.kwargs["zscale"], 3)
+        columns = mock_views.call_args.args[0]
+        self.assertEqual(columns["theta"], [0, 90, 180, 270])
+        self.assertEqual(columns["phi"], [20] * 4)
+        self.assertIs(mock_render_movie.call_args.args[1], mock_views.return_value)
+
+    @patch("rayshaderpy.renderer._render_movie")
+    @patch("rayshaderpy.renderer._iter_snapshot_views")
+    @patch("rayshaderpy.renderer._plot_3d")
+    def test_path(self, mock_plot_3d, mock_views, mock_render_movie):
+        """Test that a camera path is validated and completed with the defaults."""
+        self.renderer.render_movie("path.mp4", views=[{"theta": 10}, {"zoom": 0.5}])
+        columns = mock_views.call_args.args[0]
+        self.assertEqual(columns["theta"], [10, 0])
+        self.assertEqual(columns["zoom"], [1, 0.5])
+        with self.assertRaises(ValueError):
+            self.renderer.render_movie("path.mp4", output="array")
+
+    def test_orbit_views(self):
+        """Test that orbits need a positive number of frames."""
+        self.assertEqual(_orbit_views(2, theta=45)["theta"], [45, 225])
+        with self.assertRaises(ValueError):
+            _orbit_views(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
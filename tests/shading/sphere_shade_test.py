@@ -114,6 +114,22 @@ class TestSphereShade(unittest.TestCase):
         self.assertIsInstance(result, np.ndarray)
         np.testing.assert_array_equal(result, mock_r.return_value)
 
+    @patch("rpy2.robjects.r")
+    def test_uint8_dtype(self, mock_r):
+        """Test when a compact uint8 hillshade is requested."""
+        heightmap = np.array([[1, 2], [3, 5]])
+        mock_r.return_value = np.full((2, 2, 3), 0.5)
+        result = _sphere_shade(heightmap=heightmap, dtype="uint8")
+        self.assertEqual(result.dtype, np.uint8)
+        np.testing.assert_array_equal(result, np.full((2, 2, 3), 128))
+
+    def test_invalid_dtype(self):
+        """Test when dtype is not one of the hillshade dtypes."""
+        heightmap = np.array([[1, 2], [3, 4]])
+        with self.assertRaises(ValueError) as context:
+            _sphere_shade(heightmap=heightmap, dtype="int16")
+        self.assertIn("'dtype' must be one of", str(context.exception))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,124 @@
+"""Tests for the search of the triangulation error that fits a triangle budget."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rayshaderpy._cache import _hash_value, clear_cache
+from rayshaderpy._triangulation import _probed_counts, _tune_max_error
+from rayshaderpy.renderer import Renderer
+
+
+def fake_triangle_count(max_error):
+    """Count triangles like a triangulation would: fewer as the error grows."""
+    return max(int(1e6 / (1 + 1e3 * max_error)), 2)
+
+
+@patch("rayshaderpy._triangulation.ro")
+@patch("rayshaderpy._triangulation._triangle_count", side_effect=fake_triangle_count)
+class TestTuneMaxError(unittest.TestCase):
+    """Test the _tune_max_error function."""
+
+    def setUp(self):
+        """Set up a heightmap and empty caches."""
+        self.heightmap = np.random.default_rng(0).random((50, 40)) * 100
+        clear_cache()
+
+    def test_fits_budget(self, mock_count, mock_ro):
+        """Test that the tuned error fits the budget within the tolerance."""
+        max_error = _tune_max_error(self.heightmap, triangle_budget=10_000)
+        count = fake_triangle_count(max_error)
+        self.assertLessEqual(count, 10_000)
+        self.assertGreaterEqual(count, 10_000 * 0.95)
+
+    def test_frame_time(self, mock_count, mock_ro):
+        """Test that a frame-time target is converted to a triangle budget."""
+        with patch("rayshaderpy._triangulation.TRIANGLES_PER_SECOND", 1_000_000):
+            max_error = _tune_max_error(self.heightmap, frame_time=0.05)
+        self.assertLessEqual(fake_triangle_count(max_error), 50_000)
+
+    def test_remembered_per_heightmap(self, mock_count, mock_ro):
+        """Test that tuning again the same heightmap content runs no triangulation."""
+        first = _tune_max_error(self.heightmap, triangle_budget=10_000)
+        calls = mock_count.call_count
+        second = _tune_max_error(self.heightmap.copy(), triangle_budget=10_000)
+        self.assertEqual(first, second)
+        self.assertEqual(mock_count.call_count, calls)
+
+        # Another budget bisects between the probed errors instead of bracketing again
+        counts = _probed_counts(_hash_value(self.heightmap))
+        _tune_max_error(self.heightmap, triangle_budget=20_000)
+        low = max(error for error, n in counts.items() if n > 20_000)
+        high = min(error for error, n in counts.items() if n <= 20_000)
+        for call in mock_count.call_args_list[calls:]:
+            self.assertGreater(call.args[0], low)
+            self.assertLess(call.args[0], high)
+
+    def test_cleared_with_result_cache(self, mock_count, mock_ro):
+        """Test that clear_cache forgets the probed counts and the tuned errors."""
+        _tune_max_error(self.heightmap, triangle_budget=10_000)
+        self.assertTrue(_probed_counts(_hash_value(self.heightmap)))
+        calls = mock_count.call_count
+        clear_cache()
+        self.assertEqual(_probed_counts(_hash_value(self.heightmap)), {})
+        _tune_max_error(self.heightmap, triangle_budget=10_000)
+        self.assertEqual(mock_count.call_count, 2 * calls)
+
+    def test_heightmap_assigned_once(self, mock_count, mock_ro):
+        """Test that the heightmap is sent to R once per search."""
+        _tune_max_error(self.heightmap, triangle_budget=10_000)
+        assigned = [
+            call
+            for call in mock_ro.globalenv.__setitem__.call_args_list
+            if call.args[0] == "tune_heightmap"
+        ]
+        self.assertEqual(len(assigned), 1)
+
+    def test_budget_above_full_resolution(self, mock_count, mock_ro):
+        """Test that a budget above the finest triangulation returns a tiny error."""
+        max_error = _tune_max_error(self.heightmap, triangle_budget=10**9)
+        self.assertLessEqual(fake_triangle_count(max_error), 10**9)
+        self.assertLess(max_error, 1e-3)
+
+    def test_invalid_input(self, mock_count, mock_ro):
+        """Test that invalid budgets raise a ValueError."""
+        with self.assertRaises(ValueError):
+            _tune_max_error(self.heightmap)
+        with self.assertRaises(ValueError):
+            _tune_max_error(self.heightmap, triangle_budget=1)
+        with self.assertRaises(ValueError):
+            _tune_max_error(self.heightmap, frame_time=0)
+        with self.assertRaises(ValueError):
+            _tune_max_error(np.zeros(5), triangle_budget=100)
+
+
+class TestPlot3dTriangleBudget(unittest.TestCase):
+    """Test the triangle_budget parameter of Renderer.plot_3d."""
+
+    @patch("rayshaderpy.renderer._tune_max_error", return_value=0.5)
+    @patch("rayshaderpy.renderer._plot_3d")
+    def test_tuned_triangulation(self, mock_plot_3d, mock_tune):
+        """Test that plot_3d triangulates with the tuned error."""
+        renderer = Renderer()
+        heightmap = np.zeros((10, 10))
+        renderer.plot_3d(
+            hillshade=np.zeros((10, 10, 3)),
+            heightmap=heightmap,
+            triangle_budget=1000,
+            max_tri=10,
+        )
+        mock_tune.assert_called_once_with(heightmap, 1000, None)
+        params = mock_plot_3d.call_args.kwargs
+        self.assertTrue(params["triangulate"])
+        self.assertEqual(params["max_error"], 0.5)
+        self.assertEqual(params["max_tri"], 0)
+        self.assertNotIn("triangle_budget", params)
+
+
+if __name__ == "__main__":
+    unittest.main()
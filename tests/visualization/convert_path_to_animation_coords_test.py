@@ -0,0 +1,123 @@
+"""Tests for the conversion of camera paths to animation coordinates."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._splines import _sample_spline
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.visualization import _convert_path_to_animation_coords
+
+
+class TestConvertPathToAnimationCoords(unittest.TestCase):
+    """Test the _convert_path_to_animation_coords function."""
+
+    def setUp(self):
+        """Set up waypoints of a winding path."""
+        self.waypoints = np.array(
+            [[0, 10, 0], [10, 12, 5], [12, 15, 20], [30, 10, 25], [31, 10, 26.0]]
+        )
+
+    def test_catmull_rom_through_waypoints(self):
+        """Test that the Catmull-Rom spline passes through every waypoint."""
+        for alpha in (0, 0.5, 1):
+            curve = _sample_spline(self.waypoints, "catmull-rom", 16, alpha)
+            np.testing.assert_allclose(curve[::16], self.waypoints, atol=1e-9)
+
+    def test_bspline_clamped(self):
+        """Test that the B-spline starts and ends at the first and last waypoints."""
+        curve = _sample_spline(self.waypoints, "bspline", 16)
+        np.testing.assert_allclose(curve[0], self.waypoints[0])
+        np.testing.assert_allclose(curve[-1], self.waypoints[-1])
+
+    def test_constant_speed(self):
+        """Test that frames are evenly spaced along the path for every spline."""
+        for spline in ("catmull-rom", "bspline", "linear"):
+            positions, _ = _convert_path_to_animation_coords(
+                self.waypoints, frames=500, spline=spline, samples=256
+            )
+            steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+            self.assertLess(steps.std() / steps.mean(), 0.01, spline)
+            np.testing.assert_allclose(positions[0], self.waypoints[0])
+            np.testing.assert_allclose(positions[-1], self.waypoints[-1])
+
+    def test_parameter_step(self):
+        """Test that without constant_step the camera slows down between close waypoints."""
+        positions, _ = _convert_path_to_animation_coords(
+            self.waypoints, frames=400, spline="linear", constant_step=False
+        )
+        steps = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+        self.assertLess(steps[-10:].mean(), steps[:10].mean() / 5)
+
+    def test_lookahead(self):
+        """Test that lookats are ahead along the path, past its end on the last frames."""
+        waypoints = np.array([[0, 0, 0], [100, 0, 0.0]])
+        positions, lookats = _convert_path_to_animation_coords(
+            waypoints, frames=11, spline="linear", lookahead=0.1, lookat_offset=-2
+        )
+        np.testing.assert_allclose(lookats[:, 0], positions[:, 0] + 10)
+        np.testing.assert_allclose(lookats[:, 1], -2)
+        self.assertAlmostEqual(lookats[-1, 0], 110)
+
+    def test_fixed_lookat(self):
+        """Test that a fixed lookat is used for every frame."""
+        _, lookats = _convert_path_to_animation_coords(
+            self.waypoints, frames=4, lookat=(1, 2, 3)
+        )
+        np.testing.assert_allclose(lookats, [[1, 2, 3]] * 4)
+
+    def test_heightmap_path(self):
+        """Test that (row, col) waypoints follow the terrain in scene coordinates."""
+        heightmap = np.add.outer(np.arange(21) * 2.0, np.zeros(11))
+        waypoints = np.array([[0, 0], [20, 10]])
+        positions, lookats = _convert_path_to_animation_coords(
+            waypoints,
+            frames=5,
+            heightmap=heightmap,
+            zscale=2,
+            offset=4,
+            spline="linear",
+        )
+        rows = np.linspace(0, 20, 5)
+        np.testing.assert_allclose(positions[:, 0], rows - 10, atol=1e-9)
+        np.testing.assert_allclose(positions[:, 1], (rows * 2 + 4) / 2)
+        np.testing.assert_allclose(positions[:, 2], 5 - rows / 2, atol=1e-9)
+        self.assertTrue(np.isfinite(lookats).all())
+
+    def test_many_frames(self):
+        """Test that long flyovers are computed at once."""
+        positions, lookats = _convert_path_to_animation_coords(
+            np.random.default_rng(0).random((200, 3)) * 100, frames=50_000
+        )
+        self.assertEqual(positions.shape, (50_000, 3))
+        self.assertEqual(lookats.shape, (50_000, 3))
+
+    def test_invalid_input(self):
+        """Test that invalid inputs raise a ValueError."""
+        with self.assertRaises(ValueError):
+            _convert_path_to_animation_coords(self.waypoints, spline="bezier")
+        with self.assertRaises(ValueError):
+            _convert_path_to_animation_coords(np.zeros((3, 3)))
+        with self.assertRaises(ValueError):
+            _convert_path_to_animation_coords(self.waypoints[:, :2])
+        with self.assertRaises(ValueError):
+            _convert_path_to_animation_coords(self.waypoints, frames=0)
+        with self.assertRaises(ValueError):
+            _convert_path_to_animation_coords(self.waypoints, lookat=(1, 2))
+
+    def test_renderer_heightmap(self):
+        """Test that the renderer uses its heightmap for (row, col) waypoints."""
+        renderer = Renderer()
+        renderer.heightmap = np.full((5, 5), 3.0)
+        positions, _ = renderer.convert_path_to_animation_coords(
+            np.array([[0, 0], [4, 4]]), frames=3, offset=1
+        )
+        np.testing.assert_allclose(positions[:, 1], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
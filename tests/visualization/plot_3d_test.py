@@ -1,5 +1,6 @@
 """Tests for the visualization module."""
 
+import io
 import os
 import sys
 import tempfile
@@ -94,6 +95,55 @@ class TestPlot3D(unittest.TestCase):
                 f"_plot_3d raised an exception unexpectedly with default parameters: {e}"
             )
 
+    @patch("rayshaderpy.visualization._display_image")
+    @patch("rayshaderpy.visualization.ro")
+    def test_array_output(self, mock_ro, mock_display_image):
+        """Test that the array output reads the rgl pixels without a file or a figure."""
+        pixels = np.zeros((3, 2, 3))
+        pixels[0, 0] = 1  # bottom left corner of a 3 x 2 window
+        mock_ro.r.return_value = pixels
+        with patch("rayshaderpy.visualization._temporary_png") as mock_temporary:
+            image = _plot_3d(self.hillshade, self.heightmap, output="array")
+            mock_temporary.assert_not_called()
+        self.assertEqual((image.shape, image.dtype), ((2, 3, 3), np.uint8))
+        np.testing.assert_array_equal(image[1, 0], [255, 255, 255])
+        mock_display_image.assert_not_called()
+
+    @patch("rayshaderpy.visualization._display_image")
+    @patch("rayshaderpy.visualization.ro")
+    def test_stream_output(self, mock_ro, mock_display_image):
+        """Test that a stream receives the PNG bytes and that the temporary file is removed."""
+        paths = []
+
+        def snapshot(code):
+            if code.startswith("rayshader::render_snapshot"):
+                path = mock_ro.globalenv.__setitem__.call_args.args[1]
+                paths.append(path)
+                with open(path, "wb") as f:
+                    f.write(b"png")
+
+        mock_ro.r.side_effect = snapshot
+        stream = io.BytesIO()
+        self.assertIsNone(_plot_3d(self.hillshade, self.heightmap, output=stream))
+        self.assertEqual(stream.getvalue(), b"png")
+        self.assertFalse(os.path.exists(paths[0]))
+        mock_display_image.assert_not_called()
+
+    @patch("rayshaderpy.visualization._display_image")
+    @patch("rayshaderpy.visualization.ro")
+    def test_discard_output(self, mock_ro, mock_display_image):
+        """Test that nothing is snapshotted or displayed when the output is discarded."""
+        _plot_3d(self.hillshade, self.heightmap, output="discard")
+        mock_ro.r.assert_called_once()
+        mock_display_image.assert_not_called()
+
+    def test_invalid_output(self):
+        """Test when output is neither a sink name nor a stream."""
+        with self.assertRaises(ValueError):
+            _plot_3d(self.hillshade, self.heightmap, output="show")
+        with self.assertRaises(ValueError):
+            _plot_3d(self.hillshade, self.heightmap, output=42)
+
 
 if __name__ == "__main__":
     unittest.main()
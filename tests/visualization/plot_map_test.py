@@ -1,5 +1,6 @@
 """Tests for the visualization module."""
 
+import io
 import os
 import sys
 import tempfile
@@ -7,6 +8,7 @@ import unittest
 from unittest.mock import patch
 
 import matplotlib
+import matplotlib.image as mpimg
 import numpy as np
 
 matplotlib.use("Agg")
@@ -77,6 +79,39 @@ class TestPlotMap(unittest.TestCase):
         mock_r.assert_called()
         mock_imread.assert_called_with(self.output_path)
 
+    @patch("rpy2.robjects.r")
+    @patch("matplotlib.pyplot.imread")
+    def test_array_output(self, mock_imread, mock_r):
+        """Test that the map is returned in memory without R, PNG or matplotlib."""
+        hillshade = np.zeros((2, 3, 3))
+        hillshade[0, 0] = 1
+        image = _plot_map(hillshade=hillshade, rotate=90, output="array")
+        self.assertEqual((image.shape, image.dtype), ((3, 2, 3), np.uint8))
+        np.testing.assert_array_equal(image[0, 1], [255, 255, 255])
+        self.assertEqual(image.sum(), 3 * 255)
+        mock_r.assert_not_called()
+        mock_imread.assert_not_called()
+
+    def test_bytes_output(self):
+        """Test that the bytes output holds the map as a PNG, stretched by asp."""
+        hillshade = np.random.rand(4, 5, 3)
+        data = _plot_map(hillshade=hillshade, asp=2, output="bytes")
+        self.assertTrue(data.startswith(b"\x89PNG"))
+        image = np.rint(mpimg.imread(io.BytesIO(data))[..., :3] * 255).astype(np.uint8)
+        self.assertEqual(image.shape, (8, 5, 3))
+        expected = np.rint(hillshade * 255).astype(np.uint8)
+        np.testing.assert_array_equal(image[::2], expected)
+        np.testing.assert_array_equal(image[1::2], expected)
+
+    def test_invalid_output(self):
+        """Test when output is not a valid value."""
+        with self.assertRaises(ValueError):
+            _plot_map(hillshade=self.hillshade, output="png")
+        with self.assertRaises(ValueError):
+            _plot_map(
+                hillshade=self.hillshade, output="array", output_path=self.output_path
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
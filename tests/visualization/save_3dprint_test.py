@@ -0,0 +1,113 @@
+"""Tests for the streaming binary STL export of 3D prints."""
+
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._mesh import STL_RECORD
+from rayshaderpy.helpers import _row_chunks
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.visualization import _save_3dprint
+
+
+def read_stl(path):
+    """Read the triangle count and the records of a binary STL file."""
+    with open(path, "rb") as stream:
+        data = stream.read()
+    count = int(np.frombuffer(data, dtype="<u4", count=1, offset=80)[0])
+    return count, np.frombuffer(data, dtype=STL_RECORD, offset=84)
+
+
+class TestSave3dprint(unittest.TestCase):
+    """Test the _save_3dprint function and the Renderer.save_3dprint method."""
+
+    def setUp(self):
+        """Set up a rough heightmap and a temporary file."""
+        self.heightmap = np.random.default_rng(0).random((7, 5)) * 10 + 100
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "print.stl")
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def test_watertight(self):
+        """Test that every edge is shared by two triangles with opposite directions, with exact vertices."""
+        # Spacings of 1, 0.1, 0.37 and 30 / 7 mm, the last three not representable in float32
+        for maxwidth in (60, 6, 22.2, 2571.428571428571):
+            count = _save_3dprint(self.path, self.heightmap, maxwidth=maxwidth)
+            header_count, records = read_stl(self.path)
+            self.assertEqual(count, header_count)
+            self.assertEqual(count, len(records))
+            self.assertEqual(count, 2 * 6 * 4 + 3 * 20)
+
+            corners = [tuple(map(tuple, v.tolist())) for v in records["vertices"]]
+            edges = Counter()
+            for a, b, c in corners:
+                edges.update([(a, b), (b, c), (c, a)])
+            for (a, b), n in edges.items():
+                self.assertEqual(n, 1)
+                self.assertEqual(edges[(b, a)], 1)
+
+    def test_volume_and_size(self):
+        """Test that the solid is outward facing and scaled to maxwidth."""
+        _save_3dprint(self.path, np.full((5, 3), 10.0), maxwidth=8, unit="cm")
+        _, records = read_stl(self.path)
+        vertices = records["vertices"].astype(float)
+        self.assertAlmostEqual(vertices[..., 1].min(), -80)
+        self.assertAlmostEqual(vertices[..., 0].max(), 40)
+        # Flat heightmap: a 40 x 80 mm block, 1 / zscale unit deep, that is 20 mm
+        volume = np.einsum(
+            "ij,ij->i", vertices[:, 0], np.cross(vertices[:, 1], vertices[:, 2])
+        ).sum()
+        self.assertAlmostEqual(volume / 6, 40 * 80 * 20, places=1)
+        top = records["normal"][:, 2] > 0.99
+        self.assertTrue(np.allclose(vertices[top][..., 2], 20))
+
+    def test_bands(self):
+        """Test that writing one band of rows at a time gives the same file."""
+        heightmap = self.heightmap.copy()
+        heightmap[3, 2] = np.nan
+        _save_3dprint(self.path, heightmap, zscale=2)
+        with open(self.path, "rb") as stream:
+            whole = stream.read()
+        with patch(
+            "rayshaderpy._mesh._row_chunks",
+            side_effect=lambda n_rows, row_nbytes: _row_chunks(n_rows, row_nbytes, 1),
+        ) as mock_chunks:
+            _save_3dprint(self.path, heightmap, zscale=2)
+        self.assertEqual(len(list(mock_chunks.side_effect(6, 1))), 6)
+        with open(self.path, "rb") as stream:
+            self.assertEqual(stream.read(), whole)
+        self.assertTrue(np.isfinite(read_stl(self.path)[1]["vertices"]).all())
+
+    def test_invalid_input(self):
+        """Test that invalid inputs raise a ValueError."""
+        with self.assertRaises(ValueError):
+            _save_3dprint(self.path, self.heightmap, unit="m")
+        with self.assertRaises(ValueError):
+            _save_3dprint(self.path, self.heightmap, soliddepth=200)
+        with self.assertRaises(ValueError):
+            _save_3dprint(self.path, self.heightmap, soliddepth="deep")
+        with self.assertRaises(ValueError):
+            _save_3dprint(self.path, np.full((3, 3), np.nan))
+        with self.assertRaises(ValueError):
+            _save_3dprint(self.path, np.zeros((1, 5)))
+
+    def test_renderer_save_3dprint(self):
+        """Test that the renderer saves its own heightmap."""
+        renderer = Renderer()
+        renderer.heightmap = self.heightmap
+        count = renderer.save_3dprint(self.path, soliddepth=0)
+        self.assertEqual(read_stl(self.path)[0], count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Tests for the NumPy mesh export of heightmaps."""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy._mesh import _terrain_mesh
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.visualization import _save_obj
+
+
+class TestSaveObj(unittest.TestCase):
+    """Test the _save_obj function and the Renderer.save_obj method."""
+
+    def setUp(self):
+        """Set up a small heightmap with a hole, its hillshade and a temporary directory."""
+        self.heightmap = np.arange(12, dtype=float).reshape(3, 4)
+        self.hillshade = np.random.default_rng(0).random((4, 3, 3))
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = lambda name: os.path.join(self.directory.name, name)
+
+    def tearDown(self):
+        """Remove the temporary directory."""
+        self.directory.cleanup()
+
+    def test_mesh(self):
+        """Test the vertices, faces and orientation of the grid mesh."""
+        mesh = _terrain_mesh(self.heightmap, zscale=2)
+        self.assertEqual(mesh.vertices.shape, (12, 3))
+        self.assertEqual(mesh.faces.shape, (12, 3))
+        np.testing.assert_allclose(mesh.vertices[5], [0, 2.5, 0.5])
+        # Every triangle faces up
+        corners = mesh.vertices[mesh.faces]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        self.assertTrue((normals[:, 1] > 0).all())
+
+    def test_mesh_drops_missing_points(self):
+        """Test that points that are not finite are dropped with their triangles."""
+        heightmap = self.heightmap.copy()
+        heightmap[0, 0] = np.nan
+        mesh = _terrain_mesh(heightmap)
+        self.assertEqual(mesh.vertices.shape, (11, 3))
+        self.assertEqual(mesh.faces.shape, (11, 3))
+        self.assertLess(mesh.faces.max(), 11)
+        self.assertTrue(np.isfinite(mesh.vertices).all())
+
+    def test_obj(self):
+        """Test that an OBJ file references its texture and has 1-based faces."""
+        _save_obj(self.path("tile.obj"), self.heightmap, self.hillshade)
+        with open(self.path("tile.obj")) as stream:
+            lines = stream.read().splitlines()
+        self.assertEqual(lines[0], "mtllib tile.mtl")
+        self.assertEqual(sum(line.startswith("v ") for line in lines), 12)
+        self.assertEqual(sum(line.startswith("vt ") for line in lines), 12)
+        faces = [line for line in lines if line.startswith("f ")]
+        self.assertEqual(len(faces), 12)
+        self.assertEqual(faces[0], "f 1/1 5/5 2/2")
+        self.assertTrue(os.path.exists(self.path("tile.png")))
+        self.assertTrue(os.path.exists(self.path("tile.mtl")))
+
+    def test_ply(self):
+        """Test that a binary PLY file holds the vertices, their colors and the faces."""
+        _save_obj(self.path("tile.ply"), self.heightmap, self.hillshade, zscale=2)
+        with open(self.path("tile.ply"), "rb") as stream:
+            data = stream.read()
+        header, body = data.split(b"end_header\n")
+        self.assertIn(b"element vertex 12", header)
+        self.assertIn(b"element face 12", header)
+        vertex = np.dtype(
+            [("xyz", "<f4", (3,)), ("rgb", "u1", (3,))]
+        )  # 15 bytes per vertex
+        vertices = np.frombuffer(body, dtype=vertex, count=12)
+        np.testing.assert_allclose(vertices["xyz"][5], [0, 2.5, 0.5])
+        expected = np.round(self.hillshade[1, 1] * 255)
+        np.testing.assert_allclose(vertices["rgb"][5], expected, atol=1)
+        self.assertEqual(len(body), 12 * 15 + 12 * 13)
+
+    def test_glb(self):
+        """Test that a GLB file has a valid header, JSON chunk and binary chunk."""
+        _save_obj(self.path("tile.glb"), self.heightmap, self.hillshade)
+        with open(self.path("tile.glb"), "rb") as stream:
+            data = stream.read()
+        magic, version, length = struct.unpack("<4sII", data[:12])
+        self.assertEqual((magic, version, length), (b"glTF", 2, len(data)))
+        json_length, kind = struct.unpack("<I4s", data[12:20])
+        self.assertEqual(kind, b"JSON")
+        gltf = json.loads(data[slice(20, 20 + json_length)])
+        self.assertEqual(gltf["accessors"][0]["count"], 12)
+        self.assertEqual(gltf["accessors"][1]["count"], 36)
+        self.assertEqual(gltf["images"][0]["mimeType"], "image/png")
+        bin_length, kind = struct.unpack_from("<I4s", data, 20 + json_length)
+        self.assertEqual(kind, b"BIN\x00")
+        self.assertEqual(bin_length, gltf["buffers"][0]["byteLength"])
+
+    def test_invalid_input(self):
+        """Test that invalid inputs raise a ValueError."""
+        with self.assertRaises(ValueError):
+            _save_obj(self.path("tile.stl"), self.heightmap)
+        with self.assertRaises(ValueError):
+            _save_obj(
+                self.path("tile.obj"), self.heightmap, self.hillshade.transpose(1, 0, 2)
+            )
+        with self.assertRaises(ValueError):
+            _save_obj(self.path("tile.obj"), self.heightmap, zscale=0)
+
+    def test_renderer_save_obj(self):
+        """Test that the renderer saves its own heightmap, optionally without texture."""
+        renderer = Renderer()
+        renderer.heightmap = self.heightmap
+        renderer.hillshade = self.hillshade
+        renderer.save_obj(self.path("tile.glb"), texture=False)
+        with open(self.path("tile.glb"), "rb") as stream:
+            data = stream.read()
+        json_length = struct.unpack("<I", data[12:16])[0]
+        self.assertNotIn(b"images", data[slice(20, 20 + json_length)])
+
+
+if __name__ == "__main__":
+    unittest.main()
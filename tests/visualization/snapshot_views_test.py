@@ -0,0 +1,78 @@
+"""Tests for the batched capture of several views of a 3D scene."""
+
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from rayshaderpy.renderer import Renderer
+from rayshaderpy.visualization import _validate_views
+
+
+def fake_pixels(count):
+    """Return rgl pixel arrays of a 3 x 2 window whose bottom left pixel encodes the view number."""
+    frames = []
+    for i in range(count):
+        pixels = np.zeros((3, 2, 3))
+        pixels[0, 0] = i / 10
+        frames.append(pixels)
+    return frames
+
+
+@patch("rayshaderpy.renderer._rgl_open", return_value=True)
+@patch("rayshaderpy.renderer._plot_3d")
+@patch("rayshaderpy.visualization.ro")
+class TestSnapshotViews(unittest.TestCase):
+    """Test the snapshot_views method of the Renderer class."""
+
+    def setUp(self):
+        """Set up a renderer with a heightmap and a hillshade."""
+        self.renderer = Renderer()
+        self.renderer.heightmap = np.random.rand(4, 5)
+        self.renderer.hillshade = np.random.rand(5, 4, 3)
+        self.views = [{"theta": 0}, {"theta": 90, "phi": 10}, {"zoom": 0.5}]
+
+    def test_views_are_batched(self, mock_ro, mock_plot, mock_open):
+        """Test that the scene is built once and all the views are captured in one R call."""
+        mock_ro.r.return_value = fake_pixels(3)
+        frames = self.renderer.snapshot_views(self.views, zscale=2, phi=20)
+
+        mock_plot.assert_called_once()
+        self.assertEqual(mock_plot.call_args.kwargs["output"], "discard")
+        mock_ro.r.assert_called_once()
+        phis = [call.args[0] for call in mock_ro.FloatVector.call_args_list]
+        self.assertIn([20.0, 10.0, 20.0], phis)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames[2].shape, (2, 3, 3))
+        self.assertEqual(frames[2][1, 0, 0], 51)
+
+    def test_stream(self, mock_ro, mock_plot, mock_open):
+        """Test that streamed views are captured one R call at a time."""
+        mock_ro.r.side_effect = lambda code: fake_pixels(1)
+        frames = self.renderer.snapshot_views(self.views, stream=True)
+        mock_plot.assert_called_once()
+        mock_ro.r.assert_not_called()
+        self.assertEqual(len(list(frames)), 3)
+        self.assertEqual(mock_ro.r.call_count, 3)
+
+    def test_invalid_input(self, mock_ro, mock_plot, mock_open):
+        """Test the snapshot_views method with invalid input."""
+        with self.assertRaises(ValueError):
+            self.renderer.snapshot_views([])
+        with self.assertRaises(ValueError):
+            self.renderer.snapshot_views([{"roll": 10}])
+        with self.assertRaises(ValueError):
+            self.renderer.snapshot_views(self.views, output="array")
+        with self.assertRaises(ValueError):
+            _validate_views(
+                [{"theta": "north"}], {"theta": 0, "phi": 0, "zoom": 1, "fov": 0}
+            )
+        mock_plot.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()